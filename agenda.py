@@ -0,0 +1,316 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+import db
+
+# Jornada de citas: bloques de 30 minutos entre 09:00 y 19:00.
+APERTURA = 9 * 60
+CIERRE = 19 * 60
+PASO = 30
+N_BLOQUES = (CIERRE - APERTURA) // PASO
+JORNADA = (1 << N_BLOQUES) - 1
+
+
+def mascara(inicio_min, fin_min):
+    """Bits de los bloques de la jornada que toca [inicio_min, fin_min)."""
+    b0 = max(0, (inicio_min - APERTURA) // PASO)
+    b1 = min(N_BLOQUES, -(-(fin_min - APERTURA) // PASO))
+    if b1 <= b0:
+        return 0
+    return ((1 << (b1 - b0)) - 1) << b0
+
+
+class Disponibilidad:
+    """Ocupación de un día de una sede: una máscara de bloques por empleada."""
+
+    def __init__(self, empleadas, citas):
+        """citas: filas (cid, empleada, inicio_min, fin_min)."""
+        self.empleadas = list(empleadas)
+        self._ocupado = {e.lower(): 0 for e in self.empleadas}
+        self._citas = {}
+        for cid, empleada, m0, m1 in citas:
+            clave = (empleada or "").strip().lower()
+            if clave not in self._ocupado:
+                continue
+            m = mascara(m0, m1)
+            self._citas[int(cid)] = (clave, m)
+            self._ocupado[clave] |= m
+
+    def ocupado(self, empleada, excluir_cid=None):
+        clave = (empleada or "").strip().lower()
+        m = self._ocupado.get(clave, 0)
+        if excluir_cid is not None and int(excluir_cid) in self._citas:
+            dueña, _m = self._citas[int(excluir_cid)]
+            if dueña == clave:
+                m = 0
+                for cid, (c, mc) in self._citas.items():
+                    if c == clave and cid != int(excluir_cid):
+                        m |= mc
+        return m
+
+    def libres(self, inicio, fin, excluir_cid=None):
+        m0, m1 = db.a_minutos(inicio), db.a_minutos(fin)
+        if m0 is None or m1 is None or m1 <= m0:
+            return []
+        m = mascara(m0, m1)
+        if not m:
+            return []
+        return [e for e in self.empleadas if not self.ocupado(e, excluir_cid) & m]
+
+
+def a_hora(minutos):
+    return f"{minutos // 60:02d}:{minutos % 60:02d}"
+
+
+def inicios_posibles(libre, bloques):
+    """Bits de los bloques donde empiezan `bloques` bloques libres seguidos."""
+    m = libre
+    for j in range(1, bloques):
+        m &= libre >> j
+    return m
+
+
+def huecos_libres(duracion_min, fmin, fmax, sede_id=None, limite=None, ahora=None):
+    """Todos los (sede_id, fecha, inicio, empleada) donde cabe un servicio de duracion_min.
+
+    Lee las citas del rango con una sola consulta y recorre cada día/empleada con
+    operaciones de bits sobre la jornada. Con `ahora` se omiten los horarios ya pasados.
+    """
+    bloques = max(1, -(-int(duracion_min) // PASO))
+    if bloques > N_BLOQUES:
+        return []
+
+    empleadas = {}
+    for sid, nombre in db.listar_empleadas_activas(sede_id):
+        empleadas.setdefault(int(sid), []).append(nombre)
+
+    ocupado = {}
+    for _cid, sid, fecha, m0, m1, empleada, *_resto in db.listar_agenda_rango(fmin, fmax, sede_id):
+        clave = (int(sid), fecha, (empleada or "").strip().lower())
+        ocupado[clave] = ocupado.get(clave, 0) | mascara(m0, m1)
+
+    hoy = ahora.date().isoformat() if ahora else None
+    pasado = 0
+    if ahora:
+        transcurrido = ahora.hour * 60 + ahora.minute - APERTURA
+        if transcurrido > 0:
+            pasado = (1 << min(N_BLOQUES, -(-transcurrido // PASO))) - 1
+
+    huecos = []
+    dia = date.fromisoformat(fmin)
+    ultimo = date.fromisoformat(fmax)
+    while dia <= ultimo:
+        fecha = dia.isoformat()
+        for sid in sorted(empleadas):
+            for nombre in empleadas[sid]:
+                libre = JORNADA & ~ocupado.get((sid, fecha, nombre.lower()), 0)
+                if fecha == hoy:
+                    libre &= ~pasado
+                m = inicios_posibles(libre, bloques)
+                while m:
+                    b = (m & -m).bit_length() - 1
+                    m &= m - 1
+                    huecos.append((sid, fecha, a_hora(APERTURA + b * PASO), nombre))
+        dia += timedelta(days=1)
+
+    huecos.sort(key=lambda h: (h[1], h[2], h[0], h[3]))
+    return huecos[:limite] if limite else huecos
+
+
+def proximos_huecos(sede_id, duracion_min, dias=14, limite=20):
+    ahora = datetime.now()
+    fmin = ahora.date().isoformat()
+    fmax = (ahora.date() + timedelta(days=dias - 1)).isoformat()
+    return huecos_libres(duracion_min, fmin, fmax, sede_id, limite=limite, ahora=ahora)
+
+
+REGLAS_REPETICION = {"Semanal": 7, "Quincenal": 14, "Mensual": None}
+
+
+def fechas_recurrentes(fecha, regla, veces):
+    """Las `veces` fechas de la serie que empieza en `fecha` (incluida)."""
+    d0 = date.fromisoformat(fecha)
+    paso = REGLAS_REPETICION[regla]
+    fechas = []
+    for k in range(int(veces)):
+        if paso:
+            d = d0 + timedelta(days=paso * k)
+        else:
+            # Mismo día del mes; en meses más cortos, el último día.
+            mes = d0.month - 1 + k
+            anio, mes = d0.year + mes // 12, mes % 12 + 1
+            siguiente = date(anio + (mes == 12), mes % 12 + 1, 1)
+            d = date(anio, mes, min(d0.day, (siguiente - timedelta(days=1)).day))
+        fechas.append(d.isoformat())
+    return fechas
+
+
+# ------------------------- ÍNDICE POR DÍA -------------------------
+# Se construye una vez por (sede, fecha), se guardan los CAPACIDAD_INDICES más
+# usados y se descarta cuando db avisa que las citas de ese día cambiaron.
+# La versión solo se lleva mientras un día se está construyendo: sirve para no
+# guardar un índice leído antes de un cambio.
+
+CAPACIDAD_INDICES = 60
+
+_indices = OrderedDict()
+_versiones = {}
+_en_curso = {}
+_lock = threading.Lock()
+
+
+def disponibilidad(sede_id, fecha):
+    clave = (int(sede_id), fecha)
+    with _lock:
+        idx = _indices.get(clave)
+        if idx is not None:
+            _indices.move_to_end(clave)
+            return idx
+        version = _versiones.get(clave, 0)
+        _en_curso[clave] = _en_curso.get(clave, 0) + 1
+
+    try:
+        empleadas = [nombre for _id, nombre in db.listar_empleadas(sede_id)]
+        citas = [(r[0], r[5], r[3], r[4]) for r in db.listar_agenda_rango(fecha, fecha, sede_id)]
+        idx = Disponibilidad(empleadas, citas)
+    finally:
+        with _lock:
+            if idx is not None and _versiones.get(clave, 0) == version:
+                _indices[clave] = idx
+                _indices.move_to_end(clave)
+                while len(_indices) > CAPACIDAD_INDICES:
+                    _indices.popitem(last=False)
+            _en_curso[clave] -= 1
+            if not _en_curso[clave]:
+                del _en_curso[clave]
+                _versiones.pop(clave, None)
+    return idx
+
+
+def _invalidar(clave):
+    # Con _lock tomado.
+    _indices.pop(clave, None)
+    if clave in _en_curso:
+        _versiones[clave] = _versiones.get(clave, 0) + 1
+
+
+def invalidar(sede_id, fecha):
+    with _lock:
+        _invalidar((int(sede_id), fecha))
+
+
+def invalidar_sede(sede_id):
+    with _lock:
+        for clave in [c for c in list(_indices) + list(_en_curso) if c[0] == int(sede_id)]:
+            _invalidar(clave)
+
+
+db.al_cambiar_citas(invalidar)
+
+
+# ------------------------- CACHÉ DE DÍAS -------------------------
+
+class CacheDias:
+    """Citas por (sede, fecha) con política LRU; se llena con lecturas por rango.
+
+    Un día guardado vence a los `vigencia` segundos, para que las citas que otra
+    caja agenda aparezcan sin recargar a mano. Como en el índice por día, la
+    versión solo se lleva mientras hay una lectura en curso de ese día.
+    """
+
+    def __init__(self, capacidad=120, vigencia=60):
+        self.capacidad = capacidad
+        self.vigencia = vigencia
+        self._dias = OrderedDict()
+        self._versiones = {}
+        self._en_curso = {}
+        self._lock = threading.Lock()
+
+    def _vigente(self, clave):
+        # Con _lock tomado.
+        guardado = self._dias.get(clave)
+        if guardado is None:
+            return None
+        filas, momento = guardado
+        if time.monotonic() - momento > self.vigencia:
+            del self._dias[clave]
+            return None
+        return filas
+
+    def obtener(self, sede_id, fecha):
+        clave = (int(sede_id), fecha)
+        with self._lock:
+            filas = self._vigente(clave)
+            if filas is not None:
+                self._dias.move_to_end(clave)
+            return filas
+
+    def faltantes(self, sede_id, fechas):
+        with self._lock:
+            return [f for f in fechas if self._vigente((int(sede_id), f)) is None]
+
+    def cargar_rango(self, sede_id, fmin, fmax):
+        """Lee [fmin, fmax] con una sola consulta y guarda cada día, también los vacíos."""
+        sede_id = int(sede_id)
+        fechas = fechas_entre(fmin, fmax)
+        claves = [(sede_id, f) for f in fechas]
+        with self._lock:
+            versiones = {c: self._versiones.get(c, 0) for c in claves}
+            for c in claves:
+                self._en_curso[c] = self._en_curso.get(c, 0) + 1
+
+        try:
+            filas = db.listar_citas_dias(sede_id, fmin, fmax)
+        except Exception:
+            self._soltar(claves)
+            raise
+
+        por_dia = {f: [] for f in fechas}
+        for fecha, *fila in filas:
+            por_dia.setdefault(fecha, []).append(tuple(fila))
+
+        with self._lock:
+            ahora = time.monotonic()
+            for clave in claves:
+                # Un cambio durante la lectura deja ese día sin guardar.
+                if self._versiones.get(clave, 0) == versiones[clave]:
+                    self._dias[clave] = (por_dia[clave[1]], ahora)
+                    self._dias.move_to_end(clave)
+            while len(self._dias) > self.capacidad:
+                self._dias.popitem(last=False)
+        self._soltar(claves)
+        return por_dia
+
+    def _soltar(self, claves):
+        with self._lock:
+            for clave in claves:
+                self._en_curso[clave] -= 1
+                if not self._en_curso[clave]:
+                    del self._en_curso[clave]
+                    self._versiones.pop(clave, None)
+
+    def invalidar(self, sede_id, fecha):
+        clave = (int(sede_id), fecha)
+        with self._lock:
+            self._dias.pop(clave, None)
+            if clave in self._en_curso:
+                self._versiones[clave] = self._versiones.get(clave, 0) + 1
+
+
+def fechas_entre(fmin, fmax):
+    d, fin = date.fromisoformat(fmin), date.fromisoformat(fmax)
+    fechas = []
+    while d <= fin:
+        fechas.append(d.isoformat())
+        d += timedelta(days=1)
+    return fechas
+
+
+def ventana(fecha, radio):
+    d = date.fromisoformat(fecha)
+    return (d - timedelta(days=radio)).isoformat(), (d + timedelta(days=radio)).isoformat()
+
+
+dias = CacheDias()
+db.al_cambiar_citas(dias.invalidar)
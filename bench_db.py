@@ -0,0 +1,176 @@
+import os
+import sys
+import tempfile
+import time
+
+import db
+
+
+def _sembrar(n_productos=2000, n_citas=3000):
+    db.init_db()
+    sedes = [s[0] for s in db.listar_sedes()]
+    with db.transaccion() as cur:
+        for sid in sedes:
+            cur.executemany(
+                "INSERT INTO inventario(sede_id, nombre, stock, precio) VALUES (?,?,?,?)",
+                [(sid, f"Producto {i:05d}", 10**6, 10.0 + i % 50) for i in range(n_productos)]
+            )
+            cur.executemany(
+                "INSERT INTO citas(sede_id, fecha, cliente, servicio, inicio, fin, empleada, inicio_min, fin_min, dia)"
+                " VALUES (?,?,?,?,?,?,?,?,?,?)",
+                [(sid, f"2026-01-{1 + i % 28:02d}", f"Cliente {i}", "Servicio", "09:00", "10:00", "Mely",
+                  540, 600, db.dia_epoch(f"2026-01-{1 + i % 28:02d}"))
+                 for i in range(n_citas)]
+            )
+    return sedes
+
+
+def _medir(nombre, fn, n, por_llamada_nueva):
+    t0 = time.perf_counter()
+    for _ in range(n):
+        fn()
+        if por_llamada_nueva:
+            db.cerrar_conexion()
+    dt = time.perf_counter() - t0
+    return nombre, dt / n * 1e6
+
+
+def main(n=300):
+    tmp = tempfile.mkdtemp()
+    db.DB_FILE = os.path.join(tmp, "salon.db")
+    sedes = _sembrar()
+    sid = sedes[0]
+    pid = db.listar_inventario(sid)[0][0]
+
+    casos = [
+        ("listar_inventario", lambda: db.listar_inventario(sid)),
+        ("listar_citas", lambda: db.listar_citas(sid, "2026-01-05")),
+        ("obtener_sede", lambda: db.obtener_sede(sid)),
+        ("registrar_venta", lambda: db.registrar_venta(sid, pid, 1, 10.0)),
+    ]
+
+    print(f"{'helper':<20}{'antes (us)':>14}{'despues (us)':>14}")
+    for nombre, fn in casos:
+        _, antes = _medir(nombre, fn, n, por_llamada_nueva=True)
+        _, despues = _medir(nombre, fn, n, por_llamada_nueva=False)
+        print(f"{nombre:<20}{antes:>14.1f}{despues:>14.1f}")
+
+    db.cerrar_conexiones()
+
+
+# Helpers de lectura y sus argumentos de ejemplo. Los que listan una tabla
+# completa a propósito (sin filtrar por sede ni por id) pueden recorrerla; el
+# resto debe usar índice. La búsqueda con palabras parecidas lee el vocabulario
+# entero del índice de texto.
+RECORRIDO_PERMITIDO = {"listar_usuarios", "listar_sedes", "listar_sedes_simple",
+                       "listar_empleadas_activas", "buscar_productos(parecidos)"}
+
+
+def _lecturas(sid, pid):
+    return [
+        ("usuario_existe", lambda: db.usuario_existe("admin")),
+        ("obtener_usuario", lambda: db.obtener_usuario("admin")),
+        ("listar_usuarios", lambda: db.listar_usuarios()),
+        ("obtener_usuario_por_id", lambda: db.obtener_usuario_por_id(1)),
+        ("listar_sedes", lambda: db.listar_sedes()),
+        ("obtener_sede", lambda: db.obtener_sede(sid)),
+        ("listar_categorias_inventario", lambda: db.listar_categorias_inventario(sid)),
+        ("listar_inventario", lambda: db.listar_inventario(sid)),
+        ("listar_servicios", lambda: db.listar_servicios(sid)),
+        ("listar_citas", lambda: db.listar_citas(sid, "2026-01-05")),
+        ("obtener_cita", lambda: db.obtener_cita(1)),
+        ("listar_empleadas", lambda: db.listar_empleadas(sid)),
+        ("obtener_venta", lambda: db.obtener_venta(1)),
+        ("listar_items_venta", lambda: db.listar_items_venta(1)),
+        ("listar_sedes_simple", lambda: db.listar_sedes_simple()),
+        ("listar_ventas_rango", lambda: db.listar_ventas_rango("2026-01-01", "2026-01-31")),
+        ("listar_ventas_rango(sede)", lambda: db.listar_ventas_rango("2026-01-01", "2026-01-31", sid)),
+        ("listar_citas_rango", lambda: db.listar_citas_rango("2026-01-01", "2026-01-31")),
+        ("listar_citas_rango(sede)", lambda: db.listar_citas_rango("2026-01-01", "2026-01-31", sid)),
+        ("resumen_ventas", lambda: db.resumen_ventas("2026-01-01", "2026-12-31", por="producto")),
+        ("resumen_citas", lambda: db.resumen_citas("2026-01-01", "2026-12-31", sid, por="empleada")),
+        ("totales_rango", lambda: db.totales_rango("2026-01-01", "2026-12-31")),
+        ("totales_rango(sede)", lambda: db.totales_rango("2026-01-01", "2026-12-31", sid)),
+        ("listar_resumen_diario", lambda: db.listar_resumen_diario("2026-01-01", "2026-12-31")),
+        ("listar_resumen_diario(sede)", lambda: db.listar_resumen_diario("2026-01-01", "2026-12-31", sid)),
+        ("listar_empleadas_activas", lambda: db.listar_empleadas_activas()),
+        ("listar_empleadas_activas(sede)", lambda: db.listar_empleadas_activas(sid)),
+        ("listar_agenda_rango", lambda: db.listar_agenda_rango("2026-01-01", "2026-01-14")),
+        ("listar_agenda_rango(sede)", lambda: db.listar_agenda_rango("2026-01-01", "2026-01-14", sid)),
+        ("listar_citas_dias", lambda: db.listar_citas_dias(sid, "2026-01-01", "2026-01-14")),
+        ("buscar_productos", lambda: db.buscar_productos(sid, "produ 0001")),
+        ("buscar_productos(parecidos)", lambda: db.buscar_productos(sid, "prodcto 00012")),
+        ("obtener_producto", lambda: db.obtener_producto(pid)),
+        ("producto_por_codigo", lambda: db.producto_por_codigo(sid, "750100000001")),
+        ("listar_movimientos", lambda: db.listar_movimientos(sid)),
+        ("listar_transferencias", lambda: db.listar_transferencias(sid)),
+        ("listar_movimientos(producto)", lambda: db.listar_movimientos(sid, pid)),
+        ("stock_en_fecha", lambda: db.stock_en_fecha(sid, "2026-01-15")),
+        ("stock_en_fecha(producto)", lambda: db.stock_en_fecha(sid, "2026-01-15", pid)),
+        ("consultar_inventario", lambda: db.consultar_inventario(sid)),
+        ("consultar_inventario(bajo)", lambda: db.consultar_inventario(sid, solo_bajo=True)),
+        ("listar_stock_bajo", lambda: db.listar_stock_bajo(sid)),
+        ("iterar_inventario", lambda: list(db.iterar_inventario(sid))),
+        ("sugerencia_reorden", lambda: db.sugerencia_reorden(sid, 30, 14)),
+        ("consultar_inventario(precio)", lambda: db.consultar_inventario(sid, orden="precio", desc=True)),
+        ("consultar_inventario(filtros)", lambda: db.consultar_inventario(sid, "produ", stock_max=10**6,
+                                                                           precio_min=10, orden="stock")),
+    ]
+
+
+def _sql_de(fn):
+    capturadas = []
+    conn = db.get_connection()
+    conn.set_trace_callback(capturadas.append)
+    try:
+        fn()
+    finally:
+        conn.set_trace_callback(None)
+    return [q for q in capturadas if q.lstrip().upper().startswith(("SELECT", "WITH"))]
+
+
+def verificar_planes():
+    tmp = tempfile.mkdtemp()
+    db.DB_FILE = os.path.join(tmp, "salon.db")
+    sedes = _sembrar(n_productos=500, n_citas=500)
+    sid = sedes[0]
+    pid = db.listar_inventario(sid)[0][0]
+    conn = db.get_connection()
+
+    fallos = []
+    for nombre, fn in _lecturas(sid, pid):
+        for sql in _sql_de(fn):
+            plan = [r[3] for r in conn.execute("EXPLAIN QUERY PLAN " + sql)]
+            # Un MATCH sobre FTS5 aparece como "SCAN ... VIRTUAL TABLE INDEX n:M..." y usa el índice.
+            # Un SCAN ... USING INDEX sigue recorriendo el índice completo, así que también cuenta.
+            recorridos = [p for p in plan
+                          if p.startswith("SCAN") and p != "SCAN CONSTANT ROW" and ":M" not in p]
+            estado = "ok"
+            if recorridos and nombre not in RECORRIDO_PERMITIDO:
+                estado = "SCAN"
+                fallos.append(nombre)
+            print(f"{estado:<5} {nombre:<30} {' | '.join(plan)}")
+
+    db.cerrar_conexiones()
+    return not fallos
+
+
+def reconstruir_resumen(ruta=None):
+    """Rehace resumen_diario desde ventas y citas en la base real (o en `ruta`)."""
+    if ruta:
+        db.DB_FILE = ruta
+    db.init_db()
+    t0 = time.perf_counter()
+    db.reconstruir_resumen_diario()
+    cur = db.get_connection().execute("SELECT COUNT(*) FROM resumen_diario")
+    print(f"resumen_diario: {cur.fetchone()[0]} filas en {time.perf_counter() - t0:.2f} s ({db.DB_FILE})")
+    db.cerrar_conexiones()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "planes":
+        sys.exit(0 if verificar_planes() else 1)
+    if len(sys.argv) > 1 and sys.argv[1] == "resumen":
+        reconstruir_resumen(sys.argv[2] if len(sys.argv) > 2 else None)
+        sys.exit(0)
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 300)
@@ -1,6 +1,8 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 import db
+import tareas
+from tabla_virtual import TablaVirtual
 
 BG_PRIMARY = "#fff5f7"
 BG_SECONDARY = "#f3d6dc"
@@ -96,7 +98,7 @@ class BusquedaFrame(tk.Frame):
             command=self._limpiar
         ).grid(row=0, column=4, sticky="e", padx=6, ipadx=12, ipady=8)
 
-        self.tree = ttk.Treeview(
+        self.tree = TablaVirtual(
             inner,
             columns=("Producto", "Categoría", "Existencias", "Precio"),
             show="headings",
@@ -117,37 +119,30 @@ class BusquedaFrame(tk.Frame):
         self._cargar_todo()
 
     def _set_rows(self, productos):
-        for i in self.tree.get_children():
-            self.tree.delete(i)
-        for pid, nombre, stock, precio, categoria in productos:
-            self.tree.insert(
-                "", "end", iid=str(pid),
-                values=(nombre, categoria or "", int(stock), f"{float(precio):.2f}")
-            )
+        self.tree.cargar((pid, (nombre, categoria or "", int(stock), f"{float(precio):.2f}"))
+                         for pid, nombre, stock, precio, categoria in productos)
 
     def _cargar_todo(self):
-        try:
-            productos = db.listar_inventario(self.sede_id)
-        except Exception as e:
-            messagebox.showerror("Búsqueda", f"No se pudo cargar inventario:\n{e}")
-            return
-        self._set_rows(productos)
+        tareas.ejecutar(self, "productos", lambda: db.listar_inventario(self.sede_id),
+                        self._set_rows, self._error_carga)
+
+    def _error_carga(self, e):
+        messagebox.showerror("Búsqueda", f"No se pudo cargar inventario:\n{e}")
 
     def _buscar(self):
-        texto = (self.var_texto.get() or "").strip().lower()
+        texto = (self.var_texto.get() or "").strip()
         if not texto:
             messagebox.showinfo("Búsqueda", "Escribe algo para buscar (ej: esmalte).")
             return
 
-        try:
-            productos = db.listar_inventario(self.sede_id)
-        except Exception as e:
-            messagebox.showerror("Búsqueda", f"No se pudo cargar inventario:\n{e}")
-            return
+        def mostrar(productos):
+            self._set_rows(productos)
+            self._seleccionar_primero()
 
-        filtrados = [p for p in productos if texto in (p[1] or "").strip().lower()]
-        self._set_rows(filtrados)
+        tareas.ejecutar(self, "productos", lambda: db.buscar_productos(self.sede_id, texto, 200),
+                        mostrar, self._error_carga)
 
+    def _seleccionar_primero(self):
         kids = self.tree.get_children()
         if kids:
             self.tree.selection_set(kids[0])
@@ -0,0 +1,226 @@
+import csv
+import os
+import db
+
+try:
+    import openpyxl
+except Exception:
+    openpyxl = None
+
+# Importar / exportar productos y servicios en CSV (o Excel si está openpyxl).
+# El archivo se lee por lotes, nunca completo en memoria.
+
+TAMANO_LOTE = 500
+MAX_ERRORES = 1000
+
+COLUMNAS_PRODUCTOS = ("nombre", "categoria", "stock", "precio", "codigo", "punto_reorden")
+COLUMNAS_SERVICIOS = ("nombre", "precio")
+
+_ALIAS = {
+    "producto": "nombre", "servicio": "nombre",
+    "categoría": "categoria",
+    "existencias": "stock",
+    "código": "codigo", "sku": "codigo", "barcode": "codigo",
+    "codigo de barras": "codigo", "código de barras": "codigo",
+    "punto de reorden": "punto_reorden", "reorden": "punto_reorden",
+    "precio (q)": "precio",
+}
+
+
+def es_excel(ruta):
+    return os.path.splitext(ruta)[1].lower() in (".xlsx", ".xlsm")
+
+
+def _filas_archivo(ruta):
+    """(número de línea, valores) de cada fila, empezando por el encabezado."""
+    if es_excel(ruta):
+        if openpyxl is None:
+            raise ValueError("Para leer Excel instala openpyxl, o guarda el archivo como CSV.")
+        libro = openpyxl.load_workbook(ruta, read_only=True, data_only=True)
+        try:
+            for linea, valores in enumerate(libro.active.iter_rows(values_only=True), start=1):
+                yield linea, list(valores)
+        finally:
+            libro.close()
+        return
+
+    with open(ruta, newline="", encoding=_codificacion(ruta)) as f:
+        muestra = f.read(4096)
+        f.seek(0)
+        try:
+            dialecto = csv.Sniffer().sniff(muestra, delimiters=",;\t")
+        except csv.Error:
+            dialecto = csv.excel
+        lector = csv.reader(f, dialecto)
+        for valores in lector:
+            yield lector.line_num, valores
+
+
+def _codificacion(ruta):
+    # Excel en español guarda "CSV" en cp1252 salvo que se elija "CSV UTF-8".
+    # Se revisa el archivo completo antes de empezar, sin guardarlo en memoria.
+    for codificacion in ("utf-8-sig", "cp1252"):
+        try:
+            with open(ruta, newline="", encoding=codificacion) as f:
+                while f.read(1 << 16):
+                    pass
+            return codificacion
+        except UnicodeDecodeError:
+            continue
+    raise ValueError("No se pudo leer el archivo. Guárdalo como CSV UTF-8.")
+
+
+def _indices(encabezado, columnas):
+    indices = {}
+    for i, titulo in enumerate(encabezado or []):
+        clave = str(titulo or "").strip().lower()
+        clave = _ALIAS.get(clave, clave)
+        if clave in columnas and clave not in indices:
+            indices[clave] = i
+    if "nombre" not in indices:
+        raise ValueError("El archivo no tiene la columna 'nombre'.")
+    return indices
+
+
+def _texto(valores, indices, columna):
+    i = indices.get(columna)
+    v = valores[i] if i is not None and i < len(valores) else None
+    if isinstance(v, float) and v.is_integer():
+        v = int(v)
+    return "" if v is None else str(v).strip()
+
+
+def _numero(texto, tipo, columna):
+    if not texto:
+        return None
+    try:
+        if tipo is int:
+            n = float(texto)
+            if not n.is_integer():
+                raise ValueError
+            n = int(n)
+        else:
+            n = float(_decimal(texto))
+    except ValueError:
+        raise ValueError(f"{columna} inválido: {texto!r}.")
+    if n < 0:
+        raise ValueError(f"{columna} no puede ser negativo.")
+    return n
+
+
+def _decimal(texto):
+    # Con punto y coma a la vez, el último es el decimal y el otro separa miles
+    # ("1.234,50" o "1,234.50"). Una coma sola es decimal si no se repite.
+    coma, punto = texto.rfind(","), texto.rfind(".")
+    if coma >= 0 and punto >= 0:
+        miles, decimal = (".", ",") if coma > punto else (",", ".")
+        entero, _sep, fraccion = texto.rpartition(decimal)
+        if miles in fraccion or not _miles_validos(entero.split(miles)):
+            raise ValueError
+        return entero.replace(miles, "") + "." + fraccion
+    if texto.count(",") > 1 or texto.count(".") > 1:
+        raise ValueError
+    return texto.replace(",", ".")
+
+
+def _miles_validos(grupos):
+    return grupos[0].lstrip("-").isdigit() and all(len(g) == 3 and g.isdigit() for g in grupos[1:])
+
+
+def _producto(valores, indices):
+    nombre = _texto(valores, indices, "nombre")
+    if not nombre:
+        raise ValueError("Falta el nombre.")
+    if len(nombre) > 80:
+        raise ValueError("El nombre es demasiado largo (máx. 80).")
+    categoria = _texto(valores, indices, "categoria")
+    if len(categoria) > 40:
+        raise ValueError("La categoría es demasiado larga (máx. 40).")
+    return (
+        nombre,
+        categoria or None,
+        _numero(_texto(valores, indices, "stock"), int, "Stock"),
+        _numero(_texto(valores, indices, "precio"), float, "Precio"),
+        _texto(valores, indices, "codigo") or None,
+        _numero(_texto(valores, indices, "punto_reorden"), int, "Punto de reorden"),
+    )
+
+
+def _servicio(valores, indices):
+    nombre = _texto(valores, indices, "nombre")
+    if not nombre:
+        raise ValueError("Falta el nombre.")
+    precio = _numero(_texto(valores, indices, "precio"), float, "Precio")
+    if precio is None:
+        raise ValueError("Falta el precio.")
+    return nombre, precio
+
+
+def _lotes(filas, indices, convertir, errores):
+    lote = []
+    for linea, valores in filas:
+        if all(v is None or str(v).strip() == "" for v in valores):
+            continue
+        try:
+            lote.append((linea,) + convertir(valores, indices))
+        except ValueError as e:
+            if len(errores) < MAX_ERRORES:
+                errores.append((linea, str(e)))
+        if len(lote) >= TAMANO_LOTE:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+def _importar(ruta, columnas, convertir, guardar):
+    filas = _filas_archivo(ruta)
+    _linea, encabezado = next(filas, (0, []))
+    indices = _indices(encabezado, columnas)
+    errores = []
+    creados, actualizados, rechazados = guardar(_lotes(filas, indices, convertir, errores))
+    return creados, actualizados, sorted(errores + rechazados)[:MAX_ERRORES]
+
+
+def importar_productos(sede_id, ruta, usuario=None):
+    """Devuelve (creados, actualizados, errores); errores es una lista de (línea, mensaje)."""
+    return _importar(ruta, COLUMNAS_PRODUCTOS, _producto,
+                     lambda lotes: db.importar_productos(sede_id, lotes, usuario))
+
+
+def importar_servicios(sede_id, ruta):
+    return _importar(ruta, COLUMNAS_SERVICIOS, _servicio,
+                     lambda lotes: db.importar_servicios(sede_id, lotes))
+
+
+def _escribir(ruta, encabezado, filas):
+    n = 0
+    if es_excel(ruta):
+        if openpyxl is None:
+            raise ValueError("Para exportar a Excel instala openpyxl, o elige CSV.")
+        libro = openpyxl.Workbook(write_only=True)
+        hoja = libro.create_sheet()
+        hoja.append(list(encabezado))
+        for fila in filas:
+            hoja.append(list(fila))
+            n += 1
+        libro.save(ruta)
+        return n
+
+    # utf-8-sig para que Excel abra bien las tildes.
+    with open(ruta, "w", newline="", encoding="utf-8-sig") as f:
+        escritor = csv.writer(f)
+        escritor.writerow(encabezado)
+        for fila in filas:
+            escritor.writerow(fila)
+            n += 1
+    return n
+
+
+def exportar_productos(sede_id, ruta):
+    return _escribir(ruta, COLUMNAS_PRODUCTOS, db.iterar_inventario(sede_id))
+
+
+def exportar_servicios(sede_id, ruta):
+    return _escribir(ruta, COLUMNAS_SERVICIOS,
+                     ((nombre, precio) for _id, nombre, precio in db.listar_servicios(sede_id)))
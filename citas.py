@@ -10,7 +10,10 @@ except Exception:
     Calendar = None
 
 import db
+import agenda
+import tareas
 import factura_html
+from semana import SemanaWindow
 
 BG_PRIMARY = "#fff5f7"
 BG_SECONDARY = "#f3d6dc"
@@ -54,16 +57,6 @@ def _apply_ttk_styles(root: tk.Misc):
     style.configure("Soft.TCombobox", padding=8)
 
 
-def _t2m(hhmm: str):
-    s = (hhmm or "").strip()
-    if len(s) != 5 or s[2] != ":":
-        return None
-    try:
-        return int(s[:2]) * 60 + int(s[3:])
-    except Exception:
-        return None
-
-
 def _m2t(minutes: int):
     h = minutes // 60
     m = minutes % 60
@@ -81,7 +74,7 @@ def _inicios():
 
 
 def _fines_desde(inicio_hhmm: str):
-    m0 = _t2m(inicio_hhmm)
+    m0 = db.a_minutos(inicio_hhmm)
     if m0 is None:
         return []
     vals = []
@@ -94,10 +87,7 @@ def _fines_desde(inicio_hhmm: str):
 
 
 INICIOS = _inicios()
-
-
-def _overlap(a0, a1, b0, b1):
-    return a0 < b1 and b0 < a1
+DIAS_PRECARGA = 7
 
 
 def _listar_servicios_safe(sede_id):
@@ -107,75 +97,11 @@ def _listar_servicios_safe(sede_id):
         return []
 
 
-def _listar_empleadas_safe(sede_id):
-    for intento in (
-        lambda: db.listar_empleadas(sede_id),
-        lambda: db.listar_empleadas(sede_id, True),
-        lambda: db.listar_empleadas(sede_id, solo_activas=True),
-        lambda: db.listar_empleadas(sede_id, solo_activas=1),
-    ):
-        try:
-            rows = intento()
-            if rows is None:
-                continue
-            return rows
-        except Exception:
-            continue
-    return []
-
-
-def _citas_del_dia(sede_id, fecha_iso):
-    try:
-        return db.listar_citas(sede_id, fecha_iso) or []
-    except Exception:
-        return []
-
-
-def _norm_empleadas(rows):
-    out = []
-    for r in rows or []:
-        try:
-            if isinstance(r, (list, tuple)):
-                if len(r) >= 2:
-                    nombre = r[1]
-                else:
-                    nombre = r[0]
-            else:
-                nombre = r
-            nombre = (nombre or "").strip()
-            if nombre:
-                out.append(nombre)
-        except Exception:
-            pass
-    return out
-
-
-def _cita_unpack(row):
-    cid = None
-    inicio = ""
-    fin = ""
-    empleada = ""
-
-    if not isinstance(row, (list, tuple)) or len(row) < 1:
-        return cid, inicio, fin, empleada
-
+def _disponibilidad(sede_id, fecha_iso):
     try:
-        cid = int(row[0])
+        return agenda.disponibilidad(sede_id, fecha_iso)
     except Exception:
-        cid = None
-
-    if len(row) >= 5:
-        inicio = (row[3] or "").strip()
-        fin = (row[4] or "").strip()
-    elif len(row) >= 4:
-        inicio = (row[3] or "").strip()
-
-    if len(row) >= 7:
-        empleada = (row[6] or "").strip()
-    elif len(row) == 6:
-        empleada = (row[5] or "").strip()
-
-    return cid, inicio, fin, empleada
+        return agenda.Disponibilidad([], [])
 
 
 def _empleadas_disponibles_intervalo(sede_id, fecha_iso, inicio, fin, excluir_cid=None):
@@ -187,43 +113,7 @@ def _empleadas_disponibles_intervalo(sede_id, fecha_iso, inicio, fin, excluir_ci
     if fin not in _fines_desde(inicio):
         return []
 
-    n0 = _t2m(inicio)
-    n1 = _t2m(fin)
-    if n0 is None or n1 is None or n1 <= n0:
-        return []
-
-    emp_rows = _listar_empleadas_safe(sede_id)
-    empleadas = _norm_empleadas(emp_rows)
-    if not empleadas:
-        return []
-
-    citas = _citas_del_dia(sede_id, fecha_iso)
-    libres = []
-
-    for emp in empleadas:
-        ok = True
-        for row in citas:
-            cid, cinicio, cfin, cemp = _cita_unpack(row)
-            if excluir_cid is not None and cid is not None and int(cid) == int(excluir_cid):
-                continue
-
-            if (cemp or "").strip().lower() != (emp or "").strip().lower():
-                continue
-
-            c0 = _t2m(cinicio)
-            c1 = _t2m(cfin)
-
-            if c0 is None or c1 is None:
-                continue
-
-            if _overlap(n0, n1, c0, c1):
-                ok = False
-                break
-
-        if ok:
-            libres.append(emp)
-
-    return libres
+    return _disponibilidad(sede_id, fecha_iso).libres(inicio, fin, excluir_cid)
 
 
 class ConfirmDialog(tk.Toplevel):
@@ -372,6 +262,10 @@ class FacturaDatosDialog(tk.Toplevel):
         self.destroy()
 
 class SearchableDropdown(tk.Frame):
+    ESPERA_MS = 120
+    MAX_OPCIONES = 100
+    _TECLAS_SIN_TEXTO = {"Return", "KP_Enter", "Escape", "Up", "Down", "Tab", "Shift_L", "Shift_R"}
+
     def __init__(self, parent, var, values, on_pick=None):
         super().__init__(parent, bg=BG_CARDS)
         self.var = var
@@ -379,6 +273,9 @@ class SearchableDropdown(tk.Frame):
         self.on_pick = on_pick
         self.popup = None
         self.listbox = None
+        self._pendiente = None
+        self._ultimo = ("", self.values_all)
+        self._mostrados = None
 
         self.entry = tk.Entry(self, textvariable=self.var, relief="flat", bg=BG_PRIMARY, fg=TEXT, font=("Segoe UI", 11))
         self.entry.pack(side="left", fill="x", expand=True, ipady=12)
@@ -433,6 +330,7 @@ class SearchableDropdown(tk.Frame):
         self.listbox.focus_set()
 
     def _close(self):
+        self._mostrados = None
         if self.popup:
             try:
                 self.popup.destroy()
@@ -445,20 +343,37 @@ class SearchableDropdown(tk.Frame):
         t = (self.var.get() or "").strip().lower()
         if not t:
             return self.values_all
-        return [v for v in self.values_all if t in (v or "").lower()]
+        # Si el texto alarga al anterior, se filtra sobre lo que ya coincidía.
+        previo, coincidencias = self._ultimo
+        base = coincidencias if previo and t.startswith(previo) else self.values_all
+        vals = [v for v in base if t in (v or "").lower()]
+        self._ultimo = (t, vals)
+        return vals
 
     def _refresh(self):
         if not self.listbox:
             return
-        vals = self._filtered()
+        vals = self._filtered()[:self.MAX_OPCIONES]
+        if vals == self._mostrados:
+            return
+        self._mostrados = vals
         self.listbox.delete(0, "end")
-        for v in vals:
-            self.listbox.insert("end", v)
         if vals:
+            self.listbox.insert("end", *vals)
             self.listbox.selection_set(0)
             self.listbox.activate(0)
 
     def _on_type(self, e=None):
+        if e is not None and e.keysym in self._TECLAS_SIN_TEXTO:
+            return
+        if self._pendiente:
+            self.after_cancel(self._pendiente)
+        self._pendiente = self.after(self.ESPERA_MS, self._filtrar_escrito)
+
+    def _filtrar_escrito(self):
+        self._pendiente = None
+        if not self.winfo_exists():
+            return
         self._open()
         self._refresh()
 
@@ -481,28 +396,19 @@ class CitaDialog(tk.Toplevel):
     def __init__(self, parent, sede_id, fecha_iso, user_role="dependiente", cid=None, prefill=None):
         super().__init__(parent)
         self.result = None
+        self.repeticion = None
         self.sede_id = int(sede_id)
         self.fecha_iso = fecha_iso
         self.user_role = user_role
         self.cid = cid
 
-        try:
-            db.crear_tabla_citas()
-            db.asegurar_columnas_citas()
-            db.crear_tabla_servicios()
-            db.seed_servicios()
-            db.crear_tabla_empleadas()
-            db.seed_empleadas()
-        except Exception:
-            pass
-
         self.title("Cita")
         self.configure(bg=BG_PRIMARY)
         self.resizable(False, False)
         self.transient(parent)
         self.grab_set()
 
-        w, h = 820, 660
+        w, h = 820, 660 if cid else 730
         sw = self.winfo_screenwidth()
         sh = self.winfo_screenheight()
         self.geometry(f"{w}x{h}+{(sw-w)//2}+{(sh-h)//2}")
@@ -606,6 +512,22 @@ class CitaDialog(tk.Toplevel):
         self.lbl_info = tk.Label(inner, text="", bg=BG_CARDS, fg=TEXT_MUTED, font=("Segoe UI", 10, "bold"))
         self.lbl_info.grid(row=7, column=0, columnspan=2, sticky="w", pady=(18, 0))
 
+        self.v_repetir = tk.StringVar(value="No repetir")
+        self.v_veces = tk.StringVar(value="4")
+        if not cid:
+            rep_row = tk.Frame(inner, bg=BG_CARDS)
+            rep_row.grid(row=8, column=0, columnspan=2, sticky="w", pady=(14, 0))
+            tk.Label(rep_row, text="Repetir", bg=BG_CARDS, fg=TEXT_MUTED, font=("Segoe UI", 10, "bold")).pack(side="left")
+            ttk.Combobox(
+                rep_row, textvariable=self.v_repetir, state="readonly", style="Soft.TCombobox", width=12,
+                values=["No repetir"] + list(agenda.REGLAS_REPETICION)
+            ).pack(side="left", padx=(10, 14))
+            tk.Label(rep_row, text="Veces", bg=BG_CARDS, fg=TEXT_MUTED, font=("Segoe UI", 10, "bold")).pack(side="left")
+            tk.Spinbox(
+                rep_row, from_=2, to=52, textvariable=self.v_veces, width=5, relief="flat",
+                bg=BG_PRIMARY, fg=TEXT, font=("Segoe UI", 11)
+            ).pack(side="left", padx=(10, 0), ipady=6)
+
         actions = tk.Frame(wrap, bg=BG_PRIMARY)
         actions.pack(fill="x", pady=(12, 0))
         actions.grid_columnconfigure(0, weight=1)
@@ -643,7 +565,7 @@ class CitaDialog(tk.Toplevel):
         e_cliente.focus_set()
 
     def _refresh_empleadas(self):
-        todas = _norm_empleadas(_listar_empleadas_safe(self.sede_id))
+        todas = _disponibilidad(self.sede_id, self.fecha_iso).empleadas
         libres = _empleadas_disponibles_intervalo(
             self.sede_id, self.fecha_iso, self.v_inicio.get(), self.v_fin.get(), excluir_cid=self.cid
         )
@@ -709,6 +631,7 @@ class CitaDialog(tk.Toplevel):
                 return
             try:
                 db.agregar_empleada(self.sede_id, nombre)
+                agenda.invalidar_sede(self.sede_id)
                 top.destroy()
                 self._refresh_empleadas()
                 vals = list(self.cb_empleada["values"] or [])
@@ -763,7 +686,9 @@ class CitaDialog(tk.Toplevel):
             messagebox.showwarning("Validación", "Precio inválido.")
             return
 
-        todas = _norm_empleadas(_listar_empleadas_safe(self.sede_id))
+        # Otra caja pudo reservar mientras el diálogo estaba abierto.
+        agenda.invalidar(self.sede_id, self.fecha_iso)
+        todas = _disponibilidad(self.sede_id, self.fecha_iso).empleadas
         libres = _empleadas_disponibles_intervalo(self.sede_id, self.fecha_iso, inicio, fin, excluir_cid=self.cid)
 
         if todas and not libres:
@@ -774,6 +699,17 @@ class CitaDialog(tk.Toplevel):
             messagebox.showwarning("Validación", "La empleada no está disponible en ese horario.")
             return
 
+        regla = self.v_repetir.get()
+        if not self.cid and regla in agenda.REGLAS_REPETICION:
+            try:
+                veces = int(self.v_veces.get())
+            except ValueError:
+                veces = 0
+            if not 2 <= veces <= 52:
+                messagebox.showwarning("Validación", "Repeticiones: entre 2 y 52.")
+                return
+            self.repeticion = (regla, veces)
+
         self.result = (cliente, servicio, inicio, fin, precio, empleada)
         self.destroy()
 
@@ -785,16 +721,6 @@ class CitasFrame(tk.Frame):
         self.user_role = user_role
         _apply_ttk_styles(self)
 
-        try:
-            db.crear_tabla_citas()
-            db.asegurar_columnas_citas()
-            db.crear_tabla_servicios()
-            db.seed_servicios()
-            db.crear_tabla_empleadas()
-            db.seed_empleadas()
-        except Exception:
-            pass
-
         wrapper = tk.Frame(self, bg=BG_PRIMARY)
         wrapper.pack(fill="both", expand=True, padx=14, pady=14)
 
@@ -869,9 +795,34 @@ class CitasFrame(tk.Frame):
 
             self.cal.selection_set(hoy)
             self.cal.pack(padx=12, pady=12, anchor="n")
-            tk.Frame(left_card, bg=BG_CARDS).pack(fill="both", expand=True)
             self.cal.bind("<<CalendarSelected>>", lambda e: self._cargar())
 
+        prox = tk.Frame(left_card, bg=BG_CARDS)
+        prox.pack(fill="both", expand=True, padx=12, pady=(0, 12))
+        tk.Label(prox, text="Próximo disponible", bg=BG_CARDS, fg=TEXT, font=("Segoe UI", 11, "bold")).pack(anchor="w")
+
+        fila = tk.Frame(prox, bg=BG_CARDS)
+        fila.pack(fill="x", pady=(6, 6))
+        self.v_duracion = tk.StringVar(value="60 min")
+        ttk.Combobox(
+            fila, textvariable=self.v_duracion, state="readonly", width=10, style="Soft.TCombobox",
+            values=[f"{m} min" for m in range(30, 181, 30)]
+        ).pack(side="left")
+        tk.Button(
+            fila, text="BUSCAR", bg=BUTTONS, fg=TEXT_BTN, bd=0, cursor="hand2",
+            font=("Segoe UI", 10, "bold"), activebackground=BUTTONS_HOVER, command=self._buscar_huecos
+        ).pack(side="left", padx=(8, 0), ipadx=10, ipady=6)
+
+        self.tree_huecos = ttk.Treeview(
+            prox, columns=("Fecha", "Hora", "Empleada"), show="headings", style="Soft.Treeview", height=8
+        )
+        for col, ancho in (("Fecha", 90), ("Hora", 60), ("Empleada", 100)):
+            self.tree_huecos.heading(col, text=col)
+            self.tree_huecos.column(col, width=ancho, anchor="center")
+        self.tree_huecos.pack(fill="both", expand=True)
+        self.tree_huecos.bind("<Double-1>", lambda e: self._usar_hueco())
+        self._huecos = {}
+
         top_r = tk.Frame(right_card, bg=BG_CARDS)
         top_r.pack(fill="x", padx=8, pady=(8, 4))
         self.badge = tk.Label(top_r, text="", bg=BG_CARDS, fg=TEXT_MUTED, font=("Segoe UI", 10, "bold"))
@@ -893,13 +844,15 @@ class CitasFrame(tk.Frame):
         self.btn_editar = mk_btn("EDITAR", self._editar)
         self.btn_atender = mk_btn("ATENDER / FACTURAR", self._atender_facturar, primary=True)
         self.btn_cancelar = mk_btn("CANCELAR", self._cancelar, primary=False)
-        self.btn_recargar = mk_btn("RECARGAR", self._cargar)
+        self.btn_recargar = mk_btn("RECARGAR", lambda: self._cargar(forzar=True))
+        self.btn_semana = mk_btn("SEMANA", self._abrir_semana)
 
         self.btn_nueva.pack(side="left", padx=(0, 10), ipady=10, ipadx=18)
         self.btn_editar.pack(side="left", padx=(0, 10), ipady=10, ipadx=18)
         self.btn_atender.pack(side="left", padx=(0, 10), ipady=10, ipadx=18)
         self.btn_cancelar.pack(side="left", padx=(0, 10), ipady=10, ipadx=18)
-        self.btn_recargar.pack(side="left", ipady=10, ipadx=18)
+        self.btn_recargar.pack(side="left", padx=(0, 10), ipady=10, ipadx=18)
+        self.btn_semana.pack(side="left", ipady=10, ipadx=18)
 
         self.tree = ttk.Treeview(
             right_card,
@@ -930,6 +883,7 @@ class CitasFrame(tk.Frame):
         self.tree.bind("<<TreeviewSelect>>", lambda e: self._sync_actions())
 
         self.cache = {}
+        self._seleccionar_al_cargar = None
         self._cargar()
         self._sync_actions()
 
@@ -968,19 +922,39 @@ class CitasFrame(tk.Frame):
             return str(self.cal.get_date()).strip()[:10]
         return date.today().isoformat()
 
-    def _cargar(self):
+    def _cargar(self, forzar=False):
         fecha = self._fecha()
+        if forzar:
+            agenda.dias.invalidar(self.sede_id, fecha)
+
+        filas = agenda.dias.obtener(self.sede_id, fecha)
+        if filas is not None:
+            self._mostrar(fecha, filas)
+            self._precargar(fecha)
+            return
+
+        fmin, fmax = agenda.ventana(fecha, DIAS_PRECARGA)
+        tareas.ejecutar(self, "citas", lambda: agenda.dias.cargar_rango(self.sede_id, fmin, fmax)[fecha],
+                        lambda rows: self._mostrar_si_vigente(fecha, rows),
+                        lambda e: (messagebox.showerror("Error", str(e)), self._mostrar_si_vigente(fecha, [])))
+
+    def _mostrar_si_vigente(self, fecha, rows):
+        # Si mientras cargaba se eligió otro día (quizá ya en caché), no se pisa.
+        if fecha == self._fecha():
+            self._mostrar(fecha, rows)
 
+    def _precargar(self, fecha):
+        # Trae en segundo plano, con una sola consulta, los días vecinos que falten.
+        faltan = agenda.dias.faltantes(self.sede_id, agenda.fechas_entre(*agenda.ventana(fecha, DIAS_PRECARGA)))
+        if faltan:
+            tareas.ejecutar(self, "precarga", lambda: agenda.dias.cargar_rango(self.sede_id, faltan[0], faltan[-1]),
+                            lambda _r: None, lambda _e: None)
+
+    def _mostrar(self, fecha, rows):
         for i in self.tree.get_children():
             self.tree.delete(i)
         self.cache = {}
 
-        try:
-            rows = db.listar_citas(self.sede_id, fecha) or []
-        except Exception as e:
-            rows = []
-            messagebox.showerror("Error", str(e))
-
         self.badge.config(text=f"Fecha: {fecha}")
 
         for row in rows:
@@ -1022,15 +996,59 @@ class CitasFrame(tk.Frame):
             except Exception:
                 pass
 
+        if self._seleccionar_al_cargar and self.tree.exists(self._seleccionar_al_cargar):
+            self.tree.selection_set(self._seleccionar_al_cargar)
+            self.tree.see(self._seleccionar_al_cargar)
+        self._seleccionar_al_cargar = None
         self._sync_actions()
 
+    def _abrir_semana(self):
+        SemanaWindow(self.winfo_toplevel(), self.sede_id, self._fecha(), al_elegir=self._ir_a)
+
+    def _ir_a(self, fecha, cid):
+        if self.cal:
+            self.cal.selection_set(date.fromisoformat(fecha))
+        self._seleccionar_al_cargar = str(cid)
+        self._cargar()
+
     def _sel_id(self):
         sel = self.tree.selection()
         return int(sel[0]) if sel else None
 
-    def _nueva(self):
-        fecha = self._fecha()
-        dlg = CitaDialog(self.winfo_toplevel(), self.sede_id, fecha, self.user_role, cid=None, prefill=None)
+    def _duracion(self):
+        try:
+            return int((self.v_duracion.get() or "60").split()[0])
+        except ValueError:
+            return 60
+
+    def _buscar_huecos(self):
+        duracion = self._duracion()
+        tareas.ejecutar(self, "huecos", lambda: agenda.proximos_huecos(self.sede_id, duracion),
+                        self._mostrar_huecos)
+
+    def _mostrar_huecos(self, huecos):
+        for i in self.tree_huecos.get_children():
+            self.tree_huecos.delete(i)
+        self._huecos = {}
+        for n, (_sid, fecha, inicio, empleada) in enumerate(huecos):
+            self._huecos[str(n)] = (fecha, inicio, empleada)
+            self.tree_huecos.insert("", "end", iid=str(n), values=(fecha, inicio, empleada))
+
+    def _usar_hueco(self):
+        sel = self.tree_huecos.selection()
+        if not sel or sel[0] not in self._huecos:
+            return
+        fecha, inicio, empleada = self._huecos[sel[0]]
+        bloques = -(-self._duracion() // agenda.PASO)
+        fin = agenda.a_hora(db.a_minutos(inicio) + bloques * agenda.PASO)
+        if self.cal:
+            self.cal.selection_set(date.fromisoformat(fecha))
+        if self._nueva(fecha, {"inicio": inicio, "fin": fin, "empleada": empleada}):
+            self._buscar_huecos()
+
+    def _nueva(self, fecha=None, prefill=None):
+        fecha = fecha or self._fecha()
+        dlg = CitaDialog(self.winfo_toplevel(), self.sede_id, fecha, self.user_role, cid=None, prefill=prefill)
         self.winfo_toplevel().wait_window(dlg)
 
         if not dlg.result:
@@ -1046,18 +1064,32 @@ class CitasFrame(tk.Frame):
                 break
 
         try:
-            try:
-                db.insertar_cita(
+            if dlg.repeticion:
+                fechas = agenda.fechas_recurrentes(fecha, *dlg.repeticion)
+                creadas, conflictos = db.reservar_citas_recurrentes(
+                    self.sede_id, fechas, cliente, servicio, inicio, fin,
+                    servicio_id=sid, servicio_nombre=sn, precio=float(precio), empleada=empleada
+                )
+                if conflictos:
+                    detalle = "\n".join(f"{f}: ocupada de {i} a {fi}" for f, i, fi in conflictos)
+                    messagebox.showinfo(
+                        "Citas recurrentes",
+                        f"Se crearon {len(creadas)} de {len(fechas)} citas.\n\n{empleada} no está libre en:\n{detalle}"
+                    )
+            else:
+                db.reservar_cita(
                     self.sede_id, fecha, cliente, servicio, inicio, fin,
                     servicio_id=sid, servicio_nombre=sn, precio=float(precio), empleada=empleada
                 )
-            except TypeError:
-                db.insertar_cita(self.sede_id, fecha, cliente, servicio, inicio, fin, sid, sn, float(precio), empleada)
+        except ValueError as e:
+            messagebox.showwarning("Cita", str(e))
+            return
         except Exception as e:
             messagebox.showerror("Error", str(e))
             return
 
         self._cargar()
+        return True
 
     def _editar(self):
         cid = self._sel_id()
@@ -1066,13 +1098,22 @@ class CitasFrame(tk.Frame):
             return
 
         fecha = self._fecha()
-        prefill = self.cache.get(cid)
-        if prefill and str(prefill.get('estado','')).upper() == 'ATENDIDA':
+        if self.cache.get(cid):
+            self._editar_cita(cid, fecha)
+            return
+
+        def listo(rows):
+            self._mostrar_si_vigente(fecha, rows)
+            if fecha == self._fecha():
+                self._editar_cita(cid, fecha)
+
+        tareas.ejecutar(self, "citas", lambda: db.listar_citas(self.sede_id, fecha) or [], listo)
+
+    def _editar_cita(self, cid, fecha):
+        prefill = self.cache.get(cid, {})
+        if str(prefill.get('estado', '')).upper() == 'ATENDIDA':
             messagebox.showinfo('Cita', 'Esta cita ya fue atendida y no se puede editar.')
             return
-        if not prefill:
-            self._cargar()
-            prefill = self.cache.get(cid, {})
 
         dlg = CitaDialog(self.winfo_toplevel(), self.sede_id, fecha, self.user_role, cid=cid, prefill=prefill)
         self.winfo_toplevel().wait_window(dlg)
@@ -1090,13 +1131,13 @@ class CitasFrame(tk.Frame):
                 break
 
         try:
-            try:
-                db.actualizar_cita(
-                    cid, cliente, servicio, inicio, fin,
-                    servicio_id=sid, servicio_nombre=sn, precio=float(precio), empleada=empleada
-                )
-            except TypeError:
-                db.actualizar_cita(cid, cliente, servicio, inicio, fin, sid, sn, float(precio), empleada)
+            db.reservar_cita(
+                self.sede_id, fecha, cliente, servicio, inicio, fin,
+                servicio_id=sid, servicio_nombre=sn, precio=float(precio), empleada=empleada, cid=cid
+            )
+        except ValueError as e:
+            messagebox.showwarning("Cita", str(e))
+            return
         except Exception as e:
             messagebox.showerror("Error", str(e))
             return
@@ -1,37 +1,365 @@
+import difflib
+import math
+import re
 import sqlite3
+import threading
+import unicodedata
+from contextlib import contextmanager
+from datetime import date, timedelta
 
 DB_FILE = "salon.db"
 
+# Perfil aplicado a cada conexión nueva. WAL deja que Reportes/Búsqueda lean
+# mientras una caja escribe; busy_timeout espera en lugar de fallar con
+# "database is locked". Se puede ajustar antes de abrir la primera conexión.
+PRAGMAS = {
+    "busy_timeout": 5000,
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -16000,
+    "mmap_size": 64 * 1024 * 1024,
+    "temp_store": "MEMORY",
+    "wal_autocheckpoint": 1000,
+    "foreign_keys": "ON",
+}
+
+# Una conexión por hilo, abierta una sola vez y reutilizada por todos los helpers.
+_local = threading.local()
+_conexiones = []
+_conexiones_lock = threading.Lock()
+
+
+def _conectar(path):
+    conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+    for nombre, valor in PRAGMAS.items():
+        try:
+            conn.execute(f"PRAGMA {nombre} = {valor}")
+        except sqlite3.OperationalError:
+            # journal_mode no se puede cambiar si otra conexión tiene el archivo bloqueado;
+            # WAL es persistente, así que basta con que alguna conexión lo haya fijado.
+            pass
+    return conn
+
 def get_connection():
-    conn = sqlite3.connect(DB_FILE)
-    conn.execute("PRAGMA foreign_keys = ON")
+    conn = getattr(_local, "conn", None)
+    if conn is not None and _local.path == DB_FILE:
+        return conn
+    if conn is not None:
+        cerrar_conexion()
+    conn = _conectar(DB_FILE)
+    _local.conn = conn
+    _local.path = DB_FILE
+    _local.nivel = 0
+    with _conexiones_lock:
+        _conexiones.append(conn)
     return conn
 
+@contextmanager
+def transaccion(modo="IMMEDIATE"):
+    conn = get_connection()
+    if _local.nivel > 0:
+        # Transacción anidada: se une a la exterior, que es la que hace commit/rollback.
+        _local.nivel += 1
+        try:
+            yield conn.cursor()
+        finally:
+            _local.nivel -= 1
+        return
+    # IMMEDIATE toma el lock de escritura al empezar: con WAL evita el SQLITE_BUSY
+    # sin reintento que ocurre al promover una transacción de lectura a escritura.
+    conn.execute(f"BEGIN {modo}")
+    _local.nivel = 1
+    try:
+        yield conn.cursor()
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        _local.nivel = 0
+
+def cerrar_conexion():
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        return
+    with _conexiones_lock:
+        if conn in _conexiones:
+            _conexiones.remove(conn)
+    try:
+        conn.close()
+    except Exception:
+        pass
+    _local.conn = None
+    _local.path = None
+    _local.nivel = 0
+
+def checkpoint(modo="PASSIVE"):
+    cur = get_connection().cursor()
+    cur.execute(f"PRAGMA wal_checkpoint({modo})")
+    return cur.fetchone()
+
+def cerrar_conexiones():
+    with _conexiones_lock:
+        conns = list(_conexiones)
+        _conexiones.clear()
+    for conn in conns:
+        try:
+            conn.close()
+        except Exception:
+            pass
+    _local.conn = None
+    _local.path = None
+    _local.nivel = 0
+
+# -------------------------- ESQUEMA / MIGRACIONES --------------------------
+
+def _columnas(cur, tabla):
+    cur.execute(f"PRAGMA table_info({tabla})")
+    return {c[1] for c in cur.fetchall()}
+
+def _migracion_1(cur):
+    # Esquema base. Es idempotente para poder adoptar bases creadas antes de
+    # que existiera user_version (todas llegan aquí con versión 0).
+    _crear_tabla_users(cur)
+    _asegurar_columnas_users(cur)
+    _crear_tabla_sedes(cur)
+    _crear_tabla_categorias_inventario(cur)
+    _crear_tabla_inventario(cur)
+    _asegurar_columnas_inventario(cur)
+    _crear_tabla_ventas(cur)
+    _crear_tabla_servicios(cur)
+    _crear_tabla_citas(cur)
+    _asegurar_columnas_citas(cur)
+    _crear_tabla_empleadas(cur)
+    _ensure_sedes_iniciales(cur)
+    _seed_servicios(cur)
+    _seed_empleadas(cur)
+
+def _migracion_2(cur):
+    # Índices para las consultas calientes: citas del día por sede, inventario
+    # por sede ordenado por nombre, ventas por rango de fecha y servicios por sede.
+    # Los de producto_id/categoria_id evitan recorrer tablas en los ON DELETE.
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_citas_sede_fecha_inicio ON citas(sede_id, fecha, inicio)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_inventario_sede_nombre ON inventario(sede_id, nombre)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_inventario_categoria ON inventario(categoria_id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_ventas_fecha ON ventas(fecha)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_ventas_sede_fecha ON ventas(sede_id, fecha)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_ventas_producto ON ventas(producto_id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_servicios_sede_nombre ON servicios(sede_id, nombre)")
+
+def _migracion_3(cur):
+    # Cabecera de venta: agrupa las líneas de un mismo carrito.
+    _crear_tabla_ventas_cabecera(cur)
+    if "cabecera_id" not in _columnas(cur, "ventas"):
+        cur.execute("ALTER TABLE ventas ADD COLUMN cabecera_id INTEGER REFERENCES ventas_cabecera(id) ON DELETE CASCADE")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_ventas_cabecera ON ventas(cabecera_id)")
+
+def _migracion_4(cur):
+    # Datos de factura en la cabecera y descripción congelada en cada línea, para
+    # reimprimir aunque el producto cambie de nombre. Las líneas antiguas sin
+    # cabecera se agrupan por (sede, fecha) exacta, que es como las grababa el
+    # checkout anterior (todas en el mismo segundo).
+    cols = _columnas(cur, "ventas_cabecera")
+    for col in ("nit_receptor", "nombre_receptor", "apellidos_receptor", "factura_path", "factura_autorizacion"):
+        if col not in cols:
+            cur.execute(f"ALTER TABLE ventas_cabecera ADD COLUMN {col} TEXT")
+    if "descripcion" not in _columnas(cur, "ventas"):
+        cur.execute("ALTER TABLE ventas ADD COLUMN descripcion TEXT")
+    cur.execute("""
+        UPDATE ventas
+        SET descripcion = (SELECT nombre FROM inventario WHERE inventario.id = ventas.producto_id)
+        WHERE descripcion IS NULL
+    """)
+    cur.execute("""
+        INSERT INTO ventas_cabecera(sede_id, fecha, items, total)
+        SELECT sede_id, fecha, SUM(cantidad), SUM(total)
+        FROM ventas
+        WHERE cabecera_id IS NULL
+        GROUP BY sede_id, fecha
+    """)
+    cur.execute("""
+        UPDATE ventas
+        SET cabecera_id = (
+            SELECT MAX(h.id) FROM ventas_cabecera h
+            WHERE h.sede_id = ventas.sede_id AND h.fecha = ventas.fecha
+        )
+        WHERE cabecera_id IS NULL
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_ventas_cabecera_sede_fecha ON ventas_cabecera(sede_id, fecha)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_ventas_cabecera_fecha ON ventas_cabecera(fecha)")
+    cur.execute("""
+        CREATE VIEW IF NOT EXISTS venta_items AS
+        SELECT id, cabecera_id, sede_id, producto_id, descripcion, cantidad, precio_unitario, total, fecha
+        FROM ventas
+    """)
+
+def _migracion_5(cur):
+    # Reportes de todas las sedes filtran citas solo por rango de fecha.
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_citas_fecha ON citas(fecha)")
+
+def _migracion_6(cur):
+    _crear_resumen_diario(cur)
+    _reconstruir_resumen_diario(cur)
+
+def _migracion_7(cur):
+    # Horario en minutos para que el choque de citas sea un rango sobre el índice.
+    cols = _columnas(cur, "citas")
+    for col in ("inicio_min", "fin_min"):
+        if col not in cols:
+            cur.execute(f"ALTER TABLE citas ADD COLUMN {col} INTEGER")
+    cur.execute("SELECT id, inicio, fin FROM citas")
+    cur.executemany("UPDATE citas SET inicio_min=?, fin_min=? WHERE id=?",
+                    [(a_minutos(inicio), a_minutos(fin), cid) for cid, inicio, fin in cur.fetchall()])
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_citas_empleada_horario
+        ON citas(sede_id, fecha, empleada COLLATE NOCASE, inicio_min)
+    """)
+
+def _migracion_8(cur):
+    # Día como entero (días desde 1970-01-01): las citas se filtran y ordenan por
+    # (dia, inicio_min) y los índices por texto quedan reemplazados.
+    if "dia" not in _columnas(cur, "citas"):
+        cur.execute("ALTER TABLE citas ADD COLUMN dia INTEGER")
+    cur.execute("UPDATE citas SET dia = CAST(julianday(fecha) - 2440587.5 AS INTEGER) WHERE dia IS NULL")
+    cur.execute("DROP INDEX IF EXISTS idx_citas_sede_fecha_inicio")
+    cur.execute("DROP INDEX IF EXISTS idx_citas_fecha")
+    cur.execute("DROP INDEX IF EXISTS idx_citas_empleada_horario")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_citas_sede_dia ON citas(sede_id, dia, inicio_min)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_citas_dia ON citas(dia, inicio_min)")
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_citas_empleada_horario
+        ON citas(sede_id, dia, empleada COLLATE NOCASE, inicio_min)
+    """)
+
+def _migracion_9(cur):
+    # Índice de texto de productos. Si el sqlite instalado no trae FTS5 la
+    # búsqueda usa LIKE (ver buscar_productos).
+    try:
+        _crear_busqueda_productos(cur)
+    except sqlite3.OperationalError:
+        pass
+
+def _migracion_10(cur):
+    # Código de barras / SKU, único dentro de cada sede cuando está puesto.
+    if "codigo" not in _columnas(cur, "inventario"):
+        cur.execute("ALTER TABLE inventario ADD COLUMN codigo TEXT")
+    cur.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_inventario_sede_codigo
+        ON inventario(sede_id, codigo) WHERE codigo IS NOT NULL
+    """)
+
+def _migracion_11(cur):
+    # Órdenes de la pantalla de inventario (consultar_inventario) sin ordenar en memoria.
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_inventario_sede_nombre_nocase ON inventario(sede_id, nombre COLLATE NOCASE)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_inventario_sede_stock ON inventario(sede_id, stock)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_inventario_sede_precio ON inventario(sede_id, precio)")
+
+def _migracion_12(cur):
+    # Kardex: cada cambio de existencias queda como movimiento. El corte inicial
+    # guarda el stock previo al historial.
+    _crear_tablas_movimientos(cur)
+    cur.execute("SELECT id FROM sedes")
+    for (sid,) in cur.fetchall():
+        _tomar_corte(cur, sid)
+
+def _migracion_13(cur):
+    # Punto de reorden por producto; el índice parcial solo guarda los que están
+    # en o bajo su punto, así la lista de stock bajo no recorre el catálogo.
+    if "punto_reorden" not in _columnas(cur, "inventario"):
+        cur.execute("ALTER TABLE inventario ADD COLUMN punto_reorden INTEGER NOT NULL DEFAULT 5")
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_inventario_stock_bajo
+        ON inventario(sede_id, nombre COLLATE NOCASE) WHERE stock <= punto_reorden
+    """)
+
+def _migracion_14(cur):
+    _crear_tabla_transferencias(cur)
+
+def _migracion_15(cur):
+    # Borrar un producto ya no borra sus líneas de venta: quedan con su
+    # descripción y producto_id NULL, así la cabecera, la factura y el resumen
+    # diario siguen cuadrando. SQLite no cambia una FK en sitio: se rehace la tabla.
+    cur.execute("SELECT seq FROM sqlite_sequence WHERE name='ventas'")
+    row = cur.fetchone()
+    secuencia = int(row[0]) if row else 0
+    cur.execute("DROP VIEW IF EXISTS venta_items")
+    cur.execute("""
+        CREATE TABLE ventas_nueva (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            sede_id INTEGER NOT NULL,
+            producto_id INTEGER,
+            cantidad INTEGER NOT NULL,
+            precio_unitario REAL NOT NULL,
+            total REAL NOT NULL,
+            fecha TEXT NOT NULL DEFAULT (datetime('now','localtime')),
+            cabecera_id INTEGER REFERENCES ventas_cabecera(id) ON DELETE CASCADE,
+            descripcion TEXT,
+            FOREIGN KEY(sede_id) REFERENCES sedes(id) ON DELETE CASCADE,
+            FOREIGN KEY(producto_id) REFERENCES inventario(id) ON DELETE SET NULL
+        )
+    """)
+    cur.execute("""
+        INSERT INTO ventas_nueva(id, sede_id, producto_id, cantidad, precio_unitario, total, fecha,
+                                 cabecera_id, descripcion)
+        SELECT id, sede_id, producto_id, cantidad, precio_unitario, total, fecha, cabecera_id, descripcion
+        FROM ventas
+    """)
+    cur.execute("DROP TABLE ventas")
+    cur.execute("ALTER TABLE ventas_nueva RENAME TO ventas")
+    cur.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name='ventas'", (secuencia,))
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_ventas_fecha ON ventas(fecha)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_ventas_sede_fecha ON ventas(sede_id, fecha)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_ventas_producto ON ventas(producto_id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_ventas_cabecera ON ventas(cabecera_id)")
+    cur.execute("""
+        CREATE VIEW IF NOT EXISTS venta_items AS
+        SELECT id, cabecera_id, sede_id, producto_id, descripcion, cantidad, precio_unitario, total, fecha
+        FROM ventas
+    """)
+    # Los triggers del resumen diario se fueron con la tabla vieja.
+    _crear_resumen_diario(cur)
+
+MIGRACIONES = [
+    _migracion_1,
+    _migracion_2,
+    _migracion_3,
+    _migracion_4,
+    _migracion_5,
+    _migracion_6,
+    _migracion_7,
+    _migracion_8,
+    _migracion_9,
+    _migracion_10,
+    _migracion_11,
+    _migracion_12,
+    _migracion_13,
+    _migracion_14,
+    _migracion_15,
+]
+
+def version_esquema() -> int:
+    cur = get_connection().cursor()
+    cur.execute("PRAGMA user_version")
+    return int(cur.fetchone()[0] or 0)
+
 def init_db():
-    crear_tabla_users()
-    asegurar_columnas_users()
-    crear_tabla_sedes()
-    ensure_sedes_iniciales()
-    crear_tabla_categorias_inventario()
-    crear_tabla_inventario()
-    asegurar_columna_precio()
-    asegurar_columna_categoria_id()
-    crear_tabla_ventas()
-    crear_tabla_servicios()
-    seed_servicios()
-    crear_tabla_citas()
-    asegurar_columnas_citas()
-    crear_tabla_empleadas()
-    seed_empleadas()
+    objetivo = len(MIGRACIONES)
+    if version_esquema() >= objetivo:
+        return
+    with transaccion() as cur:
+        # Se relee con el lock de escritura tomado por si otra caja migró primero.
+        cur.execute("PRAGMA user_version")
+        actual = int(cur.fetchone()[0] or 0)
+        for n in range(actual, objetivo):
+            MIGRACIONES[n](cur)
+            cur.execute(f"PRAGMA user_version = {n + 1}")
 
 def crear_bd_y_tabla():
     init_db()
 
 # -------------------------- USERS / LOGIN --------------------------
 
-def crear_tabla_users():
-    conn = get_connection()
-    cur = conn.cursor()
+def _crear_tabla_users(cur):
     cur.execute("""
         CREATE TABLE IF NOT EXISTS users (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -46,145 +374,98 @@ def crear_tabla_users():
             locked INTEGER NOT NULL DEFAULT 0
         )
     """)
-    conn.commit()
-    conn.close()
 
-def asegurar_columnas_users():
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("PRAGMA table_info(users)")
-    cols = [c[1] for c in cur.fetchall()]
-    try:
-        if "role" not in cols:
-            cur.execute("ALTER TABLE users ADD COLUMN role TEXT NOT NULL DEFAULT 'dependiente'")
-        if "active" not in cols:
-            cur.execute("ALTER TABLE users ADD COLUMN active INTEGER NOT NULL DEFAULT 1")
-        if "failed_attempts" not in cols:
-            cur.execute("ALTER TABLE users ADD COLUMN failed_attempts INTEGER NOT NULL DEFAULT 0")
-        if "locked" not in cols:
-            cur.execute("ALTER TABLE users ADD COLUMN locked INTEGER NOT NULL DEFAULT 0")
-        conn.commit()
-    except Exception:
-        pass
-    conn.close()
+def _asegurar_columnas_users(cur):
+    cols = _columnas(cur, "users")
+    if "role" not in cols:
+        cur.execute("ALTER TABLE users ADD COLUMN role TEXT NOT NULL DEFAULT 'dependiente'")
+    if "active" not in cols:
+        cur.execute("ALTER TABLE users ADD COLUMN active INTEGER NOT NULL DEFAULT 1")
+    if "failed_attempts" not in cols:
+        cur.execute("ALTER TABLE users ADD COLUMN failed_attempts INTEGER NOT NULL DEFAULT 0")
+    if "locked" not in cols:
+        cur.execute("ALTER TABLE users ADD COLUMN locked INTEGER NOT NULL DEFAULT 0")
 
 def usuario_existe(username: str) -> bool:
-    conn = get_connection()
-    cur = conn.cursor()
+    cur = get_connection().cursor()
     cur.execute("SELECT 1 FROM users WHERE username=?", (username,))
-    ok = cur.fetchone() is not None
-    conn.close()
-    return ok
+    return cur.fetchone() is not None
 
 def insertar_usuario(username, first_name, last_name, email, password_hash, role="dependiente"):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("""
-        INSERT INTO users(username, first_name, last_name, email, password_hash, role, active, failed_attempts, locked)
-        VALUES (?,?,?,?,?,?,?,?,?)
-    """, (username, first_name, last_name, email, password_hash, role, 1, 0, 0))
-    conn.commit()
-    conn.close()
+    with transaccion() as cur:
+        cur.execute("""
+            INSERT INTO users(username, first_name, last_name, email, password_hash, role, active, failed_attempts, locked)
+            VALUES (?,?,?,?,?,?,?,?,?)
+        """, (username, first_name, last_name, email, password_hash, role, 1, 0, 0))
 
 def obtener_usuario(username: str):
-    conn = get_connection()
-    cur = conn.cursor()
+    cur = get_connection().cursor()
     cur.execute("""
         SELECT id, username, password_hash, failed_attempts, locked, role, active
         FROM users
         WHERE username=?
     """, (username,))
-    row = cur.fetchone()
-    conn.close()
-    return row
+    return cur.fetchone()
 
 def registrar_fallo(username: str) -> int:
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("UPDATE users SET failed_attempts = failed_attempts + 1 WHERE username=?", (username,))
-    conn.commit()
-    cur.execute("SELECT failed_attempts FROM users WHERE username=?", (username,))
-    fa_row = cur.fetchone()
-    if fa_row and int(fa_row[0]) >= 3:
-        cur.execute("UPDATE users SET locked=1 WHERE username=?", (username,))
-        conn.commit()
-    conn.close()
+    with transaccion() as cur:
+        cur.execute("UPDATE users SET failed_attempts = failed_attempts + 1 WHERE username=?", (username,))
+        cur.execute("SELECT failed_attempts FROM users WHERE username=?", (username,))
+        fa_row = cur.fetchone()
+        if fa_row and int(fa_row[0]) >= 3:
+            cur.execute("UPDATE users SET locked=1 WHERE username=?", (username,))
     return int(fa_row[0]) if fa_row else 0
 
 def reset_intentos(username: str):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("UPDATE users SET failed_attempts=0, locked=0 WHERE username=?", (username,))
-    conn.commit()
-    conn.close()
+    with transaccion() as cur:
+        cur.execute("UPDATE users SET failed_attempts=0, locked=0 WHERE username=?", (username,))
 
 def listar_usuarios():
-    conn = get_connection()
-    cur = conn.cursor()
+    cur = get_connection().cursor()
     cur.execute("""
         SELECT id, username, first_name, last_name, email, role, active, locked
         FROM users
         ORDER BY id ASC
     """)
-    rows = cur.fetchall()
-    conn.close()
-    return rows
+    return cur.fetchall()
 
 def obtener_usuario_por_id(uid: int):
-    conn = get_connection()
-    cur = conn.cursor()
+    cur = get_connection().cursor()
     cur.execute("""
         SELECT id, username, first_name, last_name, email, role, active, locked
         FROM users
         WHERE id=?
     """, (int(uid),))
-    row = cur.fetchone()
-    conn.close()
-    return row
+    return cur.fetchone()
 
 def actualizar_usuario(uid: int, first_name: str, last_name: str, email: str, role: str):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("""
-        UPDATE users
-        SET first_name=?, last_name=?, email=?, role=?
-        WHERE id=?
-    """, (first_name, last_name, email, role, int(uid)))
-    conn.commit()
-    conn.close()
+    with transaccion() as cur:
+        cur.execute("""
+            UPDATE users
+            SET first_name=?, last_name=?, email=?, role=?
+            WHERE id=?
+        """, (first_name, last_name, email, role, int(uid)))
 
 def cambiar_password_usuario(uid: int, password_hash: str):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("UPDATE users SET password_hash=? WHERE id=?", (password_hash, int(uid)))
-    conn.commit()
-    conn.close()
+    with transaccion() as cur:
+        cur.execute("UPDATE users SET password_hash=? WHERE id=?", (password_hash, int(uid)))
 
 def toggle_usuario_activo(uid: int):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT active FROM users WHERE id=?", (int(uid),))
-    row = cur.fetchone()
-    if not row:
-        conn.close()
-        return
-    nuevo = 0 if int(row[0]) == 1 else 1
-    cur.execute("UPDATE users SET active=? WHERE id=?", (nuevo, int(uid)))
-    conn.commit()
-    conn.close()
+    with transaccion() as cur:
+        cur.execute("SELECT active FROM users WHERE id=?", (int(uid),))
+        row = cur.fetchone()
+        if not row:
+            return
+        nuevo = 0 if int(row[0]) == 1 else 1
+        cur.execute("UPDATE users SET active=? WHERE id=?", (nuevo, int(uid)))
 
 def eliminar_usuario(uid: int):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("DELETE FROM users WHERE id=?", (int(uid),))
-    conn.commit()
-    conn.close()
+    with transaccion() as cur:
+        cur.execute("DELETE FROM users WHERE id=?", (int(uid),))
 
 # -------------------------- SEDES --------------------------
 
-def crear_tabla_sedes():
-    conn = get_connection()
-    cur = conn.cursor()
+def _crear_tabla_sedes(cur):
     cur.execute("""
         CREATE TABLE IF NOT EXISTS sedes (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -192,49 +473,40 @@ def crear_tabla_sedes():
             ubicacion TEXT NOT NULL
         )
     """)
-    conn.commit()
-    conn.close()
 
-def ensure_sedes_iniciales():
-    conn = get_connection()
-    cur = conn.cursor()
+def _ensure_sedes_iniciales(cur):
     cur.execute("SELECT COUNT(*) FROM sedes")
     n = int(cur.fetchone()[0] or 0)
     if n == 0:
         cur.execute("INSERT INTO sedes(nombre, ubicacion) VALUES (?, ?)", ("Salon de uñas", "Ubicación"))
         cur.execute("INSERT INTO sedes(nombre, ubicacion) VALUES (?, ?)", ("Salon de cabello", "Ubicación"))
-    conn.commit()
-    conn.close()
 
 def listar_sedes():
-    conn = get_connection()
-    cur = conn.cursor()
+    cur = get_connection().cursor()
     cur.execute("SELECT id, nombre, ubicacion FROM sedes ORDER BY id ASC")
-    rows = cur.fetchall()
-    conn.close()
-    return rows
+    return cur.fetchall()
+
+def listar_sedes_simple():
+    cur = get_connection().cursor()
+    cur.execute("SELECT id, nombre FROM sedes ORDER BY id ASC")
+    return cur.fetchall()
 
 def obtener_sede(sede_id: int):
-    conn = get_connection()
-    cur = conn.cursor()
+    cur = get_connection().cursor()
     cur.execute("SELECT id, nombre, ubicacion FROM sedes WHERE id=?", (int(sede_id),))
-    row = cur.fetchone()
-    conn.close()
-    return row
+    return cur.fetchone()
 
 def insertar_sede(nombre: str, ubicacion: str):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("INSERT INTO sedes(nombre, ubicacion) VALUES (?, ?)", (nombre, ubicacion))
-    conn.commit()
-    conn.close()
+    with transaccion() as cur:
+        cur.execute("INSERT INTO sedes(nombre, ubicacion) VALUES (?, ?)", (nombre, ubicacion))
+        sid = cur.lastrowid
+        # Antes se sembraban en cada init_db(); ahora init_db() no corre si el esquema está al día.
+        _seed_servicios(cur, sid)
+        _seed_empleadas(cur, sid)
 
 def eliminar_sede(sede_id: int):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("DELETE FROM sedes WHERE id=?", (int(sede_id),))
-    conn.commit()
-    conn.close()
+    with transaccion() as cur:
+        cur.execute("DELETE FROM sedes WHERE id=?", (int(sede_id),))
 
 def sede_es_unas(sede_id: int) -> bool:
     row = obtener_sede(sede_id)
@@ -245,9 +517,7 @@ def sede_es_unas(sede_id: int) -> bool:
 
 # -------------------------- CATEGORIAS INVENTARIO --------------------------
 
-def crear_tabla_categorias_inventario():
-    conn = get_connection()
-    cur = conn.cursor()
+def _crear_tabla_categorias_inventario(cur):
     cur.execute("""
         CREATE TABLE IF NOT EXISTS categorias_inventario (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -257,37 +527,27 @@ def crear_tabla_categorias_inventario():
             FOREIGN KEY(sede_id) REFERENCES sedes(id) ON DELETE CASCADE
         )
     """)
-    conn.commit()
-    conn.close()
 
 def listar_categorias_inventario(sede_id: int):
-    conn = get_connection()
-    cur = conn.cursor()
+    cur = get_connection().cursor()
     cur.execute("""
         SELECT id, nombre
         FROM categorias_inventario
         WHERE sede_id=?
         ORDER BY nombre ASC
     """, (int(sede_id),))
-    rows = cur.fetchall()
-    conn.close()
-    return rows
+    return cur.fetchall()
 
 def insertar_categoria_inventario(sede_id: int, nombre: str):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("""
-        INSERT INTO categorias_inventario(sede_id, nombre)
-        VALUES (?, ?)
-    """, (int(sede_id), nombre.strip()))
-    conn.commit()
-    conn.close()
+    with transaccion() as cur:
+        cur.execute("""
+            INSERT INTO categorias_inventario(sede_id, nombre)
+            VALUES (?, ?)
+        """, (int(sede_id), nombre.strip()))
 
 # -------------------------- INVENTARIO --------------------------
 
-def crear_tabla_inventario():
-    conn = get_connection()
-    cur = conn.cursor()
+def _crear_tabla_inventario(cur):
     cur.execute("""
         CREATE TABLE IF NOT EXISTS inventario (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -300,35 +560,16 @@ def crear_tabla_inventario():
             FOREIGN KEY(categoria_id) REFERENCES categorias_inventario(id) ON DELETE SET NULL
         )
     """)
-    conn.commit()
-    conn.close()
 
-def asegurar_columna_precio():
-    conn = get_connection()
-    cur = conn.cursor()
-    try:
+def _asegurar_columnas_inventario(cur):
+    cols = _columnas(cur, "inventario")
+    if "precio" not in cols:
         cur.execute("ALTER TABLE inventario ADD COLUMN precio REAL NOT NULL DEFAULT 0.0")
-        conn.commit()
-    except Exception:
-        pass
-    conn.close()
-
-def asegurar_columna_categoria_id():
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("PRAGMA table_info(inventario)")
-    cols = [c[1] for c in cur.fetchall()]
-    try:
-        if "categoria_id" not in cols:
-            cur.execute("ALTER TABLE inventario ADD COLUMN categoria_id INTEGER")
-            conn.commit()
-    except Exception:
-        pass
-    conn.close()
+    if "categoria_id" not in cols:
+        cur.execute("ALTER TABLE inventario ADD COLUMN categoria_id INTEGER")
 
 def listar_inventario(sede_id: int):
-    conn = get_connection()
-    cur = conn.cursor()
+    cur = get_connection().cursor()
     cur.execute("""
         SELECT i.id, i.nombre, i.stock, i.precio, COALESCE(c.nombre, '') as categoria
         FROM inventario i
@@ -336,60 +577,761 @@ def listar_inventario(sede_id: int):
         WHERE i.sede_id=?
         ORDER BY i.nombre ASC
     """, (int(sede_id),))
-    rows = cur.fetchall()
-    conn.close()
-    return rows
+    return cur.fetchall()
 
-def insertar_producto(sede_id, nombre, stock, precio, categoria_id=None):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("""
-        INSERT INTO inventario(sede_id, nombre, stock, precio, categoria_id)
-        VALUES (?,?,?,?,?)
-    """, (int(sede_id), nombre, int(stock), float(precio), int(categoria_id) if categoria_id else None))
-    conn.commit()
-    conn.close()
+PUNTO_REORDEN = 5
 
-def actualizar_producto(pid, nombre, stock, precio, categoria_id=None):
-    conn = get_connection()
-    cur = conn.cursor()
+def _codigo(codigo):
+    codigo = (codigo or "").strip()
+    return codigo or None
+
+def _guardar_producto(cur, sql, params, codigo):
+    try:
+        cur.execute(sql, params)
+    except sqlite3.IntegrityError:
+        if codigo:
+            raise ValueError(f"Ya existe un producto con el código {codigo} en esta sede.")
+        raise
+
+def insertar_producto(sede_id, nombre, stock, precio, categoria_id=None, codigo=None, usuario=None,
+                      punto_reorden=PUNTO_REORDEN):
+    codigo = _codigo(codigo)
+    with transaccion() as cur:
+        _guardar_producto(cur, """
+            INSERT INTO inventario(sede_id, nombre, stock, precio, categoria_id, codigo, punto_reorden)
+            VALUES (?,?,0,?,?,?,?)
+        """, (int(sede_id), nombre, float(precio), int(categoria_id) if categoria_id else None, codigo,
+              int(punto_reorden)), codigo)
+        pid = cur.lastrowid
+        if int(stock):
+            _mover_stock(cur, sede_id, pid, int(stock), "entrada", usuario)
+    return int(pid)
+
+def actualizar_producto(pid, nombre, stock, precio, categoria_id=None, codigo=None, usuario=None,
+                        punto_reorden=None):
+    codigo = _codigo(codigo)
+    with transaccion() as cur:
+        cur.execute("SELECT sede_id, stock, punto_reorden FROM inventario WHERE id=?", (int(pid),))
+        row = cur.fetchone()
+        if not row:
+            return
+        punto = row[2] if punto_reorden is None else int(punto_reorden)
+        _guardar_producto(cur, """
+            UPDATE inventario
+            SET nombre=?, precio=?, categoria_id=?, codigo=?, punto_reorden=?
+            WHERE id=?
+        """, (nombre, float(precio), int(categoria_id) if categoria_id else None, codigo, punto, int(pid)), codigo)
+        delta = int(stock) - int(row[1] or 0)
+        if delta:
+            _mover_stock(cur, row[0], pid, delta, "ajuste", usuario)
+
+def obtener_producto(pid: int):
+    cur = get_connection().cursor()
     cur.execute("""
-        UPDATE inventario
-        SET nombre=?, stock=?, precio=?, categoria_id=?
+        SELECT id, sede_id, nombre, stock, precio, categoria_id, codigo, punto_reorden
+        FROM inventario
         WHERE id=?
-    """, (nombre, int(stock), float(precio), int(categoria_id) if categoria_id else None, int(pid)))
-    conn.commit()
-    conn.close()
+    """, (int(pid),))
+    return cur.fetchone()
+
+def producto_por_codigo(sede_id: int, codigo: str):
+    """(id, nombre, stock, precio, categoria) del producto con ese código en la sede, o None."""
+    codigo = _codigo(codigo)
+    if not codigo:
+        return None
+    cur = get_connection().cursor()
+    cur.execute("""
+        SELECT i.id, i.nombre, i.stock, i.precio, COALESCE(c.nombre, '') as categoria
+        FROM inventario i
+        LEFT JOIN categorias_inventario c ON c.id = i.categoria_id
+        WHERE i.sede_id=? AND i.codigo=?
+    """, (int(sede_id), codigo))
+    return cur.fetchone()
 
 def eliminar_producto(pid):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("DELETE FROM inventario WHERE id=?", (int(pid),))
-    conn.commit()
-    conn.close()
+    with transaccion() as cur:
+        cur.execute("DELETE FROM inventario WHERE id=?", (int(pid),))
 
-def ajustar_stock(sede_id: int, pid: int, delta: int):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT stock FROM inventario WHERE id=? AND sede_id=?", (int(pid), int(sede_id)))
+def listar_stock_bajo(sede_id: int):
+    """(id, nombre, stock, punto_reorden, categoria) de los productos en o bajo su punto de reorden."""
+    cur = get_connection().cursor()
+    cur.execute("""
+        SELECT i.id, i.nombre, i.stock, i.punto_reorden, COALESCE(c.nombre, '') as categoria
+        FROM inventario i
+        LEFT JOIN categorias_inventario c ON c.id = i.categoria_id
+        WHERE i.sede_id=? AND i.stock <= i.punto_reorden
+        ORDER BY i.nombre COLLATE NOCASE
+    """, (int(sede_id),))
+    return cur.fetchall()
+
+def sugerencia_reorden(sede_id: int, dias_historial: int = 30, dias_cobertura: int = 14):
+    """Lista de compra: productos que están o estarán en su punto de reorden dentro de
+    dias_cobertura, según lo vendido en los últimos dias_historial días.
+
+    Filas (id, nombre, stock, punto_reorden, vendidos, consumo_diario, sugerido), donde
+    sugerido alcanza para cubrir dias_cobertura y quedar sobre el punto de reorden.
+    """
+    dias_historial = max(1, int(dias_historial))
+    dias_cobertura = max(0, int(dias_cobertura))
+    desde = (date.today() - timedelta(days=dias_historial - 1)).isoformat()
+    cur = get_connection().cursor()
+    cur.execute("""
+        WITH vendidos AS (
+            SELECT producto_id, SUM(cantidad) AS cantidad
+            FROM ventas
+            WHERE sede_id = ? AND fecha >= ?
+            GROUP BY producto_id
+        )
+        SELECT i.id, i.nombre, i.stock, i.punto_reorden, COALESCE(v.cantidad, 0)
+        FROM inventario i
+        LEFT JOIN vendidos v ON v.producto_id = i.id
+        WHERE i.sede_id = ?
+          AND i.stock - COALESCE(v.cantidad, 0) * ? / ? <= i.punto_reorden
+        ORDER BY i.nombre COLLATE NOCASE
+    """, (int(sede_id), desde, int(sede_id), float(dias_cobertura), float(dias_historial)))
+    filas = []
+    for pid, nombre, stock, punto, vendidos in cur.fetchall():
+        consumo = vendidos / dias_historial
+        sugerido = max(0, math.ceil(consumo * dias_cobertura + punto + 1 - stock))
+        filas.append((pid, nombre, stock, punto, vendidos, consumo, sugerido))
+    return filas
+
+def ajustar_stock(sede_id: int, pid: int, delta: int, usuario: str = None):
+    if not int(delta):
+        return
+    with transaccion() as cur:
+        _mover_stock(cur, sede_id, pid, int(delta), "entrada" if int(delta) > 0 else "salida", usuario)
+
+# -------------------------- MOVIMIENTOS DE INVENTARIO --------------------------
+# Historial de solo inserción. Cada DIAS_ENTRE_CORTES días (al primer movimiento
+# de la sede) se guarda un corte con el stock de todos sus productos, para que
+# stock_en_fecha parta del corte y no de todo el historial.
+
+TIPOS_MOVIMIENTO = ("entrada", "salida", "venta", "ajuste")
+DIAS_ENTRE_CORTES = 7
+
+def _crear_tablas_movimientos(cur):
+    # producto_id sin FK: el historial se conserva aunque se borre el producto.
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS movimientos_inventario (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            sede_id INTEGER NOT NULL,
+            producto_id INTEGER NOT NULL,
+            tipo TEXT NOT NULL CHECK (tipo IN ('entrada', 'salida', 'venta', 'ajuste')),
+            cantidad INTEGER NOT NULL,
+            saldo INTEGER NOT NULL,
+            fecha TEXT NOT NULL DEFAULT (datetime('now','localtime')),
+            usuario TEXT,
+            venta_id INTEGER,
+            FOREIGN KEY(sede_id) REFERENCES sedes(id) ON DELETE CASCADE
+        )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_movimientos_producto ON movimientos_inventario(producto_id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_movimientos_sede_fecha ON movimientos_inventario(sede_id, fecha)")
+    # Solo se borran junto con su sede (el ON DELETE CASCADE corre con la sede ya borrada).
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_movimientos_sin_update BEFORE UPDATE ON movimientos_inventario
+        BEGIN SELECT RAISE(ABORT, 'Los movimientos de inventario no se modifican.'); END
+    """)
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_movimientos_sin_delete BEFORE DELETE ON movimientos_inventario
+        WHEN EXISTS (SELECT 1 FROM sedes WHERE id = OLD.sede_id)
+        BEGIN SELECT RAISE(ABORT, 'Los movimientos de inventario no se borran.'); END
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS cortes_inventario (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            sede_id INTEGER NOT NULL,
+            fecha TEXT NOT NULL DEFAULT (datetime('now','localtime')),
+            movimiento_id INTEGER NOT NULL,
+            FOREIGN KEY(sede_id) REFERENCES sedes(id) ON DELETE CASCADE
+        )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_cortes_sede_fecha ON cortes_inventario(sede_id, fecha)")
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS saldos_inventario (
+            corte_id INTEGER NOT NULL,
+            producto_id INTEGER NOT NULL,
+            stock INTEGER NOT NULL,
+            PRIMARY KEY(corte_id, producto_id),
+            FOREIGN KEY(corte_id) REFERENCES cortes_inventario(id) ON DELETE CASCADE
+        ) WITHOUT ROWID
+    """)
+
+def _tomar_corte(cur, sede_id):
+    # movimiento_id: último movimiento ya incluido en los saldos del corte.
+    cur.execute("""
+        INSERT INTO cortes_inventario(sede_id, movimiento_id)
+        VALUES (?, (SELECT COALESCE(MAX(id), 0) FROM movimientos_inventario))
+    """, (int(sede_id),))
+    corte = cur.lastrowid
+    cur.execute("""
+        INSERT INTO saldos_inventario(corte_id, producto_id, stock)
+        SELECT ?, id, stock FROM inventario WHERE sede_id=? AND stock <> 0
+    """, (corte, int(sede_id)))
+
+def _asegurar_corte(cur, sede_id):
+    # Va antes de cualquier cambio de stock de la transacción.
+    cur.execute("""
+        SELECT 1 FROM cortes_inventario
+        WHERE sede_id=? AND fecha >= datetime('now', 'localtime', ?)
+        LIMIT 1
+    """, (int(sede_id), f"-{DIAS_ENTRE_CORTES} days"))
+    if not cur.fetchone():
+        _tomar_corte(cur, sede_id)
+
+def _mover_stock(cur, sede_id, pid, delta, tipo, usuario=None, venta_id=None):
+    """Suma delta al stock en una sola sentencia y lo anota en el kardex. Devuelve el saldo."""
+    _asegurar_corte(cur, sede_id)
+    cur.execute("""
+        UPDATE inventario SET stock = stock + ?
+        WHERE id=? AND sede_id=? AND stock + ? >= 0
+        RETURNING stock
+    """, (int(delta), int(pid), int(sede_id), int(delta)))
     row = cur.fetchone()
     if not row:
-        conn.close()
-        raise ValueError("Producto no encontrado para esta sede.")
-    actual = int(row[0] or 0)
-    nuevo = actual + int(delta)
-    if nuevo < 0:
-        conn.close()
+        cur.execute("SELECT 1 FROM inventario WHERE id=? AND sede_id=?", (int(pid), int(sede_id)))
+        if not cur.fetchone():
+            raise ValueError("Producto no encontrado para esta sede.")
         raise ValueError("No puedes dejar el stock en negativo.")
-    cur.execute("UPDATE inventario SET stock=? WHERE id=?", (nuevo, int(pid)))
-    conn.commit()
-    conn.close()
+    saldo = int(row[0])
+    cur.execute("""
+        INSERT INTO movimientos_inventario(sede_id, producto_id, tipo, cantidad, saldo, usuario, venta_id)
+        VALUES (?,?,?,?,?,?,?)
+    """, (int(sede_id), int(pid), tipo, int(delta), saldo, usuario, venta_id))
+    return saldo
+
+# -------------------------- TRANSFERENCIAS ENTRE SEDES --------------------------
+# Una transferencia son dos movimientos del kardex (salida en el origen, entrada
+# en el destino) hechos en la misma transacción y enlazados por este registro.
+
+def _crear_tabla_transferencias(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS transferencias_inventario (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            fecha TEXT NOT NULL DEFAULT (datetime('now','localtime')),
+            sede_origen INTEGER NOT NULL,
+            sede_destino INTEGER NOT NULL,
+            producto_origen INTEGER NOT NULL,
+            producto_destino INTEGER NOT NULL,
+            nombre TEXT NOT NULL,
+            cantidad INTEGER NOT NULL CHECK (cantidad > 0),
+            usuario TEXT,
+            movimiento_salida INTEGER NOT NULL,
+            movimiento_entrada INTEGER NOT NULL,
+            FOREIGN KEY(sede_origen) REFERENCES sedes(id) ON DELETE CASCADE,
+            FOREIGN KEY(sede_destino) REFERENCES sedes(id) ON DELETE CASCADE
+        )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_transferencias_origen ON transferencias_inventario(sede_origen, fecha)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_transferencias_destino ON transferencias_inventario(sede_destino, fecha)")
+
+def _producto_en_destino(cur, destino, nombre, precio, categoria, codigo, punto):
+    """Id del mismo producto en la sede destino (por código y luego por nombre); si no está, lo crea."""
+    if codigo:
+        cur.execute("SELECT id FROM inventario WHERE sede_id=? AND codigo=?", (destino, codigo))
+        row = cur.fetchone()
+        if row:
+            return int(row[0])
+    cur.execute("""
+        SELECT id FROM inventario
+        WHERE sede_id=? AND nombre=? COLLATE NOCASE AND (codigo IS NULL OR ? IS NULL)
+        ORDER BY id LIMIT 1
+    """, (destino, nombre, codigo))
+    row = cur.fetchone()
+    if row:
+        if codigo:
+            cur.execute("UPDATE inventario SET codigo=? WHERE id=?", (codigo, int(row[0])))
+        return int(row[0])
+
+    cat_id = None
+    if categoria:
+        cur.execute("INSERT OR IGNORE INTO categorias_inventario(sede_id, nombre) VALUES (?, ?)", (destino, categoria))
+        cur.execute("SELECT id FROM categorias_inventario WHERE sede_id=? AND nombre=?", (destino, categoria))
+        cat_id = int(cur.fetchone()[0])
+    cur.execute("""
+        INSERT INTO inventario(sede_id, nombre, stock, precio, categoria_id, codigo, punto_reorden)
+        VALUES (?, ?, 0, ?, ?, ?, ?)
+    """, (destino, nombre, precio, cat_id, codigo, punto))
+    return int(cur.lastrowid)
+
+def transferir_stock(origen: int, destino: int, pid: int, cantidad: int, usuario: str = None):
+    """Pasa `cantidad` unidades del producto pid de la sede origen a la sede destino.
+
+    Devuelve (id de la transferencia, id del producto en el destino).
+    """
+    origen, destino, cantidad = int(origen), int(destino), int(cantidad)
+    if origen == destino:
+        raise ValueError("La sede destino debe ser distinta de la de origen.")
+    if cantidad <= 0:
+        raise ValueError("La cantidad debe ser mayor a 0.")
+
+    with transaccion() as cur:
+        cur.execute("""
+            SELECT i.nombre, i.precio, c.nombre, i.codigo, i.punto_reorden
+            FROM inventario i
+            LEFT JOIN categorias_inventario c ON c.id = i.categoria_id
+            WHERE i.id=? AND i.sede_id=?
+        """, (int(pid), origen))
+        producto = cur.fetchone()
+        if not producto:
+            raise ValueError("Producto no encontrado para esta sede.")
+        cur.execute("SELECT 1 FROM sedes WHERE id=?", (destino,))
+        if not cur.fetchone():
+            raise ValueError("La sede destino no existe.")
+
+        nombre = producto[0]
+        _mover_stock(cur, origen, pid, -cantidad, "salida", usuario)
+        mov_salida = cur.lastrowid
+        pid_destino = _producto_en_destino(cur, destino, *producto)
+        _mover_stock(cur, destino, pid_destino, cantidad, "entrada", usuario)
+        mov_entrada = cur.lastrowid
+
+        cur.execute("""
+            INSERT INTO transferencias_inventario(sede_origen, sede_destino, producto_origen, producto_destino,
+                                                  nombre, cantidad, usuario, movimiento_salida, movimiento_entrada)
+            VALUES (?,?,?,?,?,?,?,?,?)
+        """, (origen, destino, int(pid), pid_destino, nombre, cantidad, usuario, mov_salida, mov_entrada))
+        return int(cur.lastrowid), pid_destino
+
+def listar_transferencias(sede_id: int, limit: int = 200):
+    """Enviadas y recibidas por la sede, más recientes primero:
+    (id, fecha, sede_origen, origen, sede_destino, destino, nombre, cantidad, usuario)."""
+    cur = get_connection().cursor()
+    cur.execute("""
+        SELECT t.id, t.fecha, t.sede_origen, so.nombre, t.sede_destino, sd.nombre, t.nombre, t.cantidad, t.usuario
+        FROM transferencias_inventario t
+        JOIN sedes so ON so.id = t.sede_origen
+        JOIN sedes sd ON sd.id = t.sede_destino
+        WHERE t.sede_origen=? OR t.sede_destino=?
+        ORDER BY t.fecha DESC, t.id DESC
+        LIMIT ?
+    """, (int(sede_id), int(sede_id), int(limit)))
+    return cur.fetchall()
+
+def listar_movimientos(sede_id: int, producto_id: int = None, limit: int = 200):
+    """Kardex más reciente primero: (id, fecha, producto_id, tipo, cantidad, saldo, usuario, venta_id)."""
+    cur = get_connection().cursor()
+    if producto_id:
+        cur.execute("""
+            SELECT id, fecha, producto_id, tipo, cantidad, saldo, usuario, venta_id
+            FROM movimientos_inventario
+            WHERE producto_id=? AND sede_id=?
+            ORDER BY id DESC
+            LIMIT ?
+        """, (int(producto_id), int(sede_id), int(limit)))
+    else:
+        cur.execute("""
+            SELECT id, fecha, producto_id, tipo, cantidad, saldo, usuario, venta_id
+            FROM movimientos_inventario
+            WHERE sede_id=?
+            ORDER BY fecha DESC, id DESC
+            LIMIT ?
+        """, (int(sede_id), int(limit)))
+    return cur.fetchall()
+
+def stock_en_fecha(sede_id: int, fecha: str, producto_id: int = None):
+    """Existencias al cierre de fecha (YYYY-MM-DD): el corte más reciente antes de ese
+    cierre más los movimientos posteriores a él. Con producto_id devuelve un entero;
+    sin él, [(producto_id, nombre, stock)] de los productos actuales de la sede."""
+    cierre = _dia_siguiente(fecha)
+    cur = get_connection().cursor()
+    cur.execute("""
+        SELECT id, movimiento_id, fecha FROM cortes_inventario
+        WHERE sede_id=? AND fecha < ?
+        ORDER BY fecha DESC LIMIT 1
+    """, (int(sede_id), cierre))
+    corte = cur.fetchone()
+    if not corte:
+        # Antes del primer corte la sede no tiene movimientos: vale el primer corte.
+        cur.execute("SELECT id, movimiento_id, fecha FROM cortes_inventario WHERE sede_id=? ORDER BY fecha ASC LIMIT 1",
+                    (int(sede_id),))
+        corte = cur.fetchone() or (None, 0, "")
+    corte_id, desde, fecha_corte = corte
+
+    if producto_id:
+        cur.execute("SELECT stock FROM saldos_inventario WHERE corte_id=? AND producto_id=?",
+                    (corte_id, int(producto_id)))
+        base = cur.fetchone()
+        cur.execute("""
+            SELECT COALESCE(SUM(cantidad), 0) FROM movimientos_inventario
+            WHERE producto_id=? AND sede_id=? AND id > ? AND fecha < ?
+        """, (int(producto_id), int(sede_id), desde, cierre))
+        return (int(base[0]) if base else 0) + int(cur.fetchone()[0])
+
+    cur.execute("""
+        WITH mov AS (
+            SELECT producto_id, SUM(cantidad) AS delta
+            FROM movimientos_inventario
+            WHERE sede_id = ? AND fecha >= ? AND fecha < ? AND id > ?
+            GROUP BY producto_id
+        )
+        SELECT i.id, i.nombre, COALESCE(s.stock, 0) + COALESCE(mov.delta, 0)
+        FROM inventario i
+        LEFT JOIN saldos_inventario s ON s.corte_id = ? AND s.producto_id = i.id
+        LEFT JOIN mov ON mov.producto_id = i.id
+        WHERE i.sede_id = ?
+        ORDER BY i.nombre ASC
+    """, (int(sede_id), fecha_corte, cierre, desde, corte_id, int(sede_id)))
+    return cur.fetchall()
+
+# -------------------------- IMPORTAR / EXPORTAR --------------------------
+# Las filas llegan ya validadas (ver catalogo.py) en lotes; todo el archivo se
+# aplica en una sola transacción. None en un campo conserva el valor actual.
+
+def _mapa_categorias(cur, sede_id):
+    cur.execute("SELECT id, nombre FROM categorias_inventario WHERE sede_id=?", (sede_id,))
+    return {nombre.strip().lower(): int(cid) for cid, nombre in cur.fetchall()}
+
+def importar_productos(sede_id: int, lotes, usuario: str = None):
+    """lotes: iterable de listas de (línea, nombre, categoria, stock, precio, codigo, punto_reorden).
+
+    Un producto existente se reconoce por código y, si no trae, por nombre. Las
+    categorías que no existen se crean. Una fila que repite el código de otra
+    fila del archivo con otro nombre se omite y se reporta.
+    Devuelve (creados, actualizados, errores) con errores = [(línea, mensaje)].
+    """
+    sede_id = int(sede_id)
+    try:
+        return _importar_productos(sede_id, lotes, usuario)
+    except sqlite3.IntegrityError as e:
+        # Solo el índice único de código; cualquier otra restricción sale tal cual.
+        if "inventario.codigo" not in str(e):
+            raise
+        raise ValueError("El archivo asigna un mismo código a productos distintos.")
+
+def _importar_productos(sede_id, lotes, usuario):
+    creados = actualizados = 0
+    errores = []
+    # Código -> nombre de la primera fila del archivo que lo usó.
+    codigos_archivo = {}
+    with transaccion() as cur:
+        cur.execute("SELECT id, nombre, codigo, stock FROM inventario WHERE sede_id=?", (sede_id,))
+        por_codigo, por_nombre, stock = {}, {}, {}
+        for pid, nombre, codigo, st in cur.fetchall():
+            if codigo:
+                por_codigo[codigo] = pid
+            por_nombre[nombre.strip().lower()] = pid
+            stock[pid] = int(st or 0)
+        categorias = _mapa_categorias(cur, sede_id)
+        _asegurar_corte(cur, sede_id)
+
+        for lote in lotes:
+            faltan = {}
+            for _l, _n, c, *_r in lote:
+                if c and c.strip().lower() not in categorias:
+                    faltan.setdefault(c.strip().lower(), c.strip())
+            if faltan:
+                cur.executemany("INSERT OR IGNORE INTO categorias_inventario(sede_id, nombre) VALUES (?, ?)",
+                                [(sede_id, c) for c in faltan.values()])
+                categorias = _mapa_categorias(cur, sede_id)
+
+            cambios, nuevos, movimientos = {}, {}, []
+            for linea, nombre, categoria, st, precio, codigo, punto in lote:
+                if codigo:
+                    previo = codigos_archivo.setdefault(codigo, nombre.lower())
+                    if previo != nombre.lower():
+                        errores.append((linea, f"El código {codigo} ya se usó en el archivo para otro producto."))
+                        continue
+                cat_id = categorias.get(categoria.strip().lower()) if categoria else None
+                pid = por_codigo.get(codigo) if codigo else None
+                if pid is None:
+                    pid = por_nombre.get(nombre.lower())
+                if pid is None:
+                    # Repetido dentro del lote: los campos que trae la última fila pisan a los anteriores.
+                    fila = (nombre, st, precio, cat_id, codigo, punto)
+                    previa = nuevos.get(codigo or nombre.lower())
+                    if previa:
+                        fila = tuple(previa[i] if v is None else v for i, v in enumerate(fila))
+                    nuevos[codigo or nombre.lower()] = fila
+                    continue
+                cambios[pid] = (nombre, precio, cat_id, codigo, punto, pid)
+                if st is not None and st != stock[pid]:
+                    movimientos.append((sede_id, pid, "ajuste", st - stock[pid], st, usuario))
+                    stock[pid] = st
+                por_nombre[nombre.lower()] = pid
+                if codigo:
+                    por_codigo[codigo] = pid
+
+            cur.executemany("""
+                UPDATE inventario
+                SET nombre=?, precio=COALESCE(?, precio), categoria_id=COALESCE(?, categoria_id),
+                    codigo=COALESCE(?, codigo), punto_reorden=COALESCE(?, punto_reorden)
+                WHERE id=?
+            """, list(cambios.values()))
+            actualizados += len(cambios)
+
+            if nuevos:
+                # Con el lock de escritura tomado, los ids mayores al tope son justo estos.
+                cur.execute("SELECT COALESCE(MAX(id), 0) FROM inventario")
+                tope = cur.fetchone()[0]
+                cur.executemany("""
+                    INSERT INTO inventario(sede_id, nombre, stock, precio, categoria_id, codigo, punto_reorden)
+                    VALUES (?,?,?,?,?,?,?)
+                """, [(sede_id, nombre, st or 0, precio or 0.0, cat_id, codigo,
+                       PUNTO_REORDEN if punto is None else punto)
+                      for nombre, st, precio, cat_id, codigo, punto in nuevos.values()])
+                cur.execute("SELECT id, nombre, codigo, stock FROM inventario WHERE id > ?", (tope,))
+                for pid, nombre, codigo, st in cur.fetchall():
+                    por_nombre[nombre.lower()] = pid
+                    if codigo:
+                        por_codigo[codigo] = pid
+                    stock[pid] = st
+                    if st:
+                        movimientos.append((sede_id, pid, "entrada", st, st, usuario))
+                creados += len(nuevos)
+
+            cur.executemany("UPDATE inventario SET stock=? WHERE id=?",
+                            [(saldo, pid) for _s, pid, tipo, _c, saldo, _u in movimientos if tipo == "ajuste"])
+            cur.executemany("""
+                INSERT INTO movimientos_inventario(sede_id, producto_id, tipo, cantidad, saldo, usuario)
+                VALUES (?,?,?,?,?,?)
+            """, movimientos)
+    return creados, actualizados, errores
+
+def importar_servicios(sede_id: int, lotes):
+    """lotes: iterable de listas de (línea, nombre, precio). Se reconocen por nombre.
+    Devuelve (creados, actualizados, errores) como importar_productos."""
+    sede_id = int(sede_id)
+    creados = actualizados = 0
+    with transaccion() as cur:
+        cur.execute("SELECT id, nombre FROM servicios WHERE sede_id=?", (sede_id,))
+        por_nombre = {nombre.strip().lower(): int(sid) for sid, nombre in cur.fetchall()}
+        for lote in lotes:
+            cambios, nuevos = {}, {}
+            for _linea, nombre, precio in lote:
+                sid = por_nombre.get(nombre.lower())
+                if sid is None:
+                    nuevos[nombre.lower()] = (sede_id, nombre, precio)
+                else:
+                    cambios[sid] = (nombre, precio, sid)
+            cur.executemany("UPDATE servicios SET nombre=?, precio=? WHERE id=?", list(cambios.values()))
+            if nuevos:
+                # Igual que en productos: los ids mayores al tope son los recién insertados.
+                cur.execute("SELECT COALESCE(MAX(id), 0) FROM servicios")
+                tope = cur.fetchone()[0]
+                cur.executemany("INSERT INTO servicios(sede_id, nombre, precio) VALUES (?,?,?)",
+                                list(nuevos.values()))
+                cur.execute("SELECT id, nombre FROM servicios WHERE id > ?", (tope,))
+                for sid, nombre in cur.fetchall():
+                    por_nombre[nombre.strip().lower()] = int(sid)
+            creados += len(nuevos)
+            actualizados += len(cambios)
+    return creados, actualizados, []
+
+def iterar_inventario(sede_id: int, tamano: int = 500):
+    """(nombre, categoria, stock, precio, codigo, punto_reorden) de la sede, de a `tamano` filas."""
+    cur = get_connection().cursor()
+    cur.execute("""
+        SELECT i.nombre, COALESCE(c.nombre, ''), i.stock, i.precio, COALESCE(i.codigo, ''), i.punto_reorden
+        FROM inventario i
+        LEFT JOIN categorias_inventario c ON c.id = i.categoria_id
+        WHERE i.sede_id=?
+        ORDER BY i.nombre COLLATE NOCASE
+    """, (int(sede_id),))
+    while True:
+        filas = cur.fetchmany(tamano)
+        if not filas:
+            return
+        yield from filas
+
+# -------------------------- BÚSQUEDA DE PRODUCTOS --------------------------
+# inventario_fts guarda nombre y categoría de cada producto (rowid = inventario.id)
+# sin mayúsculas ni tildes; los triggers lo mantienen al día.
+
+_FTS_PRODUCTO = """
+    INSERT INTO inventario_fts(rowid, nombre, categoria, sede_id)
+    SELECT NEW.id, NEW.nombre,
+           COALESCE((SELECT nombre FROM categorias_inventario WHERE id = NEW.categoria_id), ''),
+           NEW.sede_id;
+"""
+
+def _crear_busqueda_productos(cur):
+    cur.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS inventario_fts USING fts5(
+            nombre, categoria, sede_id UNINDEXED,
+            tokenize = 'unicode61 remove_diacritics 2'
+        )
+    """)
+    cur.execute("CREATE VIRTUAL TABLE IF NOT EXISTS inventario_fts_vocab USING fts5vocab(inventario_fts, 'row')")
+    triggers = {
+        "trg_fts_inventario_ins": ("AFTER INSERT ON inventario", _FTS_PRODUCTO),
+        "trg_fts_inventario_del": ("AFTER DELETE ON inventario",
+                                   "DELETE FROM inventario_fts WHERE rowid = OLD.id;"),
+        "trg_fts_inventario_upd": ("AFTER UPDATE OF nombre, categoria_id, sede_id ON inventario",
+                                   "DELETE FROM inventario_fts WHERE rowid = OLD.id;" + _FTS_PRODUCTO),
+        "trg_fts_categorias_upd": ("AFTER UPDATE OF nombre ON categorias_inventario", """
+            UPDATE inventario_fts SET categoria = NEW.nombre
+            WHERE rowid IN (SELECT id FROM inventario WHERE categoria_id = NEW.id);
+        """),
+    }
+    for nombre, (evento, cuerpo) in triggers.items():
+        cur.execute(f"CREATE TRIGGER IF NOT EXISTS {nombre} {evento} BEGIN {cuerpo} END")
+    cur.execute("DELETE FROM inventario_fts")
+    cur.execute("""
+        INSERT INTO inventario_fts(rowid, nombre, categoria, sede_id)
+        SELECT i.id, i.nombre, COALESCE(c.nombre, ''), i.sede_id
+        FROM inventario i
+        LEFT JOIN categorias_inventario c ON c.id = i.categoria_id
+    """)
+
+def _terminos_busqueda(texto):
+    # Misma normalización que el tokenizador: minúsculas, sin tildes, solo letras y dígitos.
+    s = unicodedata.normalize("NFKD", (texto or "").lower())
+    s = "".join(ch for ch in s if not unicodedata.combining(ch))
+    return re.findall(r"[^\W_]+", s)
+
+_SELECT_PRODUCTO = """
+    SELECT i.id, i.nombre, i.stock, i.precio, COALESCE(c.nombre, '') as categoria
+    FROM inventario i
+    LEFT JOIN categorias_inventario c ON c.id = i.categoria_id
+"""
+
+def _buscar_fts(cur, sede_id, consulta, limit):
+    cur.execute(f"""
+        {_SELECT_PRODUCTO}
+        JOIN inventario_fts f ON f.rowid = i.id
+        WHERE inventario_fts MATCH ? AND f.sede_id = ?
+        ORDER BY f.rank, i.nombre
+        LIMIT ?
+    """, (consulta, int(sede_id), limit))
+    return cur.fetchall()
+
+def _consulta_prefijos(terminos):
+    return " AND ".join(f'"{t}"*' for t in terminos)
+
+def _consulta_parecida(cur, terminos):
+    # Cada término se amplía con los prefijos del vocabulario más parecidos
+    # ("esmlte" -> "esmalte"*, "acetna" -> "aceton"*).
+    cur.execute("SELECT term FROM inventario_fts_vocab")
+    vocab = [r[0] for r in cur.fetchall()]
+    partes = []
+    for t in terminos:
+        opciones = [t]
+        if len(t) >= 3:
+            prefijos = {v[:n] for v in vocab for n in (len(t) - 1, len(t), len(t) + 1)}
+            opciones += difflib.get_close_matches(t, prefijos, n=3, cutoff=0.75)
+        partes.append("(" + " OR ".join(f'"{o}"*' for o in dict.fromkeys(opciones)) + ")")
+    return " AND ".join(partes)
+
+def buscar_productos(sede_id: int, texto: str, limit: int = 200):
+    """Productos de la sede cuyo nombre o categoría coincide con texto.
+
+    Ignora mayúsculas y tildes y toma cada palabra como prefijo; si nada coincide
+    reintenta con las palabras parecidas del índice. Mismas columnas que
+    listar_inventario, de mejor a peor coincidencia. limit=None devuelve todos.
+    """
+    limite = -1 if limit is None else int(limit)
+    terminos = _terminos_busqueda(texto)
+    cur = get_connection().cursor()
+    if not terminos:
+        cur.execute(f"{_SELECT_PRODUCTO} WHERE i.sede_id=? ORDER BY i.nombre ASC LIMIT ?",
+                    (int(sede_id), limite))
+        return cur.fetchall()
+
+    try:
+        filas = _buscar_fts(cur, sede_id, _consulta_prefijos(terminos), limite)
+    except sqlite3.OperationalError:
+        # Base sin inventario_fts (sqlite sin FTS5): subcadena con LIKE.
+        palabras = texto.split()
+        where = " AND ".join("(i.nombre LIKE ? OR c.nombre LIKE ?)" for _ in palabras)
+        params = [int(sede_id)]
+        for t in palabras:
+            params += [f"%{t}%", f"%{t}%"]
+        cur.execute(f"{_SELECT_PRODUCTO} WHERE i.sede_id=? AND {where} ORDER BY i.nombre ASC LIMIT ?",
+                    params + [limite])
+        return cur.fetchall()
+    if filas:
+        return filas
+    return _buscar_fts(cur, sede_id, _consulta_parecida(cur, terminos), limite)
+
+def filtrar_productos(filas, texto):
+    """Filtra en memoria filas de buscar_productos con el mismo criterio de prefijos
+    (sin palabras parecidas). Sirve para afinar un resultado mientras se escribe."""
+    terminos = _terminos_busqueda(texto)
+    if not terminos:
+        return list(filas)
+    quedan = []
+    for fila in filas:
+        palabras = _terminos_busqueda(f"{fila[1]} {fila[4]}")
+        if all(any(p.startswith(t) for p in palabras) for t in terminos):
+            quedan.append(fila)
+    return quedan
+
+_ORDEN_INVENTARIO = {
+    "nombre": "i.nombre COLLATE NOCASE",
+    "categoria": "COALESCE(c.nombre, '') COLLATE NOCASE",
+    "stock": "i.stock",
+    "precio": "i.precio",
+}
+
+def _filtro_inventario(sede_id, categoria_id, stock_max, precio_min, precio_max, solo_bajo):
+    where = ["i.sede_id = ?"]
+    params = [int(sede_id)]
+    if solo_bajo:
+        where.append("i.stock <= i.punto_reorden")
+    if categoria_id:
+        where.append("i.categoria_id = ?")
+        params.append(int(categoria_id))
+    if stock_max is not None:
+        where.append("i.stock <= ?")
+        params.append(int(stock_max))
+    if precio_min is not None:
+        where.append("i.precio >= ?")
+        params.append(float(precio_min))
+    if precio_max is not None:
+        where.append("i.precio <= ?")
+        params.append(float(precio_max))
+    return where, params
+
+def _pagina_inventario(cur, where, params, orden, limit, offset):
+    condicion = " AND ".join(where)
+    cur.execute(f"SELECT COUNT(*) FROM inventario i WHERE {condicion}", params)
+    total = int(cur.fetchone()[0])
+    cur.execute(f"{_SELECT_PRODUCTO} WHERE {condicion} ORDER BY {orden} LIMIT ? OFFSET ?",
+                params + [limit, offset])
+    return cur.fetchall(), total
+
+def consultar_inventario(sede_id: int, texto: str = "", categoria_id: int = None, stock_max: int = None,
+                         precio_min: float = None, precio_max: float = None, orden: str = "nombre",
+                         desc: bool = False, limit: int = 200, offset: int = 0, solo_bajo: bool = False):
+    """Una página de productos de la sede con filtros, orden y paginado hechos en SQL.
+
+    Devuelve (filas, total): filas con las columnas de listar_inventario y total de
+    productos que cumplen los filtros. El texto se busca como en buscar_productos;
+    solo_bajo deja los productos en o bajo su punto de reorden.
+    """
+    if orden not in _ORDEN_INVENTARIO:
+        raise ValueError("Orden de inventario inválido.")
+    orden_sql = f"{_ORDEN_INVENTARIO[orden]} {'DESC' if desc else 'ASC'}, i.nombre COLLATE NOCASE, i.id"
+    limite = -1 if limit is None else int(limit)
+    where, params = _filtro_inventario(sede_id, categoria_id, stock_max, precio_min, precio_max, solo_bajo)
+    cur = get_connection().cursor()
+
+    terminos = _terminos_busqueda(texto)
+    if not terminos:
+        return _pagina_inventario(cur, where, params, orden_sql, limite, int(offset))
+
+    por_texto = "i.id IN (SELECT rowid FROM inventario_fts WHERE inventario_fts MATCH ? AND sede_id = ?)"
+    try:
+        filas, total = _pagina_inventario(cur, where + [por_texto], params + [_consulta_prefijos(terminos), int(sede_id)],
+                                          orden_sql, limite, int(offset))
+    except sqlite3.OperationalError:
+        palabras = texto.split()
+        for t in palabras:
+            where.append("(i.nombre LIKE ? OR i.categoria_id IN "
+                         "(SELECT id FROM categorias_inventario WHERE nombre LIKE ?))")
+            params += [f"%{t}%", f"%{t}%"]
+        return _pagina_inventario(cur, where, params, orden_sql, limite, int(offset))
+    if total:
+        return filas, total
+    return _pagina_inventario(cur, where + [por_texto],
+                              params + [_consulta_parecida(cur, terminos), int(sede_id)],
+                              orden_sql, limite, int(offset))
 
 # -------------------------- VENTAS --------------------------
 
-def crear_tabla_ventas():
-    conn = get_connection()
-    cur = conn.cursor()
+def _crear_tabla_ventas(cur):
     cur.execute("""
         CREATE TABLE IF NOT EXISTS ventas (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -403,37 +1345,97 @@ def crear_tabla_ventas():
             FOREIGN KEY(producto_id) REFERENCES inventario(id) ON DELETE CASCADE
         )
     """)
-    conn.commit()
-    conn.close()
+
+def _crear_tabla_ventas_cabecera(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS ventas_cabecera (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            sede_id INTEGER NOT NULL,
+            fecha TEXT NOT NULL DEFAULT (datetime('now','localtime')),
+            items INTEGER NOT NULL DEFAULT 0,
+            total REAL NOT NULL DEFAULT 0.0,
+            FOREIGN KEY(sede_id) REFERENCES sedes(id) ON DELETE CASCADE
+        )
+    """)
 
 def registrar_venta(sede_id, producto_id, cantidad, precio_unitario):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT stock FROM inventario WHERE id=? AND sede_id=?", (int(producto_id), int(sede_id)))
-    row = cur.fetchone()
-    if not row:
-        conn.close()
-        raise ValueError("Producto no encontrado para esta sede.")
-    stock_actual = int(row[0] or 0)
-    cantidad = int(cantidad)
-    if cantidad <= 0 or cantidad > stock_actual:
-        conn.close()
-        raise ValueError("Cantidad inválida o stock insuficiente.")
-    nuevo_stock = stock_actual - cantidad
-    cur.execute("UPDATE inventario SET stock=? WHERE id=?", (nuevo_stock, int(producto_id)))
-    total = float(precio_unitario) * cantidad
+    return registrar_venta_carrito(sede_id, [(producto_id, cantidad, precio_unitario)])
+
+def registrar_venta_carrito(sede_id, items, nit_receptor=None, nombre_receptor=None,
+                            apellidos_receptor=None, usuario=None) -> int:
+    # items: [(producto_id, cantidad, precio_unitario), ...]. Todo o nada:
+    # si una línea no tiene stock no se vende ninguna.
+    sede_id = int(sede_id)
+    lineas = [(int(pid), int(cant), float(precio)) for pid, cant, precio in items]
+    if not lineas:
+        raise ValueError("El carrito está vacío.")
+
+    pedidas = {}
+    for pid, cant, _precio in lineas:
+        if cant <= 0:
+            raise ValueError("Cantidad inválida o stock insuficiente.")
+        pedidas[pid] = pedidas.get(pid, 0) + cant
+
+    with transaccion() as cur:
+        marcas = ",".join("?" * len(pedidas))
+        cur.execute(f"SELECT id, nombre, stock FROM inventario WHERE sede_id=? AND id IN ({marcas})",
+                    (sede_id, *pedidas))
+        stock = {int(pid): (nombre, int(st or 0)) for pid, nombre, st in cur.fetchall()}
+        for pid, cant in pedidas.items():
+            if pid not in stock:
+                raise ValueError("Producto no encontrado para esta sede.")
+            nombre, disponible = stock[pid]
+            if cant > disponible:
+                raise ValueError(f"Stock insuficiente: {nombre}")
+
+        total = sum(cant * precio for _pid, cant, precio in lineas)
+        cur.execute("""
+            INSERT INTO ventas_cabecera(sede_id, items, total, nit_receptor, nombre_receptor, apellidos_receptor)
+            VALUES (?,?,?,?,?,?)
+        """, (sede_id, sum(pedidas.values()), float(total), nit_receptor, nombre_receptor, apellidos_receptor))
+        vid = cur.lastrowid
+        cur.execute("SELECT fecha FROM ventas_cabecera WHERE id=?", (vid,))
+        fecha = cur.fetchone()[0]
+
+        for pid, cant in pedidas.items():
+            _mover_stock(cur, sede_id, pid, -cant, "venta", usuario, vid)
+        cur.executemany("""
+            INSERT INTO ventas(sede_id, producto_id, cantidad, precio_unitario, total, fecha, cabecera_id, descripcion)
+            VALUES (?,?,?,?,?,?,?,?)
+        """, [(sede_id, pid, cant, precio, cant * precio, fecha, vid, stock[pid][0]) for pid, cant, precio in lineas])
+    return int(vid)
+
+def vincular_factura_venta(vid: int, factura_path: str, factura_autorizacion: str):
+    with transaccion() as cur:
+        cur.execute("""
+            UPDATE ventas_cabecera
+            SET factura_path=?, factura_autorizacion=?
+            WHERE id=?
+        """, (factura_path, factura_autorizacion, int(vid)))
+
+def obtener_venta(vid: int):
+    cur = get_connection().cursor()
     cur.execute("""
-        INSERT INTO ventas(sede_id, producto_id, cantidad, precio_unitario, total)
-        VALUES (?,?,?,?,?)
-    """, (int(sede_id), int(producto_id), int(cantidad), float(precio_unitario), float(total)))
-    conn.commit()
-    conn.close()
+        SELECT id, sede_id, fecha, items, total, nit_receptor, nombre_receptor, apellidos_receptor,
+               factura_path, factura_autorizacion
+        FROM ventas_cabecera
+        WHERE id=?
+    """, (int(vid),))
+    return cur.fetchone()
+
+def listar_items_venta(vid: int):
+    cur = get_connection().cursor()
+    cur.execute("""
+        SELECT id, producto_id, descripcion, cantidad, precio_unitario, total
+        FROM venta_items
+        WHERE cabecera_id=?
+        ORDER BY id ASC
+    """, (int(vid),))
+    return cur.fetchall()
 
 # -------------------------- SERVICIOS --------------------------
 
-def crear_tabla_servicios():
-    conn = get_connection()
-    cur = conn.cursor()
+def _crear_tabla_servicios(cur):
     cur.execute("""
         CREATE TABLE IF NOT EXISTS servicios (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -443,16 +1445,11 @@ def crear_tabla_servicios():
             FOREIGN KEY(sede_id) REFERENCES sedes(id) ON DELETE CASCADE
         )
     """)
-    conn.commit()
-    conn.close()
 
 def listar_servicios(sede_id: int):
-    conn = get_connection()
-    cur = conn.cursor()
+    cur = get_connection().cursor()
     cur.execute("SELECT id, nombre, precio FROM servicios WHERE sede_id=? ORDER BY nombre ASC", (int(sede_id),))
-    rows = cur.fetchall()
-    conn.close()
-    return rows
+    return cur.fetchall()
 
 def _servicios_cabello():
     return [
@@ -471,11 +1468,15 @@ def _servicios_unias():
         ("Uñas acrílicas corta", 150),
     ]
 
-def seed_servicios():
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT id, nombre FROM sedes ORDER BY id ASC")
-    sedes = cur.fetchall()
+def _sedes_a_sembrar(cur, sede_id=None):
+    if sede_id is None:
+        cur.execute("SELECT id, nombre FROM sedes ORDER BY id ASC")
+    else:
+        cur.execute("SELECT id, nombre FROM sedes WHERE id=?", (int(sede_id),))
+    return cur.fetchall()
+
+def _seed_servicios(cur, sede_id=None):
+    sedes = _sedes_a_sembrar(cur, sede_id)
     for (sid, nombre) in sedes:
         cur.execute("SELECT COUNT(*) FROM servicios WHERE sede_id=?", (int(sid),))
         n = int(cur.fetchone()[0] or 0)
@@ -483,14 +1484,10 @@ def seed_servicios():
             data = _servicios_unias() if "uña" in (nombre or "").lower() else _servicios_cabello()
             for (nom, precio) in data:
                 cur.execute("INSERT INTO servicios(sede_id, nombre, precio) VALUES (?,?,?)", (int(sid), nom, float(precio)))
-    conn.commit()
-    conn.close()
 
 # -------------------------- CITAS --------------------------
 
-def crear_tabla_citas():
-    conn = get_connection()
-    cur = conn.cursor()
+def _crear_tabla_citas(cur):
     cur.execute("""
         CREATE TABLE IF NOT EXISTS citas (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -513,41 +1510,49 @@ def crear_tabla_citas():
             FOREIGN KEY(servicio_id) REFERENCES servicios(id) ON DELETE SET NULL
         )
     """)
-    conn.commit()
-    conn.close()
 
-def asegurar_columnas_citas():
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("PRAGMA table_info(citas)")
-    cols = [c[1] for c in cur.fetchall()]
-    try:
-        if "servicio_id" not in cols:
-            cur.execute("ALTER TABLE citas ADD COLUMN servicio_id INTEGER")
-        if "servicio_nombre" not in cols:
-            cur.execute("ALTER TABLE citas ADD COLUMN servicio_nombre TEXT")
-        if "precio" not in cols:
-            cur.execute("ALTER TABLE citas ADD COLUMN precio REAL DEFAULT 0.0")
-        if "empleada" not in cols:
-            cur.execute("ALTER TABLE citas ADD COLUMN empleada TEXT")
-        if "estado" not in cols:
-            cur.execute("ALTER TABLE citas ADD COLUMN estado TEXT NOT NULL DEFAULT 'PENDIENTE'")
-        if "nit_receptor" not in cols:
-            cur.execute("ALTER TABLE citas ADD COLUMN nit_receptor TEXT")
-        if "nombre_receptor" not in cols:
-            cur.execute("ALTER TABLE citas ADD COLUMN nombre_receptor TEXT")
-        if "apellidos_receptor" not in cols:
-            cur.execute("ALTER TABLE citas ADD COLUMN apellidos_receptor TEXT")
-        if "facturado_en" not in cols:
-            cur.execute("ALTER TABLE citas ADD COLUMN facturado_en TEXT")
-        conn.commit()
-    except Exception:
-        pass
-    conn.close()
+def _asegurar_columnas_citas(cur):
+    cols = _columnas(cur, "citas")
+    if "servicio_id" not in cols:
+        cur.execute("ALTER TABLE citas ADD COLUMN servicio_id INTEGER")
+    if "servicio_nombre" not in cols:
+        cur.execute("ALTER TABLE citas ADD COLUMN servicio_nombre TEXT")
+    if "precio" not in cols:
+        cur.execute("ALTER TABLE citas ADD COLUMN precio REAL DEFAULT 0.0")
+    if "empleada" not in cols:
+        cur.execute("ALTER TABLE citas ADD COLUMN empleada TEXT")
+    if "estado" not in cols:
+        cur.execute("ALTER TABLE citas ADD COLUMN estado TEXT NOT NULL DEFAULT 'PENDIENTE'")
+    if "nit_receptor" not in cols:
+        cur.execute("ALTER TABLE citas ADD COLUMN nit_receptor TEXT")
+    if "nombre_receptor" not in cols:
+        cur.execute("ALTER TABLE citas ADD COLUMN nombre_receptor TEXT")
+    if "apellidos_receptor" not in cols:
+        cur.execute("ALTER TABLE citas ADD COLUMN apellidos_receptor TEXT")
+    if "facturado_en" not in cols:
+        cur.execute("ALTER TABLE citas ADD COLUMN facturado_en TEXT")
+
+# Funciones que se llaman con (sede_id, fecha) después de cada cambio en las
+# citas de ese día, para que los índices en memoria se invaliden.
+_oyentes_citas = []
+
+def al_cambiar_citas(fn):
+    _oyentes_citas.append(fn)
+
+def quitar_oyente_citas(fn):
+    if fn in _oyentes_citas:
+        _oyentes_citas.remove(fn)
+
+def _avisar_citas(sede_id, fecha):
+    for fn in list(_oyentes_citas):
+        fn(int(sede_id), fecha)
+
+def _dia_de_cita(cur, cid):
+    cur.execute("SELECT sede_id, fecha FROM citas WHERE id=?", (int(cid),))
+    return cur.fetchone()
 
 def listar_citas(sede_id: int, fecha: str):
-    conn = get_connection()
-    cur = conn.cursor()
+    cur = get_connection().cursor()
     cur.execute("""
         SELECT id, cliente,
                COALESCE(servicio_nombre, servicio) as servicio_mostrar,
@@ -555,91 +1560,212 @@ def listar_citas(sede_id: int, fecha: str):
                empleada,
                COALESCE(estado, 'PENDIENTE') as estado
         FROM citas
-        WHERE sede_id=? AND fecha=?
-        ORDER BY inicio ASC
-    """, (int(sede_id), fecha))
-    rows = cur.fetchall()
-    conn.close()
-    return rows
+        WHERE sede_id=? AND dia=?
+        ORDER BY inicio_min ASC
+    """, (int(sede_id), dia_epoch(fecha)))
+    return cur.fetchall()
+
+def reservar_citas_recurrentes(sede_id: int, fechas, cliente: str, servicio: str, inicio: str, fin: str,
+                               servicio_id: int = None, servicio_nombre: str = None, precio: float = 0.0,
+                               empleada: str = None):
+    """Reserva la misma cita en varias fechas; devuelve (fechas_creadas, conflictos).
+
+    Los choques de todas las fechas salen de una sola consulta por rango y las
+    fechas libres se insertan juntas en una transacción. conflictos es una lista
+    de (fecha, inicio, fin) de las citas que ya ocupaban a la empleada.
+    """
+    inicio_min, fin_min = a_minutos(inicio), a_minutos(fin)
+    if inicio_min is None or fin_min is None or fin_min <= inicio_min:
+        raise ValueError("Horario inválido.")
+    if not (empleada or "").strip():
+        raise ValueError("Selecciona una empleada.")
+    fechas = sorted(set(fechas))
+    if not fechas:
+        return [], []
+    dias = {dia_epoch(f): f for f in fechas}
+
+    with transaccion() as cur:
+        cur.execute("""
+            SELECT fecha, dia, inicio, fin
+            FROM citas
+            WHERE sede_id = ? AND dia BETWEEN ? AND ? AND empleada = ? COLLATE NOCASE
+              AND inicio_min < ? AND fin_min > ?
+            ORDER BY dia ASC, inicio_min ASC
+        """, (int(sede_id), min(dias), max(dias), empleada, fin_min, inicio_min))
+        conflictos = [(f, i, fi) for f, d, i, fi in cur.fetchall() if d in dias]
+        ocupadas = {c[0] for c in conflictos}
+        libres = [f for f in fechas if f not in ocupadas]
+        cur.executemany("""
+            INSERT INTO citas(sede_id, fecha, cliente, servicio, inicio, fin, servicio_id, servicio_nombre, precio,
+                              empleada, inicio_min, fin_min, dia)
+            VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?)
+        """, [(int(sede_id), f, cliente, servicio, inicio, fin,
+               int(servicio_id) if servicio_id else None, servicio_nombre, float(precio), empleada,
+               inicio_min, fin_min, dia_epoch(f)) for f in libres])
+    for f in libres:
+        _avisar_citas(sede_id, f)
+    return libres, conflictos
+
+def listar_citas_dias(sede_id: int, fmin: str, fmax: str):
+    """Como listar_citas pero para varios días: cada fila empieza con la fecha."""
+    cur = get_connection().cursor()
+    cur.execute("""
+        SELECT fecha, id, cliente,
+               COALESCE(servicio_nombre, servicio) as servicio_mostrar,
+               inicio, fin, COALESCE(precio, 0.0) as precio_mostrar,
+               empleada,
+               COALESCE(estado, 'PENDIENTE') as estado
+        FROM citas
+        WHERE sede_id=? AND dia BETWEEN ? AND ?
+        ORDER BY dia ASC, inicio_min ASC
+    """, (int(sede_id), dia_epoch(fmin), dia_epoch(fmax)))
+    return cur.fetchall()
 
 def marcar_cita_atendida(cid: int, nit_receptor: str, nombre_receptor: str, apellidos_receptor: str, facturado_en: str):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute(
-        """
-        UPDATE citas
-        SET estado='ATENDIDA',
-            nit_receptor=?,
-            nombre_receptor=?,
-            apellidos_receptor=?,
-            facturado_en=?
-        WHERE id=?
-        """,
-        (nit_receptor, nombre_receptor, apellidos_receptor, facturado_en, int(cid))
-    )
-    conn.commit()
-    conn.close()
+    with transaccion() as cur:
+        cur.execute(
+            """
+            UPDATE citas
+            SET estado='ATENDIDA',
+                nit_receptor=?,
+                nombre_receptor=?,
+                apellidos_receptor=?,
+                facturado_en=?
+            WHERE id=?
+            """,
+            (nit_receptor, nombre_receptor, apellidos_receptor, facturado_en, int(cid))
+        )
+        dia = _dia_de_cita(cur, cid)
+    if dia:
+        _avisar_citas(*dia)
+
+_EPOCA = date(1970, 1, 1).toordinal()
+
+def dia_epoch(fecha: str) -> int:
+    return date.fromisoformat(fecha[:10]).toordinal() - _EPOCA
+
+def a_minutos(hhmm):
+    """Minutos desde medianoche de 'HH:MM', o None si no es una hora válida.
+
+    Es el único lector de horas: las columnas inicio_min/fin_min y el índice de
+    disponibilidad de agenda.py usan esta misma regla.
+    """
+    s = (hhmm or "").strip()
+    if len(s) != 5 or s[2] != ":" or not (s[:2].isdigit() and s[3:].isdigit()):
+        return None
+    h, m = int(s[:2]), int(s[3:])
+    if h > 23 or m > 59:
+        return None
+    return h * 60 + m
+
+def _insertar_cita(cur, sede_id, fecha, cliente, servicio, inicio, fin, servicio_id, servicio_nombre,
+                   precio, empleada):
+    cur.execute("""
+        INSERT INTO citas(sede_id, fecha, cliente, servicio, inicio, fin, servicio_id, servicio_nombre, precio,
+                          empleada, inicio_min, fin_min, dia)
+        VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?)
+    """, (int(sede_id), fecha, cliente, servicio, inicio, fin,
+          int(servicio_id) if servicio_id else None, servicio_nombre, float(precio), empleada,
+          a_minutos(inicio), a_minutos(fin), dia_epoch(fecha)))
+    return int(cur.lastrowid)
 
 def insertar_cita(sede_id: int, fecha: str, cliente: str, servicio: str, inicio: str, fin: str,
                   servicio_id: int = None, servicio_nombre: str = None, precio: float = 0.0,
                   empleada: str = None) -> int:
-    conn = get_connection()
-    cur = conn.cursor()
+    with transaccion() as cur:
+        cid = _insertar_cita(cur, sede_id, fecha, cliente, servicio, inicio, fin, servicio_id, servicio_nombre,
+                             precio, empleada)
+    _avisar_citas(sede_id, fecha)
+    return cid
+
+def _choque_cita(cur, sede_id, fecha, empleada, inicio_min, fin_min, excluir_cid=None):
     cur.execute("""
-        INSERT INTO citas(sede_id, fecha, cliente, servicio, inicio, fin, servicio_id, servicio_nombre, precio, empleada)
-        VALUES (?,?,?,?,?,?,?,?,?,?)
-    """, (int(sede_id), fecha, cliente, servicio, inicio, fin,
-          int(servicio_id) if servicio_id else None, servicio_nombre, float(precio), empleada))
-    conn.commit()
-    cid = cur.lastrowid
-    conn.close()
+        SELECT id, inicio, fin
+        FROM citas
+        WHERE sede_id = ? AND dia = ? AND empleada = ? COLLATE NOCASE
+          AND inicio_min < ? AND fin_min > ? AND id <> ?
+        LIMIT 1
+    """, (int(sede_id), dia_epoch(fecha), empleada, fin_min, inicio_min, int(excluir_cid or 0)))
+    return cur.fetchone()
+
+def reservar_cita(sede_id: int, fecha: str, cliente: str, servicio: str, inicio: str, fin: str,
+                  servicio_id: int = None, servicio_nombre: str = None, precio: float = 0.0,
+                  empleada: str = None, cid: int = None) -> int:
+    """Crea la cita (o mueve/edita `cid`) solo si la empleada está libre en ese horario."""
+    inicio_min, fin_min = a_minutos(inicio), a_minutos(fin)
+    if inicio_min is None or fin_min is None or fin_min <= inicio_min:
+        raise ValueError("Horario inválido.")
+    if not (empleada or "").strip():
+        raise ValueError("Selecciona una empleada.")
+
+    with transaccion() as cur:
+        anterior = _dia_de_cita(cur, cid) if cid else None
+        if cid and not anterior:
+            raise ValueError("La cita ya no existe.")
+        choque = _choque_cita(cur, sede_id, fecha, empleada, inicio_min, fin_min, cid)
+        if choque:
+            raise ValueError(f"{empleada} ya tiene una cita de {choque[1]} a {choque[2]}.")
+        if cid:
+            cur.execute("""
+                UPDATE citas
+                SET sede_id=?, fecha=?, cliente=?, servicio=?, inicio=?, fin=?, servicio_id=?, servicio_nombre=?,
+                    precio=?, empleada=?, inicio_min=?, fin_min=?, dia=?
+                WHERE id=?
+            """, (int(sede_id), fecha, cliente, servicio, inicio, fin,
+                  int(servicio_id) if servicio_id else None, servicio_nombre, float(precio), empleada,
+                  inicio_min, fin_min, dia_epoch(fecha), int(cid)))
+        else:
+            cid = _insertar_cita(cur, sede_id, fecha, cliente, servicio, inicio, fin, servicio_id,
+                                 servicio_nombre, precio, empleada)
+    if anterior and tuple(anterior) != (int(sede_id), fecha):
+        _avisar_citas(*anterior)
+    _avisar_citas(sede_id, fecha)
     return int(cid)
 
 def actualizar_cita(cid: int, cliente: str, servicio: str, inicio: str, fin: str,
                     servicio_id: int = None, servicio_nombre: str = None, precio: float = None,
                     empleada: str = None):
-    conn = get_connection()
-    cur = conn.cursor()
-    if precio is None:
-        cur.execute("""
-            UPDATE citas
-            SET cliente=?, servicio=?, inicio=?, fin=?, servicio_id=?, servicio_nombre=?, empleada=?
-            WHERE id=?
-        """, (cliente, servicio, inicio, fin,
-              int(servicio_id) if servicio_id else None, servicio_nombre, empleada, int(cid)))
-    else:
-        cur.execute("""
-            UPDATE citas
-            SET cliente=?, servicio=?, inicio=?, fin=?, servicio_id=?, servicio_nombre=?, precio=?, empleada=?
-            WHERE id=?
-        """, (cliente, servicio, inicio, fin,
-              int(servicio_id) if servicio_id else None, servicio_nombre, float(precio), empleada, int(cid)))
-    conn.commit()
-    conn.close()
+    with transaccion() as cur:
+        if precio is None:
+            cur.execute("""
+                UPDATE citas
+                SET cliente=?, servicio=?, inicio=?, fin=?, servicio_id=?, servicio_nombre=?, empleada=?,
+                    inicio_min=?, fin_min=?
+                WHERE id=?
+            """, (cliente, servicio, inicio, fin,
+                  int(servicio_id) if servicio_id else None, servicio_nombre, empleada,
+                  a_minutos(inicio), a_minutos(fin), int(cid)))
+        else:
+            cur.execute("""
+                UPDATE citas
+                SET cliente=?, servicio=?, inicio=?, fin=?, servicio_id=?, servicio_nombre=?, precio=?, empleada=?,
+                    inicio_min=?, fin_min=?
+                WHERE id=?
+            """, (cliente, servicio, inicio, fin,
+                  int(servicio_id) if servicio_id else None, servicio_nombre, float(precio), empleada,
+                  a_minutos(inicio), a_minutos(fin), int(cid)))
+        dia = _dia_de_cita(cur, cid)
+    if dia:
+        _avisar_citas(*dia)
 
 def eliminar_cita(cid: int):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("DELETE FROM citas WHERE id=?", (int(cid),))
-    conn.commit()
-    conn.close()
+    with transaccion() as cur:
+        dia = _dia_de_cita(cur, cid)
+        cur.execute("DELETE FROM citas WHERE id=?", (int(cid),))
+    if dia:
+        _avisar_citas(*dia)
 
 def obtener_cita(cid: int):
-    conn = get_connection()
-    cur = conn.cursor()
+    cur = get_connection().cursor()
     cur.execute("""
         SELECT id, sede_id, fecha, cliente, servicio, inicio, fin, servicio_id, servicio_nombre, precio, empleada
         FROM citas
         WHERE id=?
     """, (int(cid),))
-    row = cur.fetchone()
-    conn.close()
-    return row
+    return cur.fetchone()
 
 
-def crear_tabla_empleadas():
-    conn = get_connection()
-    cur = conn.cursor()
+def _crear_tabla_empleadas(cur):
     cur.execute("""
         CREATE TABLE IF NOT EXISTS empleadas (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -650,16 +1776,10 @@ def crear_tabla_empleadas():
             FOREIGN KEY(sede_id) REFERENCES sedes(id) ON DELETE CASCADE
         )
     """)
-    conn.commit()
-    conn.close()
 
 
-def seed_empleadas():
-    conn = get_connection()
-    cur = conn.cursor()
-
-    cur.execute("SELECT id, nombre FROM sedes ORDER BY id ASC")
-    sedes = cur.fetchall()
+def _seed_empleadas(cur, sede_id=None):
+    sedes = _sedes_a_sembrar(cur, sede_id)
 
     for sid, sname in sedes:
         nombre_s = (sname or "").lower()
@@ -678,19 +1798,243 @@ def seed_empleadas():
             except Exception:
                 pass
 
-    conn.commit()
-    conn.close()
-
 
 def listar_empleadas(sede_id: int):
-    conn = get_connection()
-    cur = conn.cursor()
+    cur = get_connection().cursor()
     cur.execute("""
         SELECT id, nombre
         FROM empleadas
         WHERE sede_id=? AND activo=1
         ORDER BY nombre ASC
     """, (int(sede_id),))
-    rows = cur.fetchall()
-    conn.close()
-    return rows
+    return cur.fetchall()
+
+def listar_empleadas_activas(sede_id: int = None):
+    cur = get_connection().cursor()
+    if sede_id:
+        cur.execute("SELECT sede_id, nombre FROM empleadas WHERE sede_id=? AND activo=1 ORDER BY nombre ASC",
+                    (int(sede_id),))
+    else:
+        cur.execute("SELECT sede_id, nombre FROM empleadas WHERE activo=1 ORDER BY sede_id, nombre ASC")
+    return cur.fetchall()
+
+def listar_agenda_rango(fmin: str, fmax: str, sede_id: int = None):
+    where, params = _filtro_citas(fmin, fmax, sede_id)
+    cur = get_connection().cursor()
+    cur.execute(f"""
+        SELECT c.id, c.sede_id, c.fecha, c.inicio_min, c.fin_min, c.empleada,
+               c.cliente, COALESCE(c.servicio_nombre, c.servicio), COALESCE(c.estado, 'PENDIENTE')
+        FROM citas c
+        WHERE {where} AND c.inicio_min IS NOT NULL AND c.fin_min IS NOT NULL
+        ORDER BY c.dia ASC, c.inicio_min ASC
+    """, params)
+    return cur.fetchall()
+
+# -------------------------- REPORTES --------------------------
+# fmin/fmax son fechas 'YYYY-MM-DD' inclusivas. ventas.fecha guarda también la
+# hora, así que el límite superior se pasa como "< día siguiente" para que el
+# predicado siga siendo un rango sobre el índice.
+
+def _dia_siguiente(fecha: str) -> str:
+    return (date.fromisoformat(fecha[:10]) + timedelta(days=1)).isoformat()
+
+def _filtro_ventas(fmin, fmax, sede_id):
+    sql = "v.fecha >= ? AND v.fecha < ?"
+    params = [fmin, _dia_siguiente(fmax)]
+    if sede_id:
+        sql = "v.sede_id = ? AND " + sql
+        params.insert(0, int(sede_id))
+    return sql, params
+
+def _filtro_citas(fmin, fmax, sede_id):
+    sql = "c.dia BETWEEN ? AND ?"
+    params = [dia_epoch(fmin), dia_epoch(fmax)]
+    if sede_id:
+        sql = "c.sede_id = ? AND " + sql
+        params.insert(0, int(sede_id))
+    return sql, params
+
+def listar_ventas_rango(fmin: str, fmax: str, sede_id: int = None):
+    where, params = _filtro_ventas(fmin, fmax, sede_id)
+    cur = get_connection().cursor()
+    cur.execute(f"""
+        SELECT v.id, s.nombre, COALESCE(v.descripcion, i.nombre, ''), v.cantidad,
+               v.precio_unitario, v.total, v.fecha
+        FROM ventas v
+        JOIN sedes s ON s.id = v.sede_id
+        LEFT JOIN inventario i ON i.id = v.producto_id
+        WHERE {where}
+        ORDER BY v.fecha ASC, v.id ASC
+    """, params)
+    return cur.fetchall()
+
+def listar_citas_rango(fmin: str, fmax: str, sede_id: int = None):
+    where, params = _filtro_citas(fmin, fmax, sede_id)
+    cur = get_connection().cursor()
+    cur.execute(f"""
+        SELECT c.id, s.nombre, c.cliente, COALESCE(c.servicio_nombre, c.servicio),
+               COALESCE(c.precio, 0.0), c.inicio, c.fin, c.fecha
+        FROM citas c
+        JOIN sedes s ON s.id = c.sede_id
+        WHERE {where}
+        ORDER BY c.dia ASC, c.inicio_min ASC
+    """, params)
+    return cur.fetchall()
+
+# (expresión a mostrar, expresión de agrupación)
+_AGRUPAR_VENTAS = {
+    "sede": ("s.nombre", "v.sede_id"),
+    "dia": ("substr(v.fecha, 1, 10)", "substr(v.fecha, 1, 10)"),
+    "producto": ("COALESCE(v.descripcion, '')", "COALESCE(v.descripcion, '')"),
+}
+
+_AGRUPAR_CITAS = {
+    "sede": ("s.nombre", "c.sede_id"),
+    "dia": ("c.fecha", "c.dia"),
+    "servicio": ("COALESCE(c.servicio_nombre, c.servicio)", "COALESCE(c.servicio_nombre, c.servicio)"),
+    "empleada": ("COALESCE(c.empleada, '')", "COALESCE(c.empleada, '')"),
+}
+
+def resumen_ventas(fmin: str, fmax: str, sede_id: int = None, por: str = "sede"):
+    if por not in _AGRUPAR_VENTAS:
+        raise ValueError(f"Agrupación no soportada: {por}")
+    mostrar, agrupar = _AGRUPAR_VENTAS[por]
+    where, params = _filtro_ventas(fmin, fmax, sede_id)
+    cur = get_connection().cursor()
+    cur.execute(f"""
+        SELECT {mostrar}, SUM(v.cantidad), COALESCE(SUM(v.total), 0.0)
+        FROM ventas v
+        JOIN sedes s ON s.id = v.sede_id
+        WHERE {where}
+        GROUP BY {agrupar}
+        ORDER BY 1 ASC
+    """, params)
+    return cur.fetchall()
+
+def resumen_citas(fmin: str, fmax: str, sede_id: int = None, por: str = "sede"):
+    if por not in _AGRUPAR_CITAS:
+        raise ValueError(f"Agrupación no soportada: {por}")
+    mostrar, agrupar = _AGRUPAR_CITAS[por]
+    where, params = _filtro_citas(fmin, fmax, sede_id)
+    cur = get_connection().cursor()
+    cur.execute(f"""
+        SELECT {mostrar}, COUNT(*), COALESCE(SUM(COALESCE(c.precio, 0.0)), 0.0)
+        FROM citas c
+        JOIN sedes s ON s.id = c.sede_id
+        WHERE {where}
+        GROUP BY {agrupar}
+        ORDER BY 1 ASC
+    """, params)
+    return cur.fetchall()
+
+def totales_rango(fmin: str, fmax: str, sede_id: int = None):
+    where, params = _filtro_resumen(fmin, fmax, sede_id)
+    cur = get_connection().cursor()
+    cur.execute(f"""
+        SELECT COALESCE(SUM(ventas_total), 0.0), COALESCE(SUM(citas_total), 0.0)
+        FROM resumen_diario
+        WHERE {where}
+    """, params)
+    total_v, total_c = cur.fetchone()
+    return float(total_v), float(total_c)
+
+# -------------------------- RESUMEN DIARIO --------------------------
+# Una fila por (sede, día) mantenida por triggers sobre ventas y citas, así los
+# reportes mensuales/anuales leen ~365 filas sin importar el volumen.
+
+def _upsert_resumen(sede, fecha, vt, vi, ct, cc, ca):
+    return f"""
+        INSERT INTO resumen_diario(sede_id, fecha, ventas_total, ventas_items, citas_total, citas_cantidad, citas_atendidas)
+        VALUES ({sede}, {fecha}, {vt}, {vi}, {ct}, {cc}, {ca})
+        ON CONFLICT(sede_id, fecha) DO UPDATE SET
+            ventas_total = ventas_total + excluded.ventas_total,
+            ventas_items = ventas_items + excluded.ventas_items,
+            citas_total = citas_total + excluded.citas_total,
+            citas_cantidad = citas_cantidad + excluded.citas_cantidad,
+            citas_atendidas = citas_atendidas + excluded.citas_atendidas;
+    """
+
+def _delta_venta(fila, signo):
+    return _upsert_resumen(f"{fila}.sede_id", f"substr({fila}.fecha, 1, 10)",
+                           f"{signo}{fila}.total", f"{signo}{fila}.cantidad", "0", "0", "0")
+
+def _delta_cita(fila, signo):
+    return _upsert_resumen(f"{fila}.sede_id", f"{fila}.fecha", "0", "0",
+                           f"{signo}COALESCE({fila}.precio, 0.0)", f"{signo}1",
+                           f"{signo}(COALESCE({fila}.estado, '') = 'ATENDIDA')")
+
+def _crear_resumen_diario(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS resumen_diario (
+            sede_id INTEGER NOT NULL,
+            fecha TEXT NOT NULL,
+            ventas_total REAL NOT NULL DEFAULT 0.0,
+            ventas_items INTEGER NOT NULL DEFAULT 0,
+            citas_total REAL NOT NULL DEFAULT 0.0,
+            citas_cantidad INTEGER NOT NULL DEFAULT 0,
+            citas_atendidas INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY(sede_id, fecha)
+        ) WITHOUT ROWID
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_resumen_diario_fecha ON resumen_diario(fecha)")
+    triggers = {
+        "trg_resumen_ventas_ins": ("AFTER INSERT ON ventas", _delta_venta("NEW", "")),
+        "trg_resumen_ventas_del": ("AFTER DELETE ON ventas", _delta_venta("OLD", "-")),
+        "trg_resumen_ventas_upd": ("AFTER UPDATE OF sede_id, fecha, cantidad, total ON ventas",
+                                   _delta_venta("OLD", "-") + _delta_venta("NEW", "")),
+        "trg_resumen_citas_ins": ("AFTER INSERT ON citas", _delta_cita("NEW", "")),
+        "trg_resumen_citas_del": ("AFTER DELETE ON citas", _delta_cita("OLD", "-")),
+        "trg_resumen_citas_upd": ("AFTER UPDATE OF sede_id, fecha, precio, estado ON citas",
+                                  _delta_cita("OLD", "-") + _delta_cita("NEW", "")),
+        # Los ON DELETE CASCADE corren antes, así que esto borra las filas ya en cero.
+        "trg_resumen_sedes_del": ("AFTER DELETE ON sedes",
+                                  "DELETE FROM resumen_diario WHERE sede_id = OLD.id;"),
+    }
+    for nombre, (evento, cuerpo) in triggers.items():
+        cur.execute(f"CREATE TRIGGER IF NOT EXISTS {nombre} {evento} BEGIN {cuerpo} END")
+
+def _reconstruir_resumen_diario(cur):
+    cur.execute("DELETE FROM resumen_diario")
+    cur.execute("""
+        INSERT INTO resumen_diario(sede_id, fecha, ventas_total, ventas_items)
+        SELECT sede_id, substr(fecha, 1, 10), SUM(total), SUM(cantidad)
+        FROM ventas
+        GROUP BY sede_id, substr(fecha, 1, 10)
+    """)
+    cur.execute("""
+        INSERT INTO resumen_diario(sede_id, fecha, citas_total, citas_cantidad, citas_atendidas)
+        SELECT sede_id, fecha, SUM(COALESCE(precio, 0.0)), COUNT(*),
+               SUM(COALESCE(estado, '') = 'ATENDIDA')
+        FROM citas
+        WHERE 1
+        GROUP BY sede_id, fecha
+        ON CONFLICT(sede_id, fecha) DO UPDATE SET
+            citas_total = excluded.citas_total,
+            citas_cantidad = excluded.citas_cantidad,
+            citas_atendidas = excluded.citas_atendidas
+    """)
+
+def reconstruir_resumen_diario():
+    with transaccion() as cur:
+        _reconstruir_resumen_diario(cur)
+
+def _filtro_resumen(fmin, fmax, sede_id):
+    sql = "fecha BETWEEN ? AND ?"
+    params = [fmin, fmax]
+    if sede_id:
+        sql = "sede_id = ? AND " + sql
+        params.insert(0, int(sede_id))
+    return sql, params
+
+def listar_resumen_diario(fmin: str, fmax: str, sede_id: int = None):
+    where, params = _filtro_resumen(fmin, fmax, sede_id)
+    cur = get_connection().cursor()
+    cur.execute(f"""
+        SELECT fecha, SUM(ventas_total), SUM(ventas_items),
+               SUM(citas_total), SUM(citas_cantidad), SUM(citas_atendidas)
+        FROM resumen_diario
+        WHERE {where}
+        GROUP BY fecha
+        ORDER BY fecha ASC
+    """, params)
+    return cur.fetchall()
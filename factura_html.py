@@ -26,9 +26,13 @@ def _auth_random(n=36):
     return "".join(random.choice(chars) for _ in range(int(n)))
 
 
-def abrir_factura_en_navegador(nit_receptor, nombres, apellidos, items, carpeta="facturas_html"):
+def nueva_autorizacion():
+    return _auth_random(36)
+
+
+def abrir_factura_en_navegador(nit_receptor, nombres, apellidos, items, carpeta="facturas_html", autorizacion=None):
     os.makedirs(carpeta, exist_ok=True)
-    auth = _auth_random(36)
+    auth = autorizacion or nueva_autorizacion()
     now = datetime.datetime.now().strftime("%d-%b-%Y %H:%M:%S").lower()
 
     total_general = 0.0
@@ -1,6 +1,9 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 import db
+import tareas
+import catalogo
+from tabla_virtual import TablaVirtual
 from side_bar import SideBar
 from ventas import VentasFrame
 from citas import CitasFrame
@@ -178,6 +181,8 @@ class ProductoDialog(tk.Toplevel):
         self.var_stock = tk.StringVar(value=str(initial["stock"]) if initial else "0")
         self.var_precio = tk.StringVar(value=str(initial["precio"]) if initial else "0.0")
         self.var_cat = tk.StringVar(value=initial.get("categoria", "") if initial else "")
+        self.var_codigo = tk.StringVar(value=(initial.get("codigo") or "") if initial else "")
+        self.var_punto = tk.StringVar(value=str(initial.get("punto_reorden", db.PUNTO_REORDEN)) if initial else str(db.PUNTO_REORDEN))
 
         card = tk.Frame(self, bg=BG_CARDS, highlightthickness=1, highlightbackground=BG_SECONDARY)
         card.pack(padx=26, pady=22, expand=True, fill="both")
@@ -221,8 +226,18 @@ class ProductoDialog(tk.Toplevel):
             command=self._crear_categoria
         ).grid(row=0, column=1, padx=(10, 0), ipadx=10, ipady=6)
 
+        tk.Label(frm, text="Código:", bg=BG_CARDS, fg=TEXT, font=("Segoe UI", 11, "bold")) \
+            .grid(row=4, column=0, sticky="e", padx=10, pady=10)
+        tk.Entry(frm, textvariable=self.var_codigo) \
+            .grid(row=4, column=1, sticky="we", padx=10, pady=10)
+
+        tk.Label(frm, text="Punto de reorden:", bg=BG_CARDS, fg=TEXT, font=("Segoe UI", 11, "bold")) \
+            .grid(row=5, column=0, sticky="e", padx=10, pady=10)
+        tk.Entry(frm, textvariable=self.var_punto) \
+            .grid(row=5, column=1, sticky="we", padx=10, pady=10)
+
         botones = tk.Frame(frm, bg=BG_CARDS)
-        botones.grid(row=4, column=0, columnspan=2, pady=(18, 0))
+        botones.grid(row=6, column=0, columnspan=2, pady=(18, 0))
 
         tk.Button(
             botones, text="Guardar",
@@ -307,13 +322,14 @@ class ProductoDialog(tk.Toplevel):
             nombre = self.var_nombre.get().strip()
             stock = int(self.var_stock.get())
             precio = float(self.var_precio.get())
-            if not nombre or stock < 0 or precio < 0:
+            punto = int(self.var_punto.get())
+            if not nombre or stock < 0 or precio < 0 or punto < 0:
                 raise ValueError
         except Exception:
             messagebox.showwarning("Validación", "Datos inválidos.")
             return
 
-        self.result = (nombre, stock, precio, self._categoria_id())
+        self.result = (nombre, stock, precio, self._categoria_id(), self.var_codigo.get().strip(), punto)
         self.destroy()
 
 
@@ -403,11 +419,179 @@ class AjustarExistenciasDialog(tk.Toplevel):
         self.destroy()
 
 
+class ReordenDialog(tk.Toplevel):
+    """Lista de compra según el punto de reorden y lo vendido en los últimos días."""
+
+    def __init__(self, master, sede_id):
+        super().__init__(master)
+        self.sede_id = int(sede_id)
+        self.title("Sugerencia de reorden")
+        self.configure(bg=BG_PRIMARY)
+        self.geometry("900x560")
+        self.transient(master)
+
+        _apply_ttk_styles(self)
+
+        card = tk.Frame(self, bg=BG_CARDS, highlightthickness=1, highlightbackground=BG_SECONDARY)
+        card.pack(padx=18, pady=18, expand=True, fill="both")
+
+        barra = tk.Frame(card, bg=BG_CARDS)
+        barra.pack(fill="x", padx=14, pady=(14, 8))
+
+        self.var_historial = tk.StringVar(value="30")
+        self.var_cobertura = tk.StringVar(value="14")
+        tk.Label(barra, text="Ventas de los últimos", bg=BG_CARDS, fg=TEXT, font=("Segoe UI", 10, "bold")).pack(side="left")
+        tk.Spinbox(barra, from_=1, to=365, width=5, textvariable=self.var_historial).pack(side="left", padx=6)
+        tk.Label(barra, text="días · cubrir", bg=BG_CARDS, fg=TEXT, font=("Segoe UI", 10, "bold")).pack(side="left")
+        tk.Spinbox(barra, from_=0, to=180, width=5, textvariable=self.var_cobertura).pack(side="left", padx=6)
+        tk.Label(barra, text="días", bg=BG_CARDS, fg=TEXT, font=("Segoe UI", 10, "bold")).pack(side="left")
+        tk.Button(barra, text="CALCULAR", bg=BUTTONS, fg="white", bd=0, cursor="hand2",
+                  activebackground=BUTTONS_SECONDARY, font=("Segoe UI", 10, "bold"),
+                  command=self._cargar).pack(side="left", padx=12, ipadx=12, ipady=4)
+        self.lbl_resumen = tk.Label(barra, text="", bg=BG_CARDS, fg=TEXT_MUTED, font=("Segoe UI", 10, "bold"))
+        self.lbl_resumen.pack(side="right")
+
+        columnas = ("Producto", "Existencias", "Punto", "Vendidos", "Consumo/día", "Sugerido")
+        self.tree = ttk.Treeview(card, columns=columnas, show="headings", style="Soft.Treeview")
+        for col in columnas:
+            self.tree.heading(col, text=col)
+            self.tree.column(col, anchor="center", width=300 if col == "Producto" else 100)
+        self.tree.pack(expand=True, fill="both", padx=14, pady=(0, 14))
+
+        self._cargar()
+
+    def _cargar(self):
+        try:
+            historial = int(self.var_historial.get())
+            cobertura = int(self.var_cobertura.get())
+        except ValueError:
+            messagebox.showwarning("Validación", "Ingresa días válidos.", parent=self)
+            return
+        tareas.ejecutar(self, "reorden", lambda: db.sugerencia_reorden(self.sede_id, historial, cobertura),
+                        self._mostrar)
+
+    def _mostrar(self, filas):
+        self.tree.delete(*self.tree.get_children())
+        for pid, nombre, stock, punto, vendidos, consumo, sugerido in filas:
+            self.tree.insert("", "end", iid=str(pid),
+                             values=(nombre, stock, punto, vendidos, f"{consumo:.2f}", sugerido))
+        total = sum(f[6] for f in filas)
+        self.lbl_resumen.config(text=f"{len(filas)} productos · {total} unidades")
+
+
+class TransferirDialog(tk.Toplevel):
+    """Pasa existencias de un producto a otra sede y muestra las últimas transferencias."""
+
+    def __init__(self, master, sede_id, pid, producto, stock_actual, usuario=None, al_transferir=None):
+        super().__init__(master)
+        self.sede_id = int(sede_id)
+        self.pid = int(pid)
+        self.stock = int(stock_actual)
+        self.usuario = usuario
+        self.al_transferir = al_transferir
+        self.title("Transferir a otra sede")
+        self.configure(bg=BG_PRIMARY)
+        self.geometry("900x560")
+        self.transient(master)
+
+        _apply_ttk_styles(self)
+
+        card = tk.Frame(self, bg=BG_CARDS, highlightthickness=1, highlightbackground=BG_SECONDARY)
+        card.pack(padx=18, pady=18, expand=True, fill="both")
+
+        head = tk.Frame(card, bg=BG_CARDS)
+        head.pack(fill="x", padx=14, pady=(14, 8))
+        tk.Label(head, text=producto, bg=BG_CARDS, fg=TEXT, font=("Segoe UI", 14, "bold")).pack(anchor="w")
+        self.lbl_stock = tk.Label(head, text=f"Stock actual: {self.stock}", bg=BG_CARDS, fg=TEXT_MUTED,
+                                  font=("Segoe UI", 10, "bold"))
+        self.lbl_stock.pack(anchor="w", pady=(4, 0))
+
+        barra = tk.Frame(card, bg=BG_CARDS)
+        barra.pack(fill="x", padx=14, pady=(0, 8))
+
+        self.var_destino = tk.StringVar(value="")
+        self.var_cant = tk.StringVar(value="1")
+        tk.Label(barra, text="Sede destino", bg=BG_CARDS, fg=TEXT, font=("Segoe UI", 10, "bold")).pack(side="left")
+        self.cb_destino = ttk.Combobox(barra, textvariable=self.var_destino, state="readonly",
+                                       style="Soft.TCombobox", width=24)
+        self.cb_destino.pack(side="left", padx=6)
+        tk.Label(barra, text="Cantidad", bg=BG_CARDS, fg=TEXT, font=("Segoe UI", 10, "bold")).pack(side="left", padx=(12, 0))
+        ent = tk.Entry(barra, textvariable=self.var_cant, width=8, relief="flat", font=("Segoe UI", 11, "bold"))
+        ent.pack(side="left", padx=6, ipady=4)
+        tk.Button(barra, text="TRANSFERIR", bg=BUTTONS, fg="white", bd=0, cursor="hand2",
+                  activebackground=BUTTONS_SECONDARY, font=("Segoe UI", 10, "bold"),
+                  command=self._transferir).pack(side="left", padx=12, ipadx=12, ipady=4)
+
+        columnas = ("Fecha", "Origen", "Destino", "Producto", "Cantidad", "Usuario")
+        self.tree = ttk.Treeview(card, columns=columnas, show="headings", style="Soft.Treeview")
+        for col in columnas:
+            self.tree.heading(col, text=col)
+            self.tree.column(col, anchor="center", width=220 if col == "Producto" else 110)
+        self.tree.pack(expand=True, fill="both", padx=14, pady=(0, 14))
+
+        self.bind("<Return>", lambda e: self._transferir())
+        self.bind("<Escape>", lambda e: self.destroy())
+        ent.focus_set()
+        ent.selection_range(0, "end")
+
+        self._cargar_sedes()
+        self._cargar()
+
+    def _cargar_sedes(self):
+        tareas.ejecutar(self, "sedes", db.listar_sedes_simple, self._mostrar_sedes)
+
+    def _mostrar_sedes(self, filas):
+        sedes = [f"{sid} - {n}" for sid, n in filas if int(sid) != self.sede_id]
+        self.cb_destino["values"] = sedes
+        if sedes and self.var_destino.get() not in sedes:
+            self.var_destino.set(sedes[0])
+
+    def _cargar(self):
+        tareas.ejecutar(self, "transferencias", lambda: db.listar_transferencias(self.sede_id), self._mostrar)
+
+    def _mostrar(self, filas):
+        self.tree.delete(*self.tree.get_children())
+        for tid, fecha, _so, origen, _sd, destino, nombre, cantidad, usuario in filas:
+            self.tree.insert("", "end", iid=str(tid), values=(fecha, origen, destino, nombre, cantidad, usuario or ""))
+
+    def _transferir(self):
+        sel = self.var_destino.get().split(" - ", 1)[0].strip()
+        destino = int(sel) if sel.isdigit() else None
+        if destino is None:
+            messagebox.showwarning("Validación", "Elige la sede destino.", parent=self)
+            return
+        try:
+            cant = int((self.var_cant.get() or "").strip())
+        except ValueError:
+            cant = 0
+        if cant <= 0 or cant > self.stock:
+            messagebox.showwarning("Validación", f"Ingresa una cantidad entre 1 y {self.stock}.", parent=self)
+            return
+        try:
+            db.transferir_stock(self.sede_id, destino, self.pid, cant, self.usuario)
+        except Exception as e:
+            messagebox.showerror("Error", str(e), parent=self)
+            return
+        self.stock -= cant
+        self.lbl_stock.config(text=f"Stock actual: {self.stock}")
+        if self.al_transferir:
+            self.al_transferir()
+        self._cargar()
+
+
 class InventarioView(tk.Frame):
-    def __init__(self, master, sede_id, user_role):
+    POR_PAGINA = 200
+    _ORDENES = {"nombre": "nombre", "categoría": "categoria", "categoria": "categoria",
+                "existencias": "stock", "precio": "precio"}
+
+    def __init__(self, master, sede_id, user_role, usuario=None):
         super().__init__(master, bg=BG_PRIMARY)
         self.sede_id = int(sede_id)
         self.user_role = user_role
+        self.usuario = usuario
+        self._pagina = 0
+        self._total = 0
+        self._cats_filtro = {}
 
         panel = tk.Frame(self, bg=BG_PRIMARY)
         panel.pack(expand=True, fill="both", padx=20, pady=20)
@@ -480,7 +664,7 @@ class InventarioView(tk.Frame):
         self.cb_cat_filtro.grid(row=0, column=6, padx=(0, 12), pady=pad_y, sticky="we")
 
         chk = tk.Checkbutton(
-            filtros, text="Stock bajo (<5)", variable=self.var_stock_bajo,
+            filtros, text="Stock bajo", variable=self.var_stock_bajo,
             bg=BG_SECONDARY, fg=TEXT, activebackground=BG_SECONDARY,
             font=("Segoe UI", 10, "bold"), cursor="hand2"
         )
@@ -510,7 +694,7 @@ class InventarioView(tk.Frame):
         # =========================
         # ✅ TABLA (CENTRADA)
         # =========================
-        self.tree = ttk.Treeview(
+        self.tree = TablaVirtual(
             inner,
             columns=("Producto", "Categoría", "Existencias", "Precio"),
             show="headings",
@@ -529,8 +713,19 @@ class InventarioView(tk.Frame):
 
         self.tree.grid(row=2, column=0, sticky="nsew")
 
+        paginas = tk.Frame(inner, bg=BG_CARDS)
+        paginas.grid(row=3, column=0, pady=(8, 0))
+        self.btn_anterior = tk.Button(paginas, text="◀", bg=BG_SECONDARY, fg=TEXT, bd=0, cursor="hand2",
+                                      font=("Segoe UI", 10, "bold"), command=lambda: self._ir_pagina(-1))
+        self.btn_anterior.pack(side="left", ipadx=10, ipady=4)
+        self.lbl_pagina = tk.Label(paginas, text="", bg=BG_CARDS, fg=TEXT, font=("Segoe UI", 10, "bold"))
+        self.lbl_pagina.pack(side="left", padx=12)
+        self.btn_siguiente = tk.Button(paginas, text="▶", bg=BG_SECONDARY, fg=TEXT, bd=0, cursor="hand2",
+                                       font=("Segoe UI", 10, "bold"), command=lambda: self._ir_pagina(1))
+        self.btn_siguiente.pack(side="left", ipadx=10, ipady=4)
+
         barra = tk.Frame(inner, bg=BG_CARDS)
-        barra.grid(row=3, column=0, pady=10)
+        barra.grid(row=4, column=0, pady=10)
 
         tk.Button(barra, text="AGREGAR", bg=BUTTONS, fg="white",
                   font=("Segoe UI", 11, "bold"), command=self._agregar) \
@@ -548,32 +743,48 @@ class InventarioView(tk.Frame):
                   font=("Segoe UI", 11, "bold"), command=self._restar_existencias) \
             .pack(side="left", padx=6, ipadx=16, ipady=10)
 
+        tk.Button(barra, text="REORDEN", bg=BUTTONS, fg="white",
+                  font=("Segoe UI", 11, "bold"), command=self._reorden) \
+            .pack(side="left", padx=6, ipadx=16, ipady=10)
+
+        tk.Button(barra, text="TRANSFERIR", bg=BUTTONS, fg="white",
+                  font=("Segoe UI", 11, "bold"), command=self._transferir) \
+            .pack(side="left", padx=6, ipadx=16, ipady=10)
+
+        btn_catalogo = tk.Menubutton(barra, text="CATÁLOGO ▾", bg=BUTTONS, fg="white", relief="raised",
+                                     font=("Segoe UI", 11, "bold"), cursor="hand2")
+        menu = tk.Menu(btn_catalogo, tearoff=0)
+        menu.add_command(label="Importar productos…", command=lambda: self._importar("productos"))
+        menu.add_command(label="Exportar productos…", command=lambda: self._exportar("productos"))
+        menu.add_separator()
+        menu.add_command(label="Importar servicios…", command=lambda: self._importar("servicios"))
+        menu.add_command(label="Exportar servicios…", command=lambda: self._exportar("servicios"))
+        btn_catalogo.configure(menu=menu)
+        btn_catalogo.pack(side="left", padx=6, ipadx=16, ipady=10)
+
         tk.Button(barra, text="ELIMINAR", bg=WARNING, fg=TEXT,
                   font=("Segoe UI", 11, "bold"), command=self._eliminar) \
             .pack(side="left", padx=6, ipadx=16, ipady=10)
 
-        db.crear_tabla_inventario()
-        db.crear_tabla_categorias_inventario()
-        db.asegurar_columna_categoria_id()
-
         self._cargar_categorias_filtro()
 
-        ent_buscar.bind("<KeyRelease>", lambda e: self._cargar())
-        ent_pmin.bind("<KeyRelease>", lambda e: self._cargar())
-        ent_pmax.bind("<KeyRelease>", lambda e: self._cargar())
-        self.var_ord_por.trace_add("write", lambda *args: self._cargar())
-        self.var_orden.trace_add("write", lambda *args: self._cargar())
-        self.var_cat_filtro.trace_add("write", lambda *args: self._cargar())
-        self.var_stock_bajo.trace_add("write", lambda *args: self._cargar())
+        ent_buscar.bind("<KeyRelease>", lambda e: self._filtrar())
+        ent_pmin.bind("<KeyRelease>", lambda e: self._filtrar())
+        ent_pmax.bind("<KeyRelease>", lambda e: self._filtrar())
+        self.var_ord_por.trace_add("write", lambda *args: self._filtrar())
+        self.var_orden.trace_add("write", lambda *args: self._filtrar())
+        self.var_cat_filtro.trace_add("write", lambda *args: self._filtrar())
+        self.var_stock_bajo.trace_add("write", lambda *args: self._filtrar())
 
         self._cargar()
 
     def _cargar_categorias_filtro(self):
-        try:
-            cats = db.listar_categorias_inventario(self.sede_id)
-            nombres = ["Todas"] + [n for (_id, n) in cats]
-        except Exception:
-            nombres = ["Todas"]
+        tareas.ejecutar(self, "categorias", lambda: db.listar_categorias_inventario(self.sede_id),
+                        self._mostrar_categorias_filtro, lambda e: self._mostrar_categorias_filtro([]))
+
+    def _mostrar_categorias_filtro(self, cats):
+        self._cats_filtro = {n: int(cid) for cid, n in cats}
+        nombres = ["Todas"] + [n for (_id, n) in cats]
 
         self.cb_cat_filtro["values"] = nombres
         if not (self.var_cat_filtro.get() or "").strip():
@@ -589,87 +800,71 @@ class InventarioView(tk.Frame):
         self.var_stock_bajo.set(False)
         self.var_precio_min.set("")
         self.var_precio_max.set("")
-        self._cargar()
-
-    def _cargar(self):
-        for i in self.tree.get_children():
-            self.tree.delete(i)
-
-        data = list(db.listar_inventario(self.sede_id))
-        txt = (self.var_buscar.get() or "").strip().lower()
-        cat = (self.var_cat_filtro.get() or "Todas").strip().lower()
-        solo_bajo = bool(self.var_stock_bajo.get())
-
-        pmin_txt = (self.var_precio_min.get() or "").strip()
-        pmax_txt = (self.var_precio_max.get() or "").strip()
-        pmin = None
-        pmax = None
-        try:
-            if pmin_txt != "":
-                pmin = float(pmin_txt)
-        except Exception:
-            pmin = None
-        try:
-            if pmax_txt != "":
-                pmax = float(pmax_txt)
-        except Exception:
-            pmax = None
-
-        filtrado = []
-        for pid, nombre, stock, precio, categoria in data:
-            nombre_s = (nombre or "")
-            categoria_s = (categoria or "")
-
-            if txt and txt not in nombre_s.lower():
-                continue
-
-            if cat != "todas" and categoria_s.strip().lower() != cat:
-                continue
-
-            try:
-                stock_i = int(stock)
-            except Exception:
-                stock_i = 0
-
-            if solo_bajo and stock_i >= 5:
-                continue
+        self._filtrar()
 
-            try:
-                precio_f = float(precio)
-            except Exception:
-                precio_f = 0.0
-
-            if pmin is not None and precio_f < pmin:
-                continue
-            if pmax is not None and precio_f > pmax:
-                continue
+    def _filtrar(self):
+        self._pagina = 0
+        self._cargar()
 
-            filtrado.append((pid, nombre_s, stock_i, precio_f, categoria_s))
+    def _ir_pagina(self, delta):
+        ultima = max(0, (self._total - 1) // self.POR_PAGINA)
+        pagina = max(0, min(ultima, self._pagina + delta))
+        if pagina != self._pagina:
+            self._pagina = pagina
+            self._cargar()
 
-        key = (self.var_ord_por.get() or "Nombre").strip().lower()
-        reverse = ((self.var_orden.get() or "Ascendente").strip().lower() == "descendente")
+    @staticmethod
+    def _precio(texto):
+        try:
+            return float(texto) if (texto or "").strip() else None
+        except ValueError:
+            return None
 
-        def sort_key(row):
-            pid, nombre_s, stock_i, precio_f, categoria_s = row
-            if key == "existencias":
-                return stock_i
-            if key == "precio":
-                return precio_f
-            if key in ("categoría", "categoria"):
-                return categoria_s.lower()
-            return nombre_s.lower()
+    def _cargar(self):
+        cat = (self.var_cat_filtro.get() or "Todas").strip()
+        orden = self._ORDENES.get((self.var_ord_por.get() or "Nombre").strip().lower(), "nombre")
+        filtros = dict(
+            texto=(self.var_buscar.get() or "").strip(),
+            categoria_id=self._cats_filtro.get(cat) if cat != "Todas" else None,
+            solo_bajo=bool(self.var_stock_bajo.get()),
+            precio_min=self._precio(self.var_precio_min.get()),
+            precio_max=self._precio(self.var_precio_max.get()),
+            orden=orden,
+            desc=(self.var_orden.get() or "Ascendente").strip().lower() == "descendente",
+            limit=self.POR_PAGINA,
+            offset=self._pagina * self.POR_PAGINA,
+        )
+        tareas.ejecutar(self, "inventario", lambda: db.consultar_inventario(self.sede_id, **filtros), self._mostrar)
+
+    def _mostrar(self, resultado):
+        filas, total = resultado
+        self._total = total
+        if not filas and self._pagina > 0 and total:
+            # La página quedó fuera de rango (se borraron productos): ir a la última.
+            self._pagina = (total - 1) // self.POR_PAGINA
+            self._cargar()
+            return
 
-        filtrado.sort(key=sort_key, reverse=reverse)
+        self.tree.cargar((pid, (nombre, categoria or "", int(stock), f"{float(precio):.2f}"))
+                         for pid, nombre, stock, precio, categoria in filas)
 
-        for pid, nombre_s, stock_i, precio_f, categoria_s in filtrado:
-            self.tree.insert("", "end", iid=str(pid),
-                             values=(nombre_s, categoria_s, stock_i, f"{precio_f:.2f}"))
+        desde = self._pagina * self.POR_PAGINA
+        texto = f"{desde + 1}–{desde + len(filas)} de {total}" if filas else "Sin productos"
+        self.lbl_pagina.config(text=texto)
+        self.btn_anterior.config(state="normal" if self._pagina > 0 else "disabled")
+        self.btn_siguiente.config(state="normal" if desde + len(filas) < total else "disabled")
 
     def _agregar(self):
         dlg = ProductoDialog(self.winfo_toplevel(), self.sede_id, "Agregar producto")
         self.winfo_toplevel().wait_window(dlg)
         if dlg.result:
-            db.insertar_producto(self.sede_id, *dlg.result)
+            nombre, stock, precio, categoria_id, codigo, punto = dlg.result
+            try:
+                db.insertar_producto(self.sede_id, nombre, stock, precio, categoria_id, codigo,
+                                     usuario=self.usuario, punto_reorden=punto)
+            except ValueError as e:
+                messagebox.showwarning("Producto", str(e))
+                return
             self._cargar_categorias_filtro()
             self._cargar()
 
@@ -678,16 +873,29 @@ class InventarioView(tk.Frame):
         if not sel:
             return
         pid = int(sel[0])
-        nombre, categoria, stock, precio = self.tree.item(sel[0], "values")
+        valores = self.tree.item(sel[0], "values")
+        tareas.ejecutar(self, "producto", lambda: db.obtener_producto(pid),
+                        lambda producto: self._modificar_producto(pid, valores, producto))
+
+    def _modificar_producto(self, pid, valores, producto):
+        nombre, categoria, stock, precio = valores
         dlg = ProductoDialog(
             self.winfo_toplevel(),
             self.sede_id,
             "Modificar producto",
-            initial={"nombre": nombre, "categoria": categoria, "stock": stock, "precio": precio}
+            initial={"nombre": nombre, "categoria": categoria, "stock": stock, "precio": precio,
+                     "codigo": producto[6] if producto else "",
+                     "punto_reorden": producto[7] if producto else db.PUNTO_REORDEN}
         )
         self.winfo_toplevel().wait_window(dlg)
         if dlg.result:
-            db.actualizar_producto(pid, *dlg.result)
+            nombre, stock, precio, categoria_id, codigo, punto = dlg.result
+            try:
+                db.actualizar_producto(pid, nombre, stock, precio, categoria_id, codigo,
+                                       usuario=self.usuario, punto_reorden=punto)
+            except ValueError as e:
+                messagebox.showwarning("Producto", str(e))
+                return
             self._cargar_categorias_filtro()
             self._cargar()
 
@@ -702,7 +910,7 @@ class InventarioView(tk.Frame):
         if not dlg.result:
             return
         try:
-            db.ajustar_stock(self.sede_id, pid, int(dlg.result))
+            db.ajustar_stock(self.sede_id, pid, int(dlg.result), usuario=self.usuario)
             self._cargar()
         except Exception as e:
             messagebox.showerror("Error", str(e))
@@ -723,11 +931,69 @@ class InventarioView(tk.Frame):
         if not dlg.result:
             return
         try:
-            db.ajustar_stock(self.sede_id, pid, -int(dlg.result))
+            db.ajustar_stock(self.sede_id, pid, -int(dlg.result), usuario=self.usuario)
             self._cargar()
         except Exception as e:
             messagebox.showerror("Error", str(e))
 
+    def _reorden(self):
+        ReordenDialog(self.winfo_toplevel(), self.sede_id)
+
+    def _transferir(self):
+        sel = self.tree.selection()
+        if not sel:
+            return
+        nombre, categoria, stock, precio = self.tree.item(sel[0], "values")
+        TransferirDialog(self.winfo_toplevel(), self.sede_id, int(sel[0]), nombre, int(stock),
+                         usuario=self.usuario, al_transferir=self._cargar)
+
+    def _tipos_archivo(self):
+        tipos = [("CSV", "*.csv")]
+        if catalogo.openpyxl is not None:
+            tipos.append(("Excel", "*.xlsx"))
+        return tipos
+
+    def _importar(self, que):
+        ruta = filedialog.askopenfilename(parent=self, title=f"Importar {que}", filetypes=self._tipos_archivo())
+        if not ruta:
+            return
+
+        def importar():
+            if que == "productos":
+                return catalogo.importar_productos(self.sede_id, ruta, self.usuario)
+            return catalogo.importar_servicios(self.sede_id, ruta)
+
+        def listo(resultado):
+            creados, actualizados, errores = resultado
+            texto = f"Creados: {creados}\nActualizados: {actualizados}"
+            if errores:
+                texto += f"\n\nFilas con errores ({len(errores)}):\n"
+                texto += "\n".join(f"Línea {linea}: {msg}" for linea, msg in errores[:15])
+                if len(errores) > 15:
+                    texto += "\n…"
+            if que == "productos":
+                self._cargar_categorias_filtro()
+                self._cargar()
+            messagebox.showinfo("Importar", texto, parent=self)
+
+        tareas.ejecutar(self, "catalogo", importar, listo,
+                        lambda e: messagebox.showerror("Importar", str(e), parent=self))
+
+    def _exportar(self, que):
+        ruta = filedialog.asksaveasfilename(parent=self, title=f"Exportar {que}", defaultextension=".csv",
+                                            initialfile=f"{que}.csv", filetypes=self._tipos_archivo())
+        if not ruta:
+            return
+
+        def exportar():
+            if que == "productos":
+                return catalogo.exportar_productos(self.sede_id, ruta)
+            return catalogo.exportar_servicios(self.sede_id, ruta)
+
+        tareas.ejecutar(self, "catalogo", exportar,
+                        lambda n: messagebox.showinfo("Exportar", f"{n} filas guardadas en\n{ruta}", parent=self),
+                        lambda e: messagebox.showerror("Exportar", str(e), parent=self))
+
     def _eliminar(self):
         sel = self.tree.selection()
         if not sel:
@@ -738,7 +1004,7 @@ class InventarioView(tk.Frame):
 
 
 class InventarioWindow(tk.Toplevel):
-    def __init__(self, master, sede_id, user_role="dependiente", on_back=None):
+    def __init__(self, master, sede_id, user_role="dependiente", on_back=None, usuario=None):
         super().__init__(master)
         self.sede_id = int(sede_id)
         self.user_role = user_role
@@ -777,8 +1043,8 @@ class InventarioWindow(tk.Toplevel):
         self.container.grid_rowconfigure(0, weight=1)
         self.container.grid_columnconfigure(0, weight=1)
 
-        self.view_inventario = InventarioView(self.container, self.sede_id, user_role)
-        self.view_ventas = VentasFrame(self.container, self.sede_id, user_role)
+        self.view_inventario = InventarioView(self.container, self.sede_id, user_role, usuario=usuario)
+        self.view_ventas = VentasFrame(self.container, self.sede_id, user_role, usuario=usuario)
         self.view_citas = CitasFrame(self.container, self.sede_id, user_role)
         self.view_usuarios = UsuariosFrame(self.container, user_role, self.sede_id) if user_role == "administrador" else None
 
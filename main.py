@@ -4,6 +4,7 @@ import tkinter as tk
 import tkinter.ttk as ttk
 from tkinter import messagebox
 import db
+import tareas
 from sedes_selector import SeleccionSede
 db.init_db()
 
@@ -232,6 +233,11 @@ class AppLogin(tk.Tk):
                 messagebox.showerror("Error", f"Contrasena incorrecta. Intentos restantes: {restantes}")
 
 
-db.init_db()
 app = AppLogin()
-app.mainloop()
\ No newline at end of file
+app.mainloop()
+tareas.cerrar()
+try:
+    db.checkpoint("TRUNCATE")
+except Exception:
+    pass
+db.cerrar_conexiones()
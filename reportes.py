@@ -2,6 +2,8 @@ import tkinter as tk
 import tkinter.ttk as ttk
 from datetime import date, timedelta
 import db
+import tareas
+from tabla_virtual import TablaVirtual
 
 BG_PRIMARY = '#fccfd4'
 BG_SECONDARY = '#fccfd4'
@@ -64,7 +66,7 @@ class ReportesWindow(tk.Toplevel):
         tabla_frame.pack(expand=True, fill="both", padx=6, pady=6)
 
         cols = ("Tipo", "Concepto", "Cant/Cliente", "P.Unitario", "Total", "Fecha")
-        self.tree = ttk.Treeview(tabla_frame, columns=cols, show="headings", height=18)
+        self.tree = TablaVirtual(tabla_frame, columns=cols, show="headings", height=18)
         for c, w in zip(cols, (80, 330, 160, 100, 100, 120)):
             self.tree.heading(c, text=c)
             self.tree.column(c, width=w, anchor="center")
@@ -125,24 +127,40 @@ class ReportesWindow(tk.Toplevel):
 
         sede_id = int(sede_id_str or "0")
 
-        for i in self.tree.get_children():
-            self.tree.delete(i)
+        sede_filtro = sede_id if sede_id != 0 else None
+        resumido = modo in ("mensual", "anual")
+
+        def consultar():
+            totales = db.totales_rango(fmin, fmax, sede_filtro)
+            if resumido:
+                return totales, db.listar_resumen_diario(fmin, fmax, sede_filtro), [], []
+            return (totales, [], db.listar_ventas_rango(fmin, fmax, sede_filtro),
+                    db.listar_citas_rango(fmin, fmax, sede_filtro))
+
+        tareas.ejecutar(self, "reporte", consultar, lambda r: self._mostrar(*r))
+
+    def _mostrar(self, totales, resumen, ventas, citas):
+        total_v, total_c = totales
+        filas = []
+
+        for (ffecha, vt, vi, ct, cc, ca) in resumen:
+            if vi:
+                filas.append((f"rv{ffecha}",
+                              ("Ventas", "Resumen del día", str(vi), "", f"{vt:.2f}", ffecha)))
+            if cc:
+                filas.append((f"rc{ffecha}",
+                              ("Citas", f"Resumen del día ({ca} atendidas)", str(cc), "",
+                               f"{ct:.2f}", ffecha)))
 
-        ventas = db.listar_ventas_rango(fmin, fmax, sede_id if sede_id != 0 else None)
-        total_v = 0.0
         for (vid, sede, prod, cant, punit, total, ffecha) in ventas:
-            total_v += float(total or 0.0)
-            self.tree.insert("", "end",
-                             values=("Venta", prod, str(cant), f"{punit:.2f}", f"{total:.2f}", ffecha))
+            filas.append((f"v{vid}", ("Venta", prod, str(cant), f"{punit:.2f}", f"{total:.2f}", ffecha)))
 
-        citas = db.listar_citas_rango(fmin, fmax, sede_id if sede_id != 0 else None)
-        total_c = 0.0
         for (cid, sede, cliente, servicio, precio, inicio, fin, ffecha) in citas:
-            total_c += float(precio or 0.0)
             concepto = f"{servicio} ({inicio}-{fin})"
-            self.tree.insert("", "end",
-                             values=("Cita", concepto, cliente, f"{precio:.2f}", f"{precio:.2f}", ffecha))
+            filas.append((f"c{cid}", ("Cita", concepto, cliente, f"{precio:.2f}", f"{precio:.2f}", ffecha)))
+
+        self.tree.cargar(filas)
 
         self.lbl_tv.config(text=f"Total ventas: Q {total_v:.2f}")
         self.lbl_tc.config(text=f"Total citas: Q {total_c:.2f}")
-        self.lbl_tt.config(text=f"TOTAL: Q {(total_v + total_c):.2f}")
\ No newline at end of file
+        self.lbl_tt.config(text=f"TOTAL: Q {(total_v + total_c):.2f}")
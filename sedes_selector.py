@@ -1,6 +1,7 @@
 import tkinter as tk
 from tkinter import messagebox
 import db
+import tareas
 from inventario import InventarioWindow
 
 BG_PRIMARY = "#fff5f7"
@@ -435,9 +436,6 @@ class SeleccionSede(tk.Toplevel):
 
         self.protocol("WM_DELETE_WINDOW", self._cerrar_sesion)
 
-        db.crear_tabla_sedes()
-        db.ensure_sedes_iniciales()
-
         self.grid_rowconfigure(2, weight=1)
         self.grid_columnconfigure(0, weight=1)
 
@@ -542,11 +540,12 @@ class SeleccionSede(tk.Toplevel):
         self.unbind_all("<MouseWheel>")
 
     def _render(self):
+        tareas.ejecutar(self, "sedes", db.listar_sedes, self._pintar_sedes)
+
+    def _pintar_sedes(self, sedes):
         for w in self.scrollable.winfo_children():
             w.destroy()
 
-        sedes = db.listar_sedes()
-
         for i in range(self.MAX_COLS):
             self.scrollable.grid_columnconfigure(i, weight=1)
 
@@ -593,7 +592,7 @@ class SeleccionSede(tk.Toplevel):
 
     def _abrir_inventario(self, sede_id):
         self.withdraw()
-        InventarioWindow(self, sede_id, user_role=self.user_role, on_back=self._volver)
+        InventarioWindow(self, sede_id, user_role=self.user_role, on_back=self._volver, usuario=self.username)
 
     def _volver(self):
         self.deiconify()
@@ -0,0 +1,203 @@
+import tkinter as tk
+from datetime import date, timedelta
+import db
+import agenda
+import tareas
+
+BG_PRIMARY = "#fff5f7"
+BG_SECONDARY = "#f3d6dc"
+BG_CARDS = "#ffffff"
+TEXT = "#0b1011"
+TEXT_MUTED = "#4b5563"
+TEXT_BTN = "white"
+BUTTONS = "#01a6b2"
+BUTTONS_HOVER = "#028a94"
+
+DIAS = ("Lun", "Mar", "Mié", "Jue", "Vie", "Sáb", "Dom")
+
+HORA_W = 60
+COL_W = 110
+CAB_H = 24
+FILA_H = 28
+
+
+class SemanaWindow(tk.Toplevel):
+    """Semana completa de una sede: un grupo de columnas por día, una columna por empleada."""
+
+    def __init__(self, master, sede_id: int, fecha_iso: str, al_elegir=None):
+        super().__init__(master)
+        self.sede_id = int(sede_id)
+        self.al_elegir = al_elegir
+        self.lunes = self._lunes_de(date.fromisoformat(fecha_iso))
+        self.empleadas = []
+        self._columnas = {}
+        self._pintadas = {}
+
+        self.title("Semana")
+        self.configure(bg=BG_PRIMARY)
+        self.geometry("1200x720")
+
+        barra = tk.Frame(self, bg=BG_PRIMARY)
+        barra.pack(fill="x", padx=12, pady=(12, 6))
+
+        def mk_btn(texto, cmd):
+            return tk.Button(
+                barra, text=texto, bg=BUTTONS, fg=TEXT_BTN, bd=0, cursor="hand2",
+                font=("Segoe UI", 10, "bold"), activebackground=BUTTONS_HOVER, command=cmd
+            )
+
+        mk_btn("◀", lambda: self._mover(-7)).pack(side="left", ipadx=10, ipady=6)
+        mk_btn("HOY", lambda: self._ir(date.today())).pack(side="left", padx=6, ipadx=10, ipady=6)
+        mk_btn("▶", lambda: self._mover(7)).pack(side="left", ipadx=10, ipady=6)
+        self.lbl_rango = tk.Label(barra, text="", bg=BG_PRIMARY, fg=TEXT, font=("Segoe UI", 12, "bold"))
+        self.lbl_rango.pack(side="left", padx=12)
+        self.lbl_detalle = tk.Label(barra, text="", bg=BG_PRIMARY, fg=TEXT_MUTED, font=("Segoe UI", 10, "bold"))
+        self.lbl_detalle.pack(side="right")
+
+        marco = tk.Frame(self, bg=BG_CARDS)
+        marco.pack(fill="both", expand=True, padx=12, pady=(0, 12))
+        marco.grid_rowconfigure(0, weight=1)
+        marco.grid_columnconfigure(0, weight=1)
+
+        self.canvas = tk.Canvas(marco, bg=BG_CARDS, highlightthickness=0)
+        self.canvas.grid(row=0, column=0, sticky="nsew")
+        vsb = tk.Scrollbar(marco, orient="vertical", command=self.canvas.yview)
+        vsb.grid(row=0, column=1, sticky="ns")
+        hsb = tk.Scrollbar(marco, orient="horizontal", command=self.canvas.xview)
+        hsb.grid(row=1, column=0, sticky="ew")
+        self.canvas.configure(yscrollcommand=vsb.set, xscrollcommand=hsb.set)
+
+        self.canvas.tag_bind("cita", "<Button-1>", self._al_click)
+        self.canvas.tag_bind("cita", "<Double-1>", self._al_doble_click)
+
+        self._oyente = self._al_cambiar_citas
+        db.al_cambiar_citas(self._oyente)
+        self.bind("<Destroy>", self._al_destruir, add="+")
+
+        self._cargar()
+
+    @staticmethod
+    def _lunes_de(d):
+        return d - timedelta(days=d.weekday())
+
+    def _fechas(self):
+        return [(self.lunes + timedelta(days=i)).isoformat() for i in range(7)]
+
+    def _mover(self, dias):
+        self._ir(self.lunes + timedelta(days=dias))
+
+    def _ir(self, d):
+        self.lunes = self._lunes_de(d)
+        self._cargar()
+
+    def _al_cambiar_citas(self, sede_id, fecha):
+        if sede_id == self.sede_id and fecha in self._fechas():
+            self._cargar()
+
+    def _al_destruir(self, e):
+        if e.widget is self:
+            db.quitar_oyente_citas(self._oyente)
+
+    def _cargar(self):
+        fechas = self._fechas()
+        self.lbl_rango.config(text=f"Semana {fechas[0]} a {fechas[-1]}")
+
+        def consultar():
+            empleadas = [nombre for _id, nombre in db.listar_empleadas(self.sede_id)]
+            return empleadas, db.listar_agenda_rango(fechas[0], fechas[-1], self.sede_id)
+
+        tareas.ejecutar(self, "semana", consultar, lambda r: self._mostrar(fechas, *r))
+
+    # ------------------------- DIBUJO -------------------------
+
+    def _mostrar(self, fechas, empleadas, filas):
+        if empleadas != self.empleadas:
+            self.empleadas = empleadas
+            self._dibujar_rejilla()
+        self._columnas = {}
+        for i, fecha in enumerate(fechas):
+            self.canvas.itemconfigure(f"dia{i}", text=f"{DIAS[i]} {fecha[8:10]}/{fecha[5:7]}")
+            for j, nombre in enumerate(self.empleadas):
+                self._columnas[(fecha, nombre.lower())] = i * len(self.empleadas) + j
+        self._pintar_citas(filas)
+
+    def _dibujar_rejilla(self):
+        # La rejilla solo depende de las empleadas; cambiar de semana cambia textos y citas.
+        self.canvas.delete("all")
+        self._pintadas = {}
+        n = max(1, len(self.empleadas))
+        ancho = HORA_W + 7 * n * COL_W
+        alto = 2 * CAB_H + agenda.N_BLOQUES * FILA_H
+
+        for b in range(agenda.N_BLOQUES):
+            y = 2 * CAB_H + b * FILA_H
+            if b % 2 == 0:
+                self.canvas.create_rectangle(HORA_W, y, ancho, y + FILA_H, fill=BG_PRIMARY, outline="")
+            self.canvas.create_line(0, y, ancho, y, fill=BG_SECONDARY)
+            self.canvas.create_text(HORA_W - 6, y + 2, anchor="ne", fill=TEXT_MUTED, font=("Segoe UI", 8),
+                                    text=agenda.a_hora(agenda.APERTURA + b * agenda.PASO))
+
+        for i in range(7):
+            x0 = HORA_W + i * n * COL_W
+            self.canvas.create_line(x0, 0, x0, alto, fill=TEXT_MUTED)
+            self.canvas.create_text(x0 + n * COL_W / 2, CAB_H / 2, text="", tags=(f"dia{i}",),
+                                    fill=TEXT, font=("Segoe UI", 10, "bold"))
+            for j, nombre in enumerate(self.empleadas):
+                x = x0 + j * COL_W
+                if j:
+                    self.canvas.create_line(x, CAB_H, x, alto, fill=BG_SECONDARY)
+                self.canvas.create_text(x + COL_W / 2, CAB_H * 1.5, text=nombre, width=COL_W - 6,
+                                        fill=TEXT_MUTED, font=("Segoe UI", 9, "bold"))
+
+        self.canvas.configure(scrollregion=(0, 0, ancho, alto))
+
+    def _pintar_citas(self, filas):
+        nuevas = {}
+        for cid, _sid, fecha, m0, m1, empleada, cliente, servicio, estado in filas:
+            col = self._columnas.get((fecha, (empleada or "").strip().lower()))
+            if col is not None:
+                nuevas[cid] = (col, m0, m1, cliente, servicio, estado, fecha)
+
+        # Solo se tocan las citas que aparecieron, desaparecieron o cambiaron.
+        for cid, dibujo in self._pintadas.items():
+            if nuevas.get(cid) != dibujo:
+                self.canvas.delete(f"cita{cid}")
+        for cid, dibujo in nuevas.items():
+            if self._pintadas.get(cid) != dibujo:
+                self._dibujar_cita(cid, *dibujo)
+        self._pintadas = nuevas
+
+    def _dibujar_cita(self, cid, col, m0, m1, cliente, servicio, estado, _fecha):
+        x0 = HORA_W + col * COL_W + 2
+        y0 = 2 * CAB_H + (max(m0, agenda.APERTURA) - agenda.APERTURA) / agenda.PASO * FILA_H + 1
+        y1 = 2 * CAB_H + (min(m1, agenda.CIERRE) - agenda.APERTURA) / agenda.PASO * FILA_H - 1
+        if y1 <= y0:
+            return
+        atendida = str(estado).upper() == "ATENDIDA"
+        tags = ("cita", f"cita{cid}")
+        self.canvas.create_rectangle(x0, y0, x0 + COL_W - 4, y1, tags=tags, outline="",
+                                     fill=BG_SECONDARY if atendida else BUTTONS)
+        self.canvas.create_text(x0 + 4, y0 + 2, anchor="nw", width=COL_W - 10, tags=tags,
+                                text=f"{cliente}\n{servicio}", font=("Segoe UI", 8),
+                                fill=TEXT_MUTED if atendida else TEXT_BTN)
+
+    # ------------------------- EVENTOS -------------------------
+
+    def _cita_bajo_cursor(self):
+        for tag in self.canvas.gettags("current"):
+            if tag.startswith("cita") and tag[4:].isdigit():
+                return int(tag[4:])
+        return None
+
+    def _al_click(self, _e):
+        cid = self._cita_bajo_cursor()
+        if cid in self._pintadas:
+            _col, m0, m1, cliente, servicio, estado, fecha = self._pintadas[cid]
+            self.lbl_detalle.config(
+                text=f"{fecha} {agenda.a_hora(m0)}-{agenda.a_hora(m1)} · {cliente} · {servicio} · {estado}"
+            )
+
+    def _al_doble_click(self, _e):
+        cid = self._cita_bajo_cursor()
+        if cid in self._pintadas and self.al_elegir:
+            self.al_elegir(self._pintadas[cid][-1], cid)
@@ -0,0 +1,226 @@
+from tkinter import ttk
+
+
+class TablaVirtual(ttk.Treeview):
+    """Treeview que guarda todas las filas en memoria y solo crea en Tk las visibles.
+
+    Las filas se cargan con cargar([(iid, valores), ...]); selection(), item(),
+    get_children(), see() y yview() trabajan sobre el conjunto completo.
+    """
+
+    def __init__(self, master, **kw):
+        self._yscroll = kw.pop("yscrollcommand", None)
+        super().__init__(master, **kw)
+        self._orden = []
+        self._valores = {}
+        self._pintado = {}
+        self._inicio = 0
+        self._visibles = max(1, int(self.cget("height") or 10))
+        self._seleccion = []
+
+        self.bind("<Configure>", lambda e: self._medir(), add="+")
+        self.bind("<<TreeviewSelect>>", self._al_seleccionar, add="+")
+        self.bind("<MouseWheel>", lambda e: self._desplazar(-3 if e.delta > 0 else 3))
+        self.bind("<Button-4>", lambda e: self._desplazar(-3))
+        self.bind("<Button-5>", lambda e: self._desplazar(3))
+        self.bind("<Up>", lambda e: self._mover_foco(-1))
+        self.bind("<Down>", lambda e: self._mover_foco(1))
+        self.bind("<Prior>", lambda e: self._mover_foco(-self._visibles))
+        self.bind("<Next>", lambda e: self._mover_foco(self._visibles))
+        self.bind("<Home>", lambda e: self._mover_foco(-len(self._orden)))
+        self.bind("<End>", lambda e: self._mover_foco(len(self._orden)))
+
+    # ------------------------- DATOS -------------------------
+
+    def cargar(self, filas):
+        """Reemplaza las filas; solo toca en Tk las que cambiaron dentro de la ventana."""
+        self._orden = []
+        self._valores = {}
+        for iid, valores in filas:
+            iid = str(iid)
+            self._orden.append(iid)
+            self._valores[iid] = tuple(valores)
+        self._seleccion = [i for i in self._seleccion if i in self._valores]
+        self._pintar()
+        # Si los datos llegan después del primer <Configure> no hubo filas que
+        # medir; se mide cuando Tk termine de dibujarlas.
+        self.after_idle(self._medir)
+
+    def limpiar(self):
+        self.cargar([])
+
+    def get_children(self, item=None):
+        if item in (None, ""):
+            return tuple(self._orden)
+        return super().get_children(item)
+
+    def exists(self, item):
+        return str(item) in self._valores or super().exists(item)
+
+    def insert(self, parent, index, iid=None, **kw):
+        if parent != "" or iid is None:
+            return super().insert(parent, index, iid=iid, **kw)
+        iid = str(iid)
+        if iid not in self._valores:
+            if index == "end":
+                self._orden.append(iid)
+            else:
+                self._orden.insert(int(index), iid)
+        self._valores[iid] = tuple(kw.get("values", ()))
+        self._pintar()
+        return iid
+
+    def item(self, item, option=None, **kw):
+        iid = str(item)
+        if iid not in self._valores:
+            return super().item(item, option, **kw)
+        if "values" in kw:
+            self._valores[iid] = tuple(kw["values"])
+        if option == "values":
+            return self._valores[iid]
+        if iid in self._pintado:
+            if "values" in kw:
+                self._pintado[iid] = self._valores[iid]
+            return super().item(item, option, **kw)
+        if kw:
+            return None
+        datos = {"text": "", "image": "", "values": self._valores[iid], "open": 0, "tags": ""}
+        return datos if option is None else datos.get(option)
+
+    def delete(self, *items):
+        quitar = {str(i) for i in items}
+        if not quitar & set(self._valores):
+            return super().delete(*items)
+        self._orden = [i for i in self._orden if i not in quitar]
+        for iid in quitar:
+            self._valores.pop(iid, None)
+        self._seleccion = [i for i in self._seleccion if i not in quitar]
+        self._pintar()
+
+    # ------------------------- SELECCIÓN -------------------------
+
+    def selection(self):
+        return tuple(self._seleccion)
+
+    def selection_set(self, *items):
+        if len(items) == 1 and isinstance(items[0], (list, tuple)):
+            items = items[0]
+        self._seleccion = [str(i) for i in items if str(i) in self._valores]
+        self._aplicar_seleccion()
+
+    def focus(self, item=None):
+        if item is None:
+            return super().focus()
+        iid = str(item)
+        if iid in self._valores and iid not in self._pintado:
+            self.see(iid)
+        return super().focus(iid)
+
+    def see(self, item):
+        iid = str(item)
+        if iid not in self._valores:
+            return super().see(item)
+        idx = self._orden.index(iid)
+        if idx < self._inicio:
+            self._inicio = idx
+        elif idx >= self._inicio + self._visibles:
+            self._inicio = idx - self._visibles + 1
+        else:
+            return
+        self._pintar()
+
+    def _al_seleccionar(self, _e=None):
+        # Una selección hecha fuera de la ventana se conserva mientras no se elija otra.
+        nativa = list(super().selection())
+        if nativa or any(i in self._pintado for i in self._seleccion):
+            self._seleccion = nativa
+
+    def _aplicar_seleccion(self):
+        visibles = [i for i in self._seleccion if i in self._pintado]
+        if set(visibles) != set(super().selection()):
+            super().selection_set(visibles)
+
+    # ------------------------- DESPLAZAMIENTO -------------------------
+
+    def configure(self, cnf=None, **kw):
+        if "yscrollcommand" in kw:
+            self._yscroll = kw.pop("yscrollcommand")
+            self._avisar_scroll()
+            if not kw and cnf is None:
+                return None
+        return super().configure(cnf, **kw)
+
+    config = configure
+
+    def yview(self, *args):
+        total = len(self._orden)
+        if not args:
+            if not total:
+                return 0.0, 1.0
+            return self._inicio / total, min(1.0, (self._inicio + self._visibles) / total)
+        if args[0] == "moveto":
+            self._inicio = int(float(args[1]) * total)
+        elif args[0] == "scroll":
+            paso = int(args[1])
+            if len(args) > 2 and args[2] == "pages":
+                paso *= self._visibles
+            self._inicio += paso
+        self._pintar()
+
+    def _desplazar(self, filas):
+        self._inicio += filas
+        self._pintar()
+        return "break"
+
+    def _mover_foco(self, paso):
+        if not self._orden:
+            return "break"
+        actual = super().focus()
+        idx = self._orden.index(actual) if actual in self._valores else self._inicio - (1 if paso > 0 else 0)
+        idx = max(0, min(len(self._orden) - 1, idx + paso))
+        iid = self._orden[idx]
+        self.see(iid)
+        self.selection_set(iid)
+        super().focus(iid)
+        return "break"
+
+    def _medir(self):
+        pintados = super().get_children()
+        if not pintados:
+            return
+        caja = self.bbox(pintados[0])
+        if not caja:
+            return
+        _x, y, _w, alto = caja
+        visibles = max(1, (self.winfo_height() - y) // max(1, alto))
+        if visibles != self._visibles:
+            self._visibles = visibles
+            self._pintar()
+
+    def _avisar_scroll(self):
+        if self._yscroll:
+            self._yscroll(*self.yview())
+
+    def _pintar(self):
+        self._inicio = max(0, min(self._inicio, len(self._orden) - self._visibles))
+        ventana = self._orden[self._inicio:self._inicio + self._visibles]
+
+        en_ventana = set(ventana)
+        sobrantes = [i for i in self._pintado if i not in en_ventana]
+        if sobrantes:
+            super().delete(*sobrantes)
+            for iid in sobrantes:
+                del self._pintado[iid]
+        for idx, iid in enumerate(ventana):
+            valores = self._valores[iid]
+            if iid not in self._pintado:
+                super().insert("", idx, iid=iid, values=valores)
+            else:
+                if self._pintado[iid] != valores:
+                    super().item(iid, values=valores)
+                if super().index(iid) != idx:
+                    super().move(iid, "", idx)
+            self._pintado[iid] = valores
+
+        self._aplicar_seleccion()
+        self._avisar_scroll()
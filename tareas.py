@@ -0,0 +1,76 @@
+import tkinter as tk
+from tkinter import messagebox
+from concurrent.futures import ThreadPoolExecutor
+
+# Las consultas corren en estos hilos (cada uno con su propia conexión de db) y
+# el resultado se entrega de vuelta en el hilo de Tk revisando con after().
+_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="db")
+_INTERVALO_MS = 25
+
+_pendientes = {}
+_ocupados = {}
+
+
+def ejecutar(widget: tk.Misc, clave: str, fn, al_terminar, al_fallar=None):
+    """Corre fn() fuera del hilo de Tk y llama al_terminar(resultado) en el hilo de Tk.
+
+    Una nueva petición con la misma (widget, clave) deja obsoleta a la anterior:
+    si aún no empezó se cancela y, si ya corría, su resultado se descarta.
+    """
+    llave = (str(widget), clave)
+    previa = _pendientes.get(llave)
+    if previa:
+        previa.cancel()
+
+    futuro = _pool.submit(fn)
+    _pendientes[llave] = futuro
+    ventana = widget.winfo_toplevel()
+    _marcar_ocupado(ventana, 1)
+    raiz = widget._root()
+
+    def revisar():
+        if not futuro.done():
+            raiz.after(_INTERVALO_MS, revisar)
+            return
+        _marcar_ocupado(ventana, -1)
+        if _pendientes.get(llave) is not futuro:
+            return
+        del _pendientes[llave]
+        if futuro.cancelled() or not _existe(widget):
+            return
+        try:
+            resultado = futuro.result()
+        except Exception as e:
+            (al_fallar or _mostrar_error)(e)
+            return
+        al_terminar(resultado)
+
+    raiz.after(_INTERVALO_MS, revisar)
+    return futuro
+
+
+def cerrar():
+    _pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _existe(widget):
+    try:
+        return bool(widget.winfo_exists())
+    except tk.TclError:
+        return False
+
+
+def _marcar_ocupado(ventana, delta):
+    # Cursor de espera en la ventana mientras tenga consultas en curso.
+    nombre = str(ventana)
+    cuenta = _ocupados.get(nombre, 0) + delta
+    if cuenta > 0:
+        _ocupados[nombre] = cuenta
+    else:
+        _ocupados.pop(nombre, None)
+    if _existe(ventana):
+        ventana.configure(cursor="watch" if cuenta > 0 else "")
+
+
+def _mostrar_error(e):
+    messagebox.showerror("Error", str(e))
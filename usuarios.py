@@ -2,6 +2,7 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 import hashlib
 import db
+import tareas
 
 BG_PRIMARY = "#fff5f7"
 BG_SECONDARY = "#f3d6dc"
@@ -382,15 +383,13 @@ class UsuariosFrame(tk.Frame):
         self._cargar_usuarios()
 
     def _cargar_usuarios(self):
+        tareas.ejecutar(self, "usuarios", db.listar_usuarios, self._mostrar_usuarios,
+                        lambda e: messagebox.showerror("Error", f"No se pudo cargar usuarios:\n{e}"))
+
+    def _mostrar_usuarios(self, usuarios):
         for i in self.tree.get_children():
             self.tree.delete(i)
 
-        try:
-            usuarios = db.listar_usuarios()
-        except Exception as e:
-            messagebox.showerror("Error", f"No se pudo cargar usuarios:\n{e}")
-            return
-
         for (uid, username, first_name, last_name, email, role, active, locked) in usuarios:
             if locked:
                 estado = "Bloqueado"
@@ -1,7 +1,9 @@
 import tkinter as tk
 from tkinter import ttk
 import db
-from factura_html import abrir_factura_en_navegador
+import tareas
+from tabla_virtual import TablaVirtual
+from factura_html import abrir_factura_en_navegador, nueva_autorizacion
 
 BG_PRIMARY = "#fff5f7"
 BG_SECONDARY = "#f3d6dc"
@@ -14,6 +16,11 @@ BUTTONS = "#01a6b2"
 BUTTONS_HOVER = "#028a94"
 DANGER = "#d85a7a"
 
+# Búsqueda al teclear: espera a que se deje de escribir y muestra a lo sumo
+# MAX_RESULTADOS productos.
+ESPERA_BUSQUEDA_MS = 150
+MAX_RESULTADOS = 200
+
 
 def _apply_ttk_styles(root: tk.Misc):
     style = ttk.Style(root)
@@ -319,14 +326,18 @@ class FacturacionDialog(tk.Toplevel):
         self.destroy()
 
 class VentasFrame(tk.Frame):
-    def __init__(self, master, sede_id: int, user_role="dependiente"):
+    def __init__(self, master, sede_id: int, user_role="dependiente", usuario=None):
         super().__init__(master, bg=BG_PRIMARY)
         self.sede_id = int(sede_id)
         self.user_role = user_role
+        self.usuario = usuario
         _apply_ttk_styles(self)
 
         self.cart = {}
         self.productos_cache = []
+        self._busqueda_pendiente = None
+        self._texto_pedido = None
+        self._ultima_busqueda = None
 
         wrapper = tk.Frame(self, bg=BG_PRIMARY)
         wrapper.pack(fill="both", expand=True, padx=14, pady=14)
@@ -358,15 +369,26 @@ class VentasFrame(tk.Frame):
         search_box.pack(fill="x", pady=(8, 8))
         self.ent_buscar = tk.Entry(search_box, textvariable=self.var_buscar, relief="flat", bg=BG_PRIMARY, fg=TEXT, font=("Segoe UI", 11))
         self.ent_buscar.pack(fill="x", padx=10, pady=8)
-        self.ent_buscar.bind("<KeyRelease>", lambda e: self._buscar_suave())
+        self.ent_buscar.bind("<KeyRelease>", lambda e: self._programar_busqueda())
         self.ent_buscar.bind("<Return>", lambda e: self._focus_first())
 
+        # Lector de código de barras: escribe el código y manda Enter.
+        scan_box = tk.Frame(prod, bg=BG_CARDS)
+        scan_box.pack(fill="x", pady=(0, 8))
+        tk.Label(scan_box, text="Código:", bg=BG_CARDS, fg=TEXT, font=("Segoe UI", 10, "bold")).pack(side="left")
+        self.var_codigo = tk.StringVar(value="")
+        self.ent_codigo = tk.Entry(scan_box, textvariable=self.var_codigo, relief="flat", bg=BG_PRIMARY, fg=TEXT, font=("Segoe UI", 11), width=22)
+        self.ent_codigo.pack(side="left", padx=(8, 10), ipady=4)
+        self.ent_codigo.bind("<Return>", lambda e: self._escanear())
+        self.lbl_escaneo = tk.Label(scan_box, text="", bg=BG_CARDS, fg=TEXT_MUTED, font=("Segoe UI", 10, "bold"))
+        self.lbl_escaneo.pack(side="left")
+
         actions = tk.Frame(prod, bg=BG_CARDS)
         actions.pack(fill="x", pady=(0, 8))
         tk.Button(actions, text="AGREGAR", bg=BUTTONS, fg=TEXT_BTN, bd=0, cursor="hand2", font=("Segoe UI", 10, "bold"), activebackground=BUTTONS_HOVER, command=self._agregar_carrito).pack(side="left", padx=(0, 8), ipady=8, ipadx=14)
         tk.Button(actions, text="RECARGAR", bg=BG_SECONDARY, fg=TEXT, bd=0, cursor="hand2", font=("Segoe UI", 10, "bold"), activebackground=BG_SECONDARY, command=self._cargar).pack(side="left", ipady=8, ipadx=14)
 
-        self.tree_prod = ttk.Treeview(prod, columns=("Producto", "Categoría", "Stock", "Precio"), show="headings", style="Soft.Treeview")
+        self.tree_prod = TablaVirtual(prod, columns=("Producto", "Categoría", "Stock", "Precio"), show="headings", style="Soft.Treeview")
         self.tree_prod.heading("Producto", text="Producto")
         self.tree_prod.heading("Categoría", text="Categoría")
         self.tree_prod.heading("Stock", text="Stock")
@@ -423,24 +445,55 @@ class VentasFrame(tk.Frame):
         self._refresh_cart_view()
 
     def _set_products_rows(self, productos):
-        for i in self.tree_prod.get_children():
-            self.tree_prod.delete(i)
-        for pid, nombre, stock, precio, categoria in productos:
-            self.tree_prod.insert("", "end", iid=str(pid), values=(nombre, categoria or "", int(stock), f"{float(precio):.2f}"))
+        self.tree_prod.cargar((pid, (nombre, categoria or "", int(stock), f"{float(precio):.2f}"))
+                              for pid, nombre, stock, precio, categoria in productos)
 
     def _cargar(self):
-        self.productos_cache = db.listar_inventario(self.sede_id)
-        self._set_products_rows(self.productos_cache)
+        tareas.ejecutar(self, "productos", lambda: db.listar_inventario(self.sede_id), self._al_cargar)
+
+    def _al_cargar(self, productos):
+        self.productos_cache = productos
+        self._texto_pedido = None
+        self._ultima_busqueda = None
         self._buscar_suave()
 
+    def _programar_busqueda(self):
+        if self._busqueda_pendiente:
+            self.after_cancel(self._busqueda_pendiente)
+        self._busqueda_pendiente = self.after(ESPERA_BUSQUEDA_MS, self._buscar_suave)
+
     def _buscar_suave(self):
-        texto = (self.var_buscar.get() or "").strip().lower()
-        productos = self.productos_cache or db.listar_inventario(self.sede_id)
+        self._busqueda_pendiente = None
+        if not self.winfo_exists():
+            return
+        texto = (self.var_buscar.get() or "").strip()
+        if texto == self._texto_pedido:
+            return
+        self._texto_pedido = texto
+        previa = self._ultima_busqueda
         if not texto:
-            self._set_products_rows(productos)
+            # También pasa por tareas para dejar obsoleta una búsqueda en curso.
+            tareas.ejecutar(self, "buscar", lambda: self.productos_cache,
+                            lambda filas: self._mostrar_busqueda("", filas))
             return
-        filtrados = [p for p in productos if texto in (p[1] or "").strip().lower()]
-        self._set_products_rows(filtrados)
+
+        # Si el texto solo se alargó y el resultado anterior estaba completo,
+        # basta con afinarlo en memoria.
+        afinar = bool(previa and previa[0] and texto.lower().startswith(previa[0].lower())
+                      and len(previa[1]) < MAX_RESULTADOS)
+
+        def consultar():
+            if afinar:
+                filas = db.filtrar_productos(previa[1], texto)
+                if filas:
+                    return filas
+            return db.buscar_productos(self.sede_id, texto, MAX_RESULTADOS)
+
+        tareas.ejecutar(self, "buscar", consultar, lambda filas: self._mostrar_busqueda(texto, filas))
+
+    def _mostrar_busqueda(self, texto, filas):
+        self._ultima_busqueda = (texto, filas)
+        self._set_products_rows(filas)
 
     def _focus_first(self):
         kids = self.tree_prod.get_children()
@@ -468,12 +521,6 @@ class VentasFrame(tk.Frame):
         self.lbl_total.config(text=f"Total: Q {total:.2f}")
         self.lbl_total_top.config(text=f"Q {total:.2f}")
 
-    def _get_stock_real(self, pid):
-        for p in self.productos_cache or db.listar_inventario(self.sede_id):
-            if int(p[0]) == int(pid):
-                return int(p[2])
-        return 0
-
     def _agregar_carrito(self):
         sel = self.tree_prod.selection()
         if not sel:
@@ -506,6 +553,30 @@ class VentasFrame(tk.Frame):
         self.cart[pid]["cant"] += int(cant)
         self._refresh_cart_view()
 
+    def _escanear(self):
+        codigo = (self.var_codigo.get() or "").strip()
+        self.var_codigo.set("")
+        if not codigo:
+            return "break"
+
+        # Consulta puntual por índice; va directa para no perder lecturas seguidas.
+        producto = db.producto_por_codigo(self.sede_id, codigo)
+        if not producto:
+            self.lbl_escaneo.config(text=f"Código {codigo} no registrado.", fg=DANGER)
+            return "break"
+
+        pid, nombre, stock, precio, _categoria = producto
+        if int(self.cart.get(pid, {}).get("cant", 0)) >= int(stock):
+            self.lbl_escaneo.config(text=f"Sin existencias: {nombre}", fg=DANGER)
+            return "break"
+
+        if pid not in self.cart:
+            self.cart[pid] = {"nombre": nombre, "precio": float(precio), "cant": 0}
+        self.cart[pid]["cant"] += 1
+        self._refresh_cart_view()
+        self.lbl_escaneo.config(text=f"+1 {nombre}", fg=TEXT_MUTED)
+        return "break"
+
     def _editar_cantidad(self):
         sel = self.tree_cart.selection()
         if not sel:
@@ -513,11 +584,17 @@ class VentasFrame(tk.Frame):
             return
 
         pid = int(sel[0])
+        if pid not in self.cart:
+            return
+
+        # Stock al momento, por id; la lista cargada puede estar vieja.
+        tareas.ejecutar(self, "stock", lambda: db.obtener_producto(pid),
+                        lambda producto: self._pedir_cantidad(pid, int(producto[3]) if producto else 0))
+
+    def _pedir_cantidad(self, pid, stock_real):
         item = self.cart.get(pid)
         if not item:
             return
-
-        stock_real = self._get_stock_real(pid)
         if stock_real <= 0:
             InfoToast(self.winfo_toplevel(), "Recarga productos e intenta de nuevo.", accent=DANGER)
             return
@@ -585,15 +662,25 @@ class VentasFrame(tk.Frame):
             items_fact.append({"cantidad": int(it["cant"]), "descripcion": it["nombre"], "precio_unitario": float(it["precio"]), "impuestos": 0.0})
 
         try:
-            for pid, it in self.cart.items():
-                db.registrar_venta(self.sede_id, int(pid), int(it["cant"]), float(it["precio"]))
+            vid = db.registrar_venta_carrito(
+                self.sede_id,
+                [(int(pid), int(it["cant"]), float(it["precio"])) for pid, it in self.cart.items()],
+                nit_receptor=datos_fact["nit"],
+                nombre_receptor=datos_fact["nombre"],
+                apellidos_receptor=datos_fact["apellidos"],
+                usuario=self.usuario
+            )
             self.cart.clear()
             self._refresh_cart_view()
             self._cargar()
             try:
-                abrir_factura_en_navegador(datos_fact["nit"], datos_fact["nombre"], datos_fact["apellidos"], items_fact)
+                auth = nueva_autorizacion()
+                path = abrir_factura_en_navegador(datos_fact["nit"], datos_fact["nombre"], datos_fact["apellidos"], items_fact, autorizacion=auth)
+                db.vincular_factura_venta(vid, path, auth)
             except Exception:
                 pass
             InfoToast(self.winfo_toplevel(), f"Venta realizada. Total: Q {total:.2f}", accent=BUTTONS)
+        except ValueError as e:
+            InfoToast(self.winfo_toplevel(), str(e), accent=DANGER)
         except Exception:
             InfoToast(self.winfo_toplevel(), "No se pudo registrar la venta.", accent=DANGER)